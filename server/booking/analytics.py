@@ -0,0 +1,270 @@
+"""
+Stay-date analytics.
+
+Revenue and occupancy bucketed by the nights actually stayed rather than by
+created_at. Confirmed and completed bookings overlapping the window are read
+in one query, expanded into one entry per night with NumPy datetime64
+arithmetic, and summed per property x period x guest type x accommodation
+type with np.add.at. Each property is one unit (the night ledger never lets
+two bookings share a night), so it has one available night per calendar day.
+
+    occupancy = nights sold / available nights
+    ADR       = revenue / nights sold
+    RevPAR    = revenue / available nights
+
+A booking's revenue is spread evenly over its nights.
+
+The pace report compares nights and revenue on the books for future stay
+months, as of a series of snapshot dates, with the same point last year. A
+night is on the books at a snapshot if its booking was created by then, so
+each year's nights go into a stay day x lead time matrix once, a reverse
+cumulative sum over lead time turns it into "booked at least L days ahead",
+and every snapshot is a gather at L = stay day - snapshot. Cancelled
+bookings have no cancellation date and are left out entirely.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db.models.functions import TruncDate
+
+from .models import Booking
+
+GRANULARITIES = ('day', 'week', 'month')
+# Bookings made further ahead than this share the last lead-time column
+MAX_LEAD_DAYS = 730
+STAY_STATUSES = ('confirmed', 'completed')
+GUEST_TYPES = [value for value, _ in Booking.GUEST_TYPE_CHOICES]
+ACCOMMODATION_TYPES = [value for value, _ in Booking.ACCOMMODATION_TYPE_CHOICES]
+
+
+def period_index(start, end, granularity):
+    """Period of every day in [start, end) as an index into the returned period starts"""
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D'))
+    if granularity == 'month':
+        keys = days.astype('datetime64[M]').astype('datetime64[D]')
+    elif granularity == 'week':
+        # 1970-01-01 was a Thursday; weeks start on Monday
+        epoch_days = days.astype('int64')
+        keys = days - ((epoch_days + 3) % 7)
+    else:
+        keys = days
+    starts, index = np.unique(keys, return_inverse=True)
+    return starts, index
+
+
+def expand_nights(check_in, check_out, start, end):
+    """
+    Nights of each stay inside [start, end): the stay index of every night and
+    the night's offset from start, both as int arrays.
+    """
+    window_start, window_end = np.datetime64(start, 'D'), np.datetime64(end, 'D')
+    first = np.maximum(check_in, window_start)
+    last = np.minimum(check_out, window_end)
+    counts = np.maximum((last - first).astype('int64'), 0)
+
+    stay = np.repeat(np.arange(len(counts)), counts)
+    # Position of each night within its stay: 0, 1, ... counts[i] - 1
+    run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+    position = np.arange(counts.sum()) - run_starts
+    offset = (first - window_start).astype('int64')[stay] + position
+    return stay, offset
+
+
+def stay_cube(stays, property_ids, start, end, granularity='month'):
+    """
+    Nights sold and revenue as arrays shaped (property, period, guest type,
+    accommodation type), plus the available nights per period and the period
+    starts. stays is a dict of equal-length arrays: property_id, check_in,
+    check_out (datetime64[D]), nightly_rate, guest_type, accommodation_type.
+    """
+    period_starts, day_period = period_index(start, end, granularity)
+    available = np.bincount(day_period, minlength=len(period_starts))
+    shape = (len(property_ids), len(period_starts), len(GUEST_TYPES), len(ACCOMMODATION_TYPES))
+    nights = np.zeros(shape, dtype=np.int64)
+    revenue = np.zeros(shape, dtype=np.float64)
+
+    stay, offset = expand_nights(stays['check_in'], stays['check_out'], start, end)
+    if len(stay):
+        property_position = np.searchsorted(property_ids, stays['property_id'])[stay]
+        index = (
+            property_position,
+            day_period[offset],
+            stays['guest_type'][stay],
+            stays['accommodation_type'][stay],
+        )
+        np.add.at(nights, index, 1)
+        np.add.at(revenue, index, stays['nightly_rate'][stay])
+    return nights, revenue, available, period_starts
+
+
+def load_stays(property_ids, start, end):
+    """Confirmed and completed stays overlapping [start, end) as stay_cube input, in one query"""
+    rows = Booking.objects.filter(
+        property_id__in=property_ids,
+        status__in=STAY_STATUSES,
+        check_in__lt=end,
+        check_out__gt=start,
+    ).annotate(created_day=TruncDate('created_at')).values_list(
+        'property_id', 'check_in', 'check_out', 'total_amount', 'total_days', 'guest_type',
+        'accommodation_type', 'created_day'
+    ).order_by()
+    columns = list(zip(*rows)) or [()] * 8
+    total_amount = np.array(columns[3], dtype=np.float64)
+    total_days = np.array(columns[4], dtype=np.float64)
+    return {
+        'property_id': np.array(columns[0], dtype=np.int64),
+        'check_in': np.array(columns[1], dtype='datetime64[D]'),
+        'check_out': np.array(columns[2], dtype='datetime64[D]'),
+        'nightly_rate': np.divide(total_amount, total_days, out=np.zeros_like(total_amount), where=total_days > 0),
+        'guest_type': np.array([GUEST_TYPES.index(value) for value in columns[5]], dtype=np.int64),
+        'accommodation_type': np.array([ACCOMMODATION_TYPES.index(value) for value in columns[6]], dtype=np.int64),
+        'created': np.array(columns[7], dtype='datetime64[D]'),
+    }
+
+
+def _metrics(nights, revenue, available):
+    nights, revenue, available = int(nights), float(revenue), int(available)
+    return {
+        'nights_sold': nights,
+        'revenue': round(revenue, 2),
+        'occupancy_rate': round(nights / available * 100, 2) if available else 0,
+        'adr': round(revenue / nights, 2) if nights else 0,
+        'revpar': round(revenue / available, 2) if available else 0,
+    }
+
+
+def stay_analytics(properties, start, end, granularity='month'):
+    """Per-property, per-period occupancy, ADR and RevPAR with guest and accommodation type breakdowns"""
+    property_ids = np.array(sorted(prop.id for prop in properties), dtype=np.int64)
+    names = {prop.id: prop.name for prop in properties}
+    nights, revenue, available, period_starts = stay_cube(
+        load_stays(property_ids.tolist(), start, end), property_ids, start, end, granularity
+    )
+
+    # Totals over the breakdown axes, all computed up front
+    nights_total, revenue_total = nights.sum(axis=(2, 3)), revenue.sum(axis=(2, 3))
+    nights_guest, revenue_guest = nights.sum(axis=3), revenue.sum(axis=3)
+    nights_acc, revenue_acc = nights.sum(axis=2), revenue.sum(axis=2)
+
+    labels = [str(day) for day in period_starts]
+    report = []
+    for p, property_id in enumerate(property_ids.tolist()):
+        periods = []
+        for t, label in enumerate(labels):
+            row = {'period_start': label, 'available_nights': int(available[t])}
+            row.update(_metrics(nights_total[p, t], revenue_total[p, t], available[t]))
+            row['by_guest_type'] = {
+                guest_type: _metrics(nights_guest[p, t, g], revenue_guest[p, t, g], available[t])
+                for g, guest_type in enumerate(GUEST_TYPES)
+            }
+            row['by_accommodation_type'] = {
+                accommodation_type: _metrics(nights_acc[p, t, a], revenue_acc[p, t, a], available[t])
+                for a, accommodation_type in enumerate(ACCOMMODATION_TYPES)
+            }
+            periods.append(row)
+
+        total_available = int(available.sum())
+        summary = _metrics(nights_total[p].sum(), revenue_total[p].sum(), total_available)
+        report.append({
+            'property_id': property_id,
+            'property_name': names[property_id],
+            'available_nights': total_available,
+            **summary,
+            'periods': periods,
+        })
+    return report
+
+
+# --- Pace ---
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def same_day_last_year(day):
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:
+        # 29 February
+        return day.replace(year=day.year - 1, day=28)
+
+
+def pace_matrix(stays, start, end):
+    """Nights and revenue per stay day in [start, end) x lead time in days (0..MAX_LEAD_DAYS)"""
+    days = (end - start).days
+    nights = np.zeros((days, MAX_LEAD_DAYS + 1), dtype=np.int64)
+    revenue = np.zeros((days, MAX_LEAD_DAYS + 1), dtype=np.float64)
+    stay, offset = expand_nights(stays['check_in'], stays['check_out'], start, end)
+    if len(stay):
+        night = np.datetime64(start, 'D') + offset
+        # Nights recorded after they were stayed count as booked on the day
+        lead = np.clip((night - stays['created'][stay]).astype('int64'), 0, MAX_LEAD_DAYS)
+        np.add.at(nights, (offset, lead), 1)
+        np.add.at(revenue, (offset, lead), stays['nightly_rate'][stay])
+    return nights, revenue
+
+
+def on_the_books(matrix, start, snapshots):
+    """(snapshot, stay day) totals of everything booked on or before each snapshot"""
+    # booked[d, l]: booked at least l days before stay day d
+    booked = matrix[:, ::-1].cumsum(axis=1)[:, ::-1]
+    days = np.datetime64(start, 'D') + np.arange(matrix.shape[0])
+    lead = (days[None, :] - np.array(snapshots, dtype='datetime64[D]')[:, None]).astype('int64')
+    return booked[np.arange(matrix.shape[0])[None, :], np.clip(lead, 0, MAX_LEAD_DAYS)]
+
+
+def _monthly_on_the_books(stays, start, end, snapshots):
+    """(snapshot, stay month) nights and revenue on the books"""
+    _, day_month = period_index(start, end, 'month')
+    months = day_month.max() + 1
+    nights, revenue = pace_matrix(stays, start, end)
+    result = []
+    for matrix in (nights, revenue):
+        daily = on_the_books(matrix, start, snapshots)
+        monthly = np.zeros((len(snapshots), months), dtype=daily.dtype)
+        np.add.at(monthly, (slice(None), day_month), daily)
+        result.append(monthly)
+    return result
+
+
+def pace_report(property_ids, today, months=6, weeks=12):
+    """
+    Nights and revenue on the books for the stay months starting with today's,
+    at weekly snapshots going back from today, next to last year's figures at
+    the same snapshot.
+    """
+    start = today.replace(day=1)
+    end = add_months(start, months)
+    last_year_start, last_year_end = add_months(start, -12), add_months(end, -12)
+    snapshots = [today - timedelta(weeks=week) for week in range(weeks + 1)]
+    last_year_snapshots = [same_day_last_year(snapshot) for snapshot in snapshots]
+
+    stays = load_stays(property_ids, last_year_start, end)
+    nights, revenue = _monthly_on_the_books(stays, start, end, snapshots)
+    last_year_nights, last_year_revenue = _monthly_on_the_books(
+        stays, last_year_start, last_year_end, last_year_snapshots
+    )
+
+    report = []
+    for m in range(months):
+        month_start = add_months(start, m)
+        pace = []
+        for k, snapshot in enumerate(snapshots):
+            row = {
+                'snapshot': snapshot.isoformat(),
+                'nights': int(nights[k, m]),
+                'revenue': round(float(revenue[k, m]), 2),
+                'last_year_snapshot': last_year_snapshots[k].isoformat(),
+                'last_year_nights': int(last_year_nights[k, m]),
+                'last_year_revenue': round(float(last_year_revenue[k, m]), 2),
+            }
+            row['nights_change'] = row['nights'] - row['last_year_nights']
+            row['revenue_change'] = round(row['revenue'] - row['last_year_revenue'], 2)
+            pace.append(row)
+        report.append({
+            'stay_month': month_start.strftime('%Y-%m'),
+            'last_year_stay_month': add_months(month_start, -12).strftime('%Y-%m'),
+            'pace': pace,
+        })
+    return report
@@ -0,0 +1,260 @@
+"""
+In-memory availability index for properties.
+
+Each property gets a small index of its active bookings and blocked dates,
+sorted by start date, plus the merged (non-overlapping) occupied intervals.
+Overlap, buffer-day and conflict-detail questions are answered with bisect
+lookups instead of range scans against the database.
+
+Indexes are cached per process and invalidated by the signals in
+booking/signals.py, which bump the property's AvailabilityVersion row in the
+same transaction as the change. Every lookup reads that counter (one primary
+key query), so a booking made in one worker is seen by every other worker as
+soon as it commits.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, F, OuterRef, Q
+
+from .models import AvailabilityVersion, Booking, BlockedDate
+
+# Booking statuses that occupy nights
+ACTIVE_BOOKING_STATUSES = ('pending', 'confirmed')
+
+INDEX_TTL = getattr(settings, 'AVAILABILITY_INDEX_TTL', 60)
+
+BookingInterval = namedtuple(
+    'BookingInterval', ['start', 'end', 'id', 'booking_reference', 'guest_name', 'status']
+)
+BlockedInterval = namedtuple('BlockedInterval', ['start', 'end', 'id', 'reason'])
+AvailabilityConflicts = namedtuple('AvailabilityConflicts', ['bookings', 'blocked', 'buffer'])
+
+
+def date_range(start_date, end_date):
+    """Dates between start and end (exclusive of end)"""
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days)]
+
+
+def _nearest_first(first, last, preferred):
+    """Days of [first, last] by distance from preferred, the earlier one first on ties"""
+    if preferred <= first:
+        for offset in range((last - first).days + 1):
+            yield first + timedelta(days=offset)
+    elif preferred >= last:
+        for offset in range((last - first).days + 1):
+            yield last - timedelta(days=offset)
+    else:
+        yield preferred
+        for offset in range(1, max((preferred - first).days, (last - preferred).days) + 1):
+            step = timedelta(days=offset)
+            if preferred - step >= first:
+                yield preferred - step
+            if preferred + step <= last:
+                yield preferred + step
+
+
+class _IntervalList:
+    """Intervals sorted by start with a running maximum of end dates"""
+
+    def __init__(self, intervals):
+        self.items = sorted(intervals, key=lambda item: (item.start, item.end))
+        self.starts = [item.start for item in self.items]
+        self.max_ends = []
+        running = None
+        for item in self.items:
+            running = item.end if running is None or item.end > running else running
+            self.max_ends.append(running)
+
+    def overlapping(self, start, end):
+        """Intervals with item.start < end and item.end > start"""
+        # Everything before `first` ends on or before `start`, everything
+        # from `last` onwards starts on or after `end`.
+        first = bisect_right(self.max_ends, start)
+        last = bisect_left(self.starts, end)
+        return [item for item in self.items[first:last] if item.end > start]
+
+
+class PropertyAvailabilityIndex:
+    """Availability of a single property, built from two queries"""
+
+    def __init__(self, property_id, bookings, blocked, version=0):
+        self.property_id = property_id
+        self.version = version
+        self.built_at = time.monotonic()
+        self.bookings = _IntervalList(bookings)
+        self.blocked = _IntervalList(blocked)
+
+        # Bookings keyed by check-out date for the buffer-day rule
+        self.checkouts = defaultdict(list)
+        for booking in self.bookings.items:
+            self.checkouts[booking.end].append(booking)
+
+        # Merge bookings and blocks into sorted, non-overlapping intervals
+        merged = []
+        for item in sorted(self.bookings.items + self.blocked.items, key=lambda i: i.start):
+            if merged and item.start <= merged[-1][1]:
+                if item.end > merged[-1][1]:
+                    merged[-1][1] = item.end
+            else:
+                merged.append([item.start, item.end])
+        self.occupied_starts = [interval[0] for interval in merged]
+        self.occupied_ends = [interval[1] for interval in merged]
+
+    @classmethod
+    def build(cls, property_id, version=0):
+        bookings = [
+            BookingInterval(*row) for row in Booking.objects.filter(
+                property_id=property_id,
+                status__in=ACTIVE_BOOKING_STATUSES,
+            ).values_list('check_in', 'check_out', 'id', 'booking_reference', 'full_name', 'status')
+        ]
+        blocked = [
+            BlockedInterval(*row) for row in BlockedDate.objects.filter(
+                property_id=property_id,
+            ).values_list('start_date', 'end_date', 'id', 'reason')
+        ]
+        return cls(property_id, bookings, blocked, version)
+
+    def is_occupied(self, start, end):
+        """True if any booked or blocked night falls in [start, end)"""
+        idx = bisect_left(self.occupied_starts, end) - 1
+        return idx >= 0 and self.occupied_ends[idx] > start
+
+    def overlapping_bookings(self, start, end, exclude_booking_id=None):
+        return [
+            booking for booking in self.bookings.overlapping(start, end)
+            if booking.id != exclude_booking_id
+        ]
+
+    def overlapping_blocked(self, start, end):
+        return self.blocked.overlapping(start, end)
+
+    def buffer_conflicts(self, check_in, exclude_booking_id=None):
+        """Bookings checking out on the requested check-in date"""
+        return [
+            booking for booking in self.checkouts.get(check_in, [])
+            if booking.id != exclude_booking_id
+        ]
+
+    def conflicts(self, start, end, exclude_booking_id=None):
+        return AvailabilityConflicts(
+            bookings=self.overlapping_bookings(start, end, exclude_booking_id),
+            blocked=self.overlapping_blocked(start, end),
+            buffer=self.buffer_conflicts(start, exclude_booking_id),
+        )
+
+    def is_available(self, start, end, exclude_booking_id=None):
+        if exclude_booking_id is not None:
+            return not any(self.conflicts(start, end, exclude_booking_id))
+        return not self.is_occupied(start, end) and not self.checkouts.get(start)
+
+    def free_windows(self, nights, window_start, window_end, preferred=None, limit=5):
+        """
+        Check-in dates for free stays of `nights` nights inside
+        [window_start, window_end), nearest to `preferred` first.
+
+        One sweep over the merged occupied intervals yields the free gaps; each
+        gap offers its check-ins stepping outward from `preferred`, and the
+        gaps are merged nearest-first until `limit` is reached. A gap that
+        opens on a booking's check-out day starts a day later (buffer rule).
+        """
+        preferred = preferred or window_start
+        stay = timedelta(days=nights)
+        gaps = []
+
+        gap_start = window_start
+        idx = bisect_right(self.occupied_ends, window_start)
+        while gap_start + stay <= window_end:
+            if idx < len(self.occupied_starts) and self.occupied_starts[idx] < window_end:
+                gap_end = self.occupied_starts[idx]
+                next_gap_start = self.occupied_ends[idx]
+                idx += 1
+            else:
+                gap_end, next_gap_start = window_end, None
+
+            first = gap_start + timedelta(days=1) if gap_start in self.checkouts else gap_start
+            last = min(gap_end, window_end) - stay
+            if first <= last:
+                gaps.append(_nearest_first(first, last, preferred))
+
+            if next_gap_start is None:
+                break
+            gap_start = max(gap_start, next_gap_start)
+
+        nearest = heapq.merge(*gaps, key=lambda day: (abs((day - preferred).days), day))
+        return list(islice(nearest, limit))
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def _current_version(property_id):
+    return AvailabilityVersion.objects.filter(property_id=property_id).values_list('version', flat=True).first() or 0
+
+
+def get_availability_index(property_id, refresh=False):
+    """
+    Return the cached index for a property, rebuilding it when it is missing,
+    expired or superseded by a newer version. Pass refresh=True to always
+    rebuild from the database.
+    """
+    version = _current_version(property_id)
+    index = _indexes.get(property_id)
+    if (
+        not refresh
+        and index is not None
+        and index.version == version
+        and time.monotonic() - index.built_at < INDEX_TTL
+    ):
+        return index
+
+    index = PropertyAvailabilityIndex.build(property_id, version)
+    # Inside a transaction the rows may still roll back; don't share them
+    if not connection.in_atomic_block:
+        with _lock:
+            _indexes[property_id] = index
+    return index
+
+
+def invalidate_availability_index(property_id):
+    """Bump the property's version with the change; drop this process's index now and on commit"""
+    _indexes.pop(property_id, None)
+    transaction.on_commit(lambda: _indexes.pop(property_id, None))
+    if AvailabilityVersion.objects.filter(property_id=property_id).update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            AvailabilityVersion.objects.create(property_id=property_id, version=1)
+    except IntegrityError:
+        # Created concurrently
+        AvailabilityVersion.objects.filter(property_id=property_id).update(version=F('version') + 1)
+
+
+def exclude_unavailable_properties(queryset, check_in, check_out):
+    """
+    Drop properties that cannot be booked for [check_in, check_out): an
+    overlapping active booking, a guest checking out on the check-in day
+    (buffer rule) or an overlapping blocked date. Runs as NOT EXISTS
+    subqueries inside the property query itself.
+    """
+    conflicting_bookings = Booking.objects.filter(
+        property=OuterRef('pk'),
+        status__in=ACTIVE_BOOKING_STATUSES,
+    ).filter(
+        Q(check_in__lt=check_out, check_out__gt=check_in) | Q(check_out=check_in)
+    )
+    conflicting_blocks = BlockedDate.objects.filter(
+        property=OuterRef('pk'),
+        start_date__lt=check_out,
+        end_date__gt=check_in,
+    )
+    return queryset.filter(~Exists(conflicting_bookings), ~Exists(conflicting_blocks))
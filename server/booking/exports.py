@@ -0,0 +1,218 @@
+"""
+Streaming admin exports.
+
+Rows are read with values_list in keyset-paginated chunks (newest first, by
+primary key) and written out as they arrive, so an export of any size keeps
+one chunk in memory - even on MySQL, whose client buffers a whole result set
+regardless of iterator(). Filters mirror the admin list views, plus an
+inclusive created_at date range. Parquet snapshots (see snapshots.py) are listed,
+refreshed and downloaded here too.
+"""
+import csv
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import filters, generics
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .models import Booking
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+EXPORT_PARAMETERS = [
+    openapi.Parameter('file_format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(EXPORT_FORMATS), description='csv (default) or ndjson'),
+    openapi.Parameter('start_date', openapi.IN_QUERY, type=openapi.TYPE_STRING, format='date', description='Created on or after (YYYY-MM-DD)'),
+    openapi.Parameter('end_date', openapi.IN_QUERY, type=openapi.TYPE_STRING, format='date', description='Created on or before (YYYY-MM-DD)'),
+]
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+class StreamingExportView(generics.GenericAPIView):
+    """
+    Base for admin exports. Subclasses set queryset, the filter attributes of
+    the matching list view, export_name and columns - (lookup, header) pairs
+    whose first lookup is the primary key.
+    """
+    permission_classes = [IsAdminUser]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    pagination_class = None
+    export_name = 'export'
+    columns = ()
+
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response({'error': f'file_format must be one of: {", ".join(EXPORT_FORMATS)}'}, status=400)
+        try:
+            start_date = self._parse_day(request.query_params.get('start_date'))
+            end_date = self._parse_day(request.query_params.get('end_date'))
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=400)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if start_date:
+            queryset = queryset.filter(created_at__date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(created_at__date__lte=end_date)
+
+        header = [column for _, column in self.columns]
+        rows = self.iter_rows(queryset, [lookup for lookup, _ in self.columns])
+        lines = csv_lines(header, rows) if file_format == 'csv' else ndjson_lines(header, rows)
+
+        content_type, extension = EXPORT_FORMATS[file_format]
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        filename = f'{self.export_name}-{timezone.localdate():%Y%m%d}.{extension}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @staticmethod
+    def _parse_day(value):
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+    @staticmethod
+    def iter_rows(queryset, lookups):
+        """values_list rows, newest first, one keyset page per query"""
+        queryset = queryset.order_by('-pk')
+        last_pk = None
+        while True:
+            page = queryset if last_pk is None else queryset.filter(pk__lt=last_pk)
+            count = 0
+            for row in page.values_list(*lookups)[:EXPORT_CHUNK_SIZE].iterator(chunk_size=EXPORT_CHUNK_SIZE):
+                yield row
+                count += 1
+            if count < EXPORT_CHUNK_SIZE:
+                return
+            last_pk = row[0]
+
+
+class AdminBookingExportView(StreamingExportView):
+    """Admin: stream all bookings as CSV or NDJSON, with the admin list filters"""
+    queryset = Booking.objects.all()
+    filterset_fields = ['status', 'property', 'user']
+    search_fields = ['booking_reference', 'full_name', 'email', 'user__email']
+    export_name = 'bookings'
+    columns = (
+        ('id', 'id'),
+        ('booking_reference', 'booking_reference'),
+        ('created_at', 'created_at'),
+        ('status', 'status'),
+        ('property_id', 'property_id'),
+        ('property__name', 'property_name'),
+        ('user__email', 'user_email'),
+        ('full_name', 'full_name'),
+        ('email', 'email'),
+        ('phone', 'phone'),
+        ('accommodation_type', 'accommodation_type'),
+        ('guest_type', 'guest_type'),
+        ('stay_type', 'stay_type'),
+        ('check_in', 'check_in'),
+        ('check_out', 'check_out'),
+        ('total_days', 'total_days'),
+        ('number_of_guests', 'number_of_guests'),
+        ('total_amount', 'total_amount'),
+        ('includes_breakfast', 'includes_breakfast'),
+        ('includes_fullboard', 'includes_fullboard'),
+        ('payment__payment_status', 'payment_status'),
+    )
+
+    @swagger_auto_schema(
+        operation_description="Export bookings as a CSV or NDJSON download (admin only)",
+        manual_parameters=EXPORT_PARAMETERS,
+        responses={200: 'Streamed file', 400: 'Bad Request'}
+    )
+    def get(self, request):
+        return super().get(request)
+
+
+# --- Parquet snapshots ---
+
+class SnapshotView(generics.GenericAPIView):
+    """Admin: list the Parquet snapshots, or bring them up to date"""
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="List snapshot partitions per table with row counts (admin only)",
+        responses={200: 'Snapshot partitions'}
+    )
+    def get(self, request):
+        from .snapshots import list_snapshots
+        return Response({'tables': list_snapshots()})
+
+    @swagger_auto_schema(
+        operation_description="Write the months updated since the last snapshot run (admin only)",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'tables': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
+                'full': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Rewrite every partition'),
+            }
+        ),
+        responses={200: 'Written partitions', 400: 'Bad Request'}
+    )
+    def post(self, request):
+        from .snapshots import SNAPSHOT_TABLES, snapshot_tables
+
+        tables = request.data.get('tables') or None
+        if tables is not None and (not isinstance(tables, list) or set(tables) - set(SNAPSHOT_TABLES)):
+            return Response({'error': f'tables must be a list of: {", ".join(SNAPSHOT_TABLES)}'}, status=400)
+        return Response({'results': snapshot_tables(tables, full=bool(request.data.get('full')))})
+
+
+class SnapshotDownloadView(generics.GenericAPIView):
+    """Admin: download one snapshot partition as a Parquet file"""
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Download a snapshot partition - YYYY-MM, or 'all' for unpartitioned tables (admin only)",
+        responses={200: 'Parquet file', 404: 'Not Found'}
+    )
+    def get(self, request, table, partition):
+        from .snapshots import SNAPSHOT_TABLES, partition_path
+
+        if table not in SNAPSHOT_TABLES:
+            return Response({'error': 'Unknown table'}, status=404)
+        if partition == 'all':
+            month = None
+        else:
+            try:
+                month = datetime.strptime(partition, '%Y-%m').date()
+            except ValueError:
+                return Response({'error': 'Partition must be YYYY-MM or all'}, status=400)
+        path = partition_path(table, month)
+        if not path.exists():
+            return Response({'error': 'Snapshot not found'}, status=404)
+        return FileResponse(
+            path.open('rb'), as_attachment=True, filename=f'{table}-{partition}.parquet',
+            content_type='application/vnd.apache.parquet',
+        )
@@ -0,0 +1,92 @@
+"""
+Night-level inventory ledger.
+
+Every occupied night is a BookedNight row and (property, night) is unique,
+so two bookings can never hold the same night: the second insert fails at
+the database instead of relying on check-then-insert validation.
+"""
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .availability import date_range
+from .models import BookedNight, BlockedDate
+
+# Booking statuses that give their nights back to the inventory
+RELEASED_STATUSES = ('cancelled',)
+
+
+class NightsUnavailable(ValidationError):
+    """Raised when a booking tries to claim nights that are already taken"""
+
+
+def claim_booking_nights(booking):
+    """
+    Write the ledger rows for a booking, replacing any it held before.
+    Cancelled bookings release their nights instead.
+    """
+    if booking.status in RELEASED_STATUSES:
+        release_booking_nights(booking)
+        return
+
+    # Bookings loaded from the database may already hold nights
+    is_new = getattr(booking, '_ledger_state', None) is None
+    previous = [] if is_new else list(booking.nights.values_list('night', flat=True))
+    rows = [
+        BookedNight(property_id=booking.property_id, night=night, booking=booking)
+        for night in date_range(booking.check_in, booking.check_out)
+    ]
+    try:
+        with transaction.atomic():
+            if previous:
+                booking.nights.all().delete()
+            BookedNight.objects.bulk_create(rows)
+    except IntegrityError:
+        taken = BookedNight.objects.filter(
+            property_id=booking.property_id,
+            night__gte=booking.check_in,
+            night__lt=booking.check_out,
+        ).exclude(booking=booking).values_list('night', flat=True)
+        raise NightsUnavailable(
+            "Property is not available for the selected dates. Already booked: "
+            + ', '.join(night.isoformat() for night in sorted(taken))
+        )
+
+    if previous:
+        reclaim_blocked_nights(booking.property_id, min(previous), max(previous) + timedelta(days=1))
+
+
+def release_booking_nights(booking):
+    """Free a booking's nights and hand them to any block covering them"""
+    nights = list(booking.nights.values_list('night', flat=True))
+    if not nights:
+        return
+    booking.nights.all().delete()
+    reclaim_blocked_nights(booking.property_id, min(nights), max(nights) + timedelta(days=1))
+
+
+def claim_blocked_nights(blocked):
+    """
+    Write the ledger rows for a blocked date. Nights already held by a
+    booking stay with the booking and pass to the block when it is released.
+    """
+    blocked.nights.all().delete()
+    BookedNight.objects.bulk_create(
+        [
+            BookedNight(property_id=blocked.property_id, night=night, blocked_date=blocked)
+            for night in date_range(blocked.start_date, blocked.end_date)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def reclaim_blocked_nights(property_id, start_date, end_date):
+    """Give free nights in [start_date, end_date) back to the blocks covering them"""
+    blocks = BlockedDate.objects.filter(
+        property_id=property_id,
+        start_date__lt=end_date,
+        end_date__gt=start_date,
+    )
+    for blocked in blocks:
+        claim_blocked_nights(blocked)
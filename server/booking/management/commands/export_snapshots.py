@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from booking.snapshots import SNAPSHOT_TABLES, snapshot_dir, snapshot_tables
+
+
+class Command(BaseCommand):
+    help = "Write month-partitioned Parquet snapshots of the reporting tables for offline analysis"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', action='append', choices=list(SNAPSHOT_TABLES), help="Only this table (repeatable)")
+        parser.add_argument('--full', action='store_true', help="Rewrite every partition instead of the months updated since the last run")
+
+    def handle(self, *args, **options):
+        for result in snapshot_tables(options['table'], full=options['full']):
+            self.stdout.write(self.style.SUCCESS(
+                f"{result['table']}: {result['mode']}, {result['rows']} row(s) in {len(result['partitions'])} partition(s)"
+            ))
+        self.stdout.write(f"Snapshots in {snapshot_dir()}")
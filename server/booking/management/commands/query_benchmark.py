@@ -0,0 +1,159 @@
+import contextlib
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from booking.models import Booking
+from booking.pipeline import BookingPipeline
+from booking.reports import PropertyReportsView
+from booking.views import BookingListCreateView
+from properties.models import Property, PropertyPricing
+
+
+# Transaction control is not work done by the endpoint
+TRANSACTION_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT')
+
+
+def count_queries(queries):
+    return sum(1 for query in queries if not query['sql'].upper().startswith(TRANSACTION_STATEMENTS))
+
+
+class Command(BaseCommand):
+    help = (
+        "Count database queries of hot endpoints against throwaway data. Bookings "
+        "are created in autocommit mode, as in production, and deleted afterwards "
+        "(their reference numbers stay used); the report scenarios are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Requests per scenario")
+        parser.add_argument(
+            '--properties', type=int, nargs='+', default=[1, 10, 50],
+            help="Property counts to run the report scenarios with"
+        )
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        runs = options['runs']
+
+        # Outside any transaction, so the reference allocator and the
+        # availability index behave as they do for a real request
+        property_obj = self._make_property()
+        try:
+            # Warm the per-process caches and the day's rollup row so both
+            # paths start from the same state
+            self.bench_booking_create(property_obj, 1, offset=2 * runs)
+            baseline = self.bench_booking_create(property_obj, runs, baseline=True)
+            pipeline = self.bench_booking_create(property_obj, runs, offset=runs)
+            results = [
+                ('POST /bookings/ (baseline: Booking.save derives the values again)', baseline),
+                ('POST /bookings/', pipeline),
+            ]
+        finally:
+            Booking.objects.filter(property=property_obj).delete()
+            PropertyPricing.objects.filter(property=property_obj).delete()
+            property_obj.delete()
+
+        with transaction.atomic():
+            results.extend(self.bench_property_reports(sorted(options['properties'])))
+            transaction.set_rollback(True)
+
+        for name, counts in results:
+            self.stdout.write(
+                f"{name}: first={counts[0]} warm={counts[-1]} "
+                f"mean={sum(counts) / len(counts):.1f} over {len(counts)} request(s)"
+            )
+        self.stdout.write(
+            f"POST /bookings/ baseline vs new: {sum(baseline) / len(baseline):.1f} -> "
+            f"{sum(pipeline) / len(pipeline):.1f} queries per request"
+        )
+
+    def _make_property(self):
+        property_obj = Property.objects.create(
+            name='Query Benchmark', location='Benchmark', country='Kenya',
+            price=Decimal('100'), description='Throwaway benchmark property', max_guests=6
+        )
+        PropertyPricing.objects.create(
+            property=property_obj, accommodation_type='full_apartment', guest_type='all',
+            stay_type='short_term', min_nights=1, max_nights=9, price_per_night=Decimal('120')
+        )
+        PropertyPricing.objects.create(
+            property=property_obj, accommodation_type='full_apartment', guest_type='all',
+            stay_type='long_term', min_nights=10, price_per_night=Decimal('90')
+        )
+        return property_obj
+
+    def _request(self, view, method, path, data, user=None):
+        request = getattr(self.factory, method)(path, data, format='json' if method == 'post' else None)
+        if user is not None:
+            force_authenticate(request, user=user)
+        else:
+            request.user = AnonymousUser()
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request)
+        if response.status_code >= 400:
+            self.stderr.write(f"{method.upper()} {path} -> {response.status_code}: {response.data}")
+        return response, count_queries(queries.captured_queries)
+
+    def bench_booking_create(self, property_obj, runs, offset=0, baseline=False):
+        """
+        Query counts of booking creation, one stay per request on free dates.
+        The baseline drops the serializer's pipeline values before the model
+        is saved, as creation worked before BookingPipeline.
+        """
+        counts = []
+        start = timezone.now().date() + timedelta(days=30)
+        # No outbound mail while benchmarking
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(mock.patch.object(BookingListCreateView, '_send_booking_created_emails'))
+            if baseline:
+                stack.enter_context(mock.patch.object(BookingPipeline, 'values', return_value={}))
+            for i in range(offset, offset + runs):
+                check_in = start + timedelta(days=5 * i)
+                data = {
+                    'property': property_obj.id,
+                    'accommodation_type': 'full_apartment',
+                    'check_in': check_in.isoformat(),
+                    'check_out': (check_in + timedelta(days=3)).isoformat(),
+                    'number_of_guests': 2,
+                    'full_name': 'Benchmark Guest',
+                    'email': 'benchmark@example.com',
+                    'phone': '+254712345678',
+                }
+                _, count = self._request(BookingListCreateView.as_view(), 'post', '/bookings/', data)
+                counts.append(count)
+        return counts
+
+    def bench_property_reports(self, property_counts):
+        """Query counts of the property report as the number of properties grows"""
+        admin = get_user_model().objects.create(
+            email='benchmark-admin@example.com', first_name='Benchmark', last_name='Admin',
+            is_staff=True, is_superuser=True
+        )
+        results = []
+        today = timezone.now().date()
+        existing = Property.objects.count()
+        for target in property_counts:
+            # Each new property gets one confirmed stay inside the report window
+            while Property.objects.count() < existing + target:
+                property_obj = self._make_property()
+                Booking.objects.create(
+                    property=property_obj, accommodation_type='full_apartment',
+                    check_in=today - timedelta(days=5), check_out=today - timedelta(days=2),
+                    full_name='Benchmark Guest', email='benchmark@example.com',
+                    phone='+254712345678', status='confirmed'
+                )
+            counts = [
+                self._request(PropertyReportsView.as_view(), 'get', '/reports/properties/', {'days': 30}, user=admin)[1]
+                for _ in range(2)
+            ]
+            results.append((f'GET /reports/properties/ with {target} more properties', counts))
+        return results
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from booking.occupancy import rebuild_occupancy
+from properties.models import Property
+
+
+class Command(BaseCommand):
+    help = "Rebuild the occupancy bitmaps of properties from their bookings and blocked dates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--property', type=int, action='append', dest='property_ids',
+                            help="Property ID (repeatable, default: all properties)")
+
+    def handle(self, *args, **options):
+        properties = Property.objects.order_by('id')
+        if options['property_ids']:
+            properties = properties.filter(id__in=options['property_ids'])
+
+        total = 0
+        for property_id in properties.values_list('id', flat=True):
+            total += rebuild_occupancy(property_id)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} bitmap(s) for {properties.count()} property(ies)"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from booking.rollups import rebuild_booking_rollups, rebuild_payment_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily booking and payment report rollups from the raw tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings-only', action='store_true', help="Skip the payment rollups")
+        parser.add_argument('--payments-only', action='store_true', help="Skip the booking rollups")
+
+    def handle(self, *args, **options):
+        if not options['payments_only']:
+            count = rebuild_booking_rollups()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} booking rollup row(s)"))
+        if not options['bookings_only']:
+            count = rebuild_payment_rollups()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} payment rollup row(s)"))
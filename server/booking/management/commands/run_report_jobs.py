@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.report_jobs import claim_next_job, purge_expired_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Compute queued report jobs and store their results"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **options):
+        purge_expired_jobs()
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                purge_expired_jobs()
+                continue
+
+            started = time.monotonic()
+            run_job(job)
+            message = f"{job.report} job #{job.pk} {job.status} in {time.monotonic() - started:.2f}s"
+            if job.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(message))
+            else:
+                self.stderr.write(message)
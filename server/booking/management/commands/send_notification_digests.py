@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from booking.notifications import DIGEST_MODES, send_digests
+
+
+class Command(BaseCommand):
+    help = "Queue hourly/daily digests of booking and payment events for property contacts (run from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', action='append', choices=DIGEST_MODES, help="Only this digest mode (repeatable)")
+
+    def handle(self, *args, **options):
+        count = send_digests(options['mode'] or DIGEST_MODES)
+        self.stdout.write(self.style.SUCCESS(f"Queued {count} digest email(s)"))
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.8 on 2026-10-15 08:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_alter_booking_user'),
+        ('properties', '0018_alter_propertyimage_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blockeddate',
+            index=models.Index(fields=['property', 'start_date', 'end_date'], name='blocked_property_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['property', 'status', 'check_in', 'check_out'], name='booking_property_dates_idx'),
+        ),
+    ]
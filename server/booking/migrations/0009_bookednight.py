@@ -0,0 +1,62 @@
+# Generated by Django 5.0.8 on 2026-10-15 08:58
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_booked_nights(apps, schema_editor):
+    """Fill the ledger from existing bookings, then blocked dates. Nights that
+    existing data already double-books stay with the first claimant."""
+    Booking = apps.get_model('booking', 'Booking')
+    BlockedDate = apps.get_model('booking', 'BlockedDate')
+    BookedNight = apps.get_model('booking', 'BookedNight')
+
+    def nights(start, end):
+        return [start + timedelta(days=i) for i in range((end - start).days)]
+
+    rows = []
+    for booking in Booking.objects.exclude(status='cancelled').order_by('created_at').iterator():
+        rows.extend(
+            BookedNight(property_id=booking.property_id, night=night, booking_id=booking.id)
+            for night in nights(booking.check_in, booking.check_out)
+        )
+    BookedNight.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+    rows = []
+    for blocked in BlockedDate.objects.iterator():
+        rows.extend(
+            BookedNight(property_id=blocked.property_id, night=night, blocked_date_id=blocked.id)
+            for night in nights(blocked.start_date, blocked.end_date)
+        )
+    BookedNight.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_booking_blockeddate_dates_indexes'),
+        ('properties', '0018_alter_propertyimage_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookedNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField()),
+                ('blocked_date', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='booking.blockeddate')),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='booking.booking')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_nights', to='properties.property')),
+            ],
+            options={
+                'ordering': ['property', 'night'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bookednight',
+            constraint=models.UniqueConstraint(fields=('property', 'night'), name='unique_property_night'),
+        ),
+        migrations.RunPython(backfill_booked_nights, migrations.RunPython.noop),
+    ]
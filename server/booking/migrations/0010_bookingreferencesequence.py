@@ -0,0 +1,42 @@
+# Generated by Django 5.0.8 on 2026-10-15 08:58
+
+from django.db import migrations, models
+import re
+
+
+def seed_reference_sequences(apps, schema_editor):
+    """Start each year's sequence after the highest reference already issued"""
+    Booking = apps.get_model('booking', 'Booking')
+    BookingReferenceSequence = apps.get_model('booking', 'BookingReferenceSequence')
+    pattern = re.compile(r'^#BK-(\d{4})-(\d+)$')
+
+    highest = {}
+    for reference in Booking.objects.values_list('booking_reference', flat=True).iterator():
+        match = pattern.match(reference or '')
+        if match:
+            year, number = int(match.group(1)), int(match.group(2))
+            highest[year] = max(highest.get(year, 0), number)
+
+    BookingReferenceSequence.objects.bulk_create([
+        BookingReferenceSequence(year=year, next_value=number + 1)
+        for year, number in highest.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_bookednight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingReferenceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(unique=True)),
+                ('next_value', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(seed_reference_sequences, migrations.RunPython.noop),
+    ]
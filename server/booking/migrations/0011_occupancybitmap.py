@@ -0,0 +1,75 @@
+# Generated by Django 5.0.8 on 2026-10-15 09:07
+
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import date
+from django.db import migrations, models
+
+
+def backfill_occupancy_bitmaps(apps, schema_editor):
+    """One bitmap per property-year with nights, bit N = day N of the year"""
+    Booking = apps.get_model('booking', 'Booking')
+    BlockedDate = apps.get_model('booking', 'BlockedDate')
+    OccupancyBitmap = apps.get_model('booking', 'OccupancyBitmap')
+
+    layers = defaultdict(lambda: {'booked': 0, 'pending': 0, 'blocked': 0})
+
+    def paint(property_id, start, end, name):
+        while start < end:
+            year_start = date(start.year, 1, 1)
+            stop = min(end, date(start.year + 1, 1, 1))
+            first, last = (start - year_start).days, (stop - year_start).days
+            layers[(property_id, start.year)][name] |= ((1 << (last - first)) - 1) << first
+            start = stop
+
+    status_layers = {'pending': 'pending', 'confirmed': 'booked', 'completed': 'booked'}
+    for property_id, check_in, check_out, status in Booking.objects.filter(
+        status__in=status_layers.keys()
+    ).values_list('property_id', 'check_in', 'check_out', 'status').iterator():
+        paint(property_id, check_in, check_out, status_layers[status])
+    for property_id, start_date, end_date in BlockedDate.objects.values_list(
+        'property_id', 'start_date', 'end_date'
+    ).iterator():
+        paint(property_id, start_date, end_date, 'blocked')
+
+    OccupancyBitmap.objects.bulk_create(
+        [
+            OccupancyBitmap(
+                property_id=property_id, year=year,
+                **{name: bits.to_bytes(46, 'little') for name, bits in year_layers.items()}
+            )
+            for (property_id, year), year_layers in layers.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_bookingreferencesequence'),
+        ('properties', '0018_alter_propertyimage_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancyBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('booked', models.BinaryField(default=bytes, help_text='Nights of confirmed and completed bookings')),
+                ('pending', models.BinaryField(default=bytes, help_text='Nights of pending bookings')),
+                ('blocked', models.BinaryField(default=bytes, help_text='Blocked nights')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_bitmaps', to='properties.property')),
+            ],
+            options={
+                'ordering': ['property', 'year'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='occupancybitmap',
+            constraint=models.UniqueConstraint(fields=('property', 'year'), name='unique_property_year_bitmap'),
+        ),
+        migrations.RunPython(backfill_occupancy_bitmaps, migrations.RunPython.noop),
+    ]
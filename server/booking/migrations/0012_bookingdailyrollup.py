@@ -0,0 +1,56 @@
+# Generated by Django 5.0.8 on 2026-10-15 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import BooleanField, Count, ExpressionWrapper, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_booking_rollups(apps, schema_editor):
+    """Sum existing bookings per creation day and report dimension"""
+    Booking = apps.get_model('booking', 'Booking')
+    BookingDailyRollup = apps.get_model('booking', 'BookingDailyRollup')
+
+    rows = Booking.objects.annotate(day=TruncDate('created_at')).values(
+        'day', 'property_id', 'status', 'guest_type', 'accommodation_type', 'stay_type',
+        registered=ExpressionWrapper(Q(user__isnull=False), output_field=BooleanField()),
+    ).annotate(
+        bookings=Count('id'), revenue=Sum('total_amount'), nights=Sum('total_days')
+    ).order_by()
+    BookingDailyRollup.objects.bulk_create([BookingDailyRollup(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0011_occupancybitmap'),
+        ('properties', '0018_alter_propertyimage_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('completed', 'Completed')], max_length=20)),
+                ('guest_type', models.CharField(choices=[('international', 'International'), ('local', 'Local')], max_length=20)),
+                ('accommodation_type', models.CharField(choices=[('master_bedroom', 'Master Bedroom'), ('full_apartment', 'Full Apartment')], max_length=20)),
+                ('stay_type', models.CharField(choices=[('short_term', 'Short Term'), ('long_term', 'Long Term'), ('weekly', 'Weekly')], max_length=20)),
+                ('registered', models.BooleanField(help_text='Booked from a user account rather than as a guest')),
+                ('bookings', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('nights', models.IntegerField(default=0)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_rollups', to='properties.property')),
+            ],
+            options={
+                'ordering': ['day', 'property'],
+                'indexes': [models.Index(fields=['property', 'day'], name='booking_rollup_property_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bookingdailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'property', 'status', 'guest_type', 'accommodation_type', 'stay_type', 'registered'), name='unique_booking_rollup'),
+        ),
+        migrations.RunPython(backfill_booking_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.8 on 2026-10-15 09:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0013_reportjob'),
+        ('properties', '0019_propertycontact_notification_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(choices=[('booking_created', 'New booking'), ('booking_cancelled', 'Booking cancelled'), ('refund_initiated', 'Refund initiated'), ('payment_completed', 'Payment completed'), ('payment_failed', 'Payment failed')], max_length=20)),
+                ('detail', models.CharField(blank=True, help_text='Amount, reason or status shown in the digest line', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_events', to='booking.booking')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_events', to='properties.property')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['property', 'created_at'], name='notification_property_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.8 on 2026-10-15 09:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0014_notificationevent'),
+        ('properties', '0020_pricingversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityVersion',
+            fields=[
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='availability_version', serialize=False, to='properties.property')),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
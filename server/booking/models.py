@@ -1,13 +1,17 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from properties.models import Property, PropertyPricing
-from decimal import Decimal
 from django.core.exceptions import ValidationError
-import phonenumbers
-from phonenumbers import geocoder
+from .pipeline import BookingPipeline
 
 User = get_user_model()
 
+# Booking fields summarised by BookingDailyRollup (see booking/rollups.py)
+BOOKING_REPORT_FIELDS = (
+    'created_at', 'property_id', 'status', 'guest_type', 'accommodation_type',
+    'stay_type', 'user_id', 'total_amount', 'total_days',
+)
+
 
 class Booking(models.Model):
     STATUS_CHOICES = [
@@ -77,145 +81,85 @@ class Booking(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['property', 'status', 'check_in', 'check_out'], name='booking_property_dates_idx'),
+        ]
         
     def __str__(self):
         user_email = self.user.email if self.user else "No User"
         return f"{self.booking_reference} - {user_email}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._ledger_state = instance._night_ledger_state()
+        instance._rollup_state = instance._report_state()
+        return instance
+    
+    def _report_state(self):
+        """Fields that decide which daily report rollup row counts this booking, and how"""
+        return tuple(self.__dict__.get(field) for field in BOOKING_REPORT_FIELDS)
+    
+    def _night_ledger_state(self):
+        """Fields that decide which nights this booking holds in the inventory ledger"""
+        return tuple(self.__dict__.get(field) for field in ('property_id', 'check_in', 'check_out', 'status'))
+    
     def save(self, *args, **kwargs):
         # Generate booking reference if not exists
         if not self.booking_reference:
-            # Format: #BK-YEAR-ID
-            last_booking = Booking.objects.order_by('-id').first()
-            next_id = (last_booking.id + 1) if last_booking else 1
-            from datetime import datetime
-            year = datetime.now().year
-            self.booking_reference = f"#BK-{year}-{next_id:04d}"
+            # Format: #BK-YEAR-NNNN, numbers come from the per-year sequence
+            from .references import booking_references
+            self.booking_reference = booking_references.next_reference()
         
         # Calculate total days if not provided
         if not self.total_days and self.check_in and self.check_out:
             delta = self.check_out - self.check_in
             self.total_days = delta.days
         
-        # Determine stay type based on total_days if not set
-        if not self.stay_type and self.total_days and self.property:
-            # Check if property has weekly pricing and if nights is a multiple of 7
-            has_weekly_pricing = PropertyPricing.objects.filter(
-                property=self.property,
-                accommodation_type=self.accommodation_type,
-                stay_type='weekly'
-            ).exists()
-            
-            if self.total_days % 7 == 0 and has_weekly_pricing:
-                # Multiples of 7 (7, 14, 21, 28...) use weekly pricing if available
-                self.stay_type = 'weekly'
-            elif self.total_days >= 10:
-                self.stay_type = 'long_term'
-            elif self.total_days < 7:
-                self.stay_type = 'short_term'
+        # Derive whatever the caller didn't resolve. Bookings created through
+        # the API arrive with a BookingPipeline's values, so nothing is looked up here.
+        if self.property_id and not (self.stay_type and self.guest_type and self.selected_pricing_id):
+            pipeline = BookingPipeline.for_booking(self)
+            if self.stay_type:
+                pipeline.stay_type = self.stay_type
             else:
-                # 8 or 9 nights - check what's available
-                self.stay_type = 'short_term'
-        elif not self.stay_type and self.total_days:
-            # Fallback if no property context
-            if self.total_days == 7:
-                self.stay_type = 'weekly'
-            elif self.total_days >= 10:
-                self.stay_type = 'long_term'
+                self.stay_type = pipeline.stay_type
+            if self.guest_type:
+                pipeline.guest_type = self.guest_type
             else:
-                self.stay_type = 'short_term'
+                self.guest_type = pipeline.guest_type
+            if not self.selected_pricing_id:
+                # Prefer smallest capacity that fits, else any pricing for the stay
+                self.selected_pricing = pipeline.selected_pricing or pipeline.fallback_pricing()
         
-        # Auto-determine guest_type from user's country_of_residence and property location
-        if not self.guest_type and self.user and self.user.country_of_residence and self.property:
-            # User is local if their country matches the property's country
-            user_country = self.user.country_of_residence.lower()
-            property_country = self.property.country.lower()
-            
-            if user_country == property_country:
-                self.guest_type = 'local'
-            else:
-                self.guest_type = 'international'
-        elif not self.guest_type and self.phone and self.property:
-            # For guest bookings, determine from phone number
-            try:
-                parsed = phonenumbers.parse(self.phone, None)
-                if not phonenumbers.is_valid_number(parsed):
-                    raise ValidationError({
-                        'phone': 'Please provide a valid phone number with country code (e.g., +254712345678).'
-                    })
-                
-                phone_country = geocoder.description_for_number(parsed, "en")
-                if phone_country:
-                    property_country = self.property.country.lower()
-                    if phone_country.lower() == property_country:
-                        self.guest_type = 'local'
-                    else:
-                        self.guest_type = 'international'
-                else:
-                    self.guest_type = 'international'
-            except phonenumbers.NumberParseException:
-                raise ValidationError({
-                    'phone': 'Invalid phone number format. Please include country code (e.g., +254712345678).'
-                })
-        elif not self.guest_type:
-            # Fallback default
-            self.guest_type = 'international'
-        
-        # Find matching PropertyPricing if not already selected
-        if not self.selected_pricing and self.property:
-            # Try specific guest_type first
-            pricing = PropertyPricing.objects.filter(
-                property=self.property,
-                accommodation_type=self.accommodation_type,
-                guest_type=self.guest_type,
-                stay_type=self.stay_type,
-                min_nights__lte=self.total_days
-            ).filter(
-                models.Q(max_nights__isnull=True) | models.Q(max_nights__gte=self.total_days)
+        # Calculate total amount based on selected pricing
+        if self.total_days and self.property_id:
+            self.total_amount = BookingPipeline.total_amount_for(
+                self.selected_pricing, self.property, self.total_days
             )
-            
-            # If not found, try 'all'
-            if not pricing.exists():
-                pricing = PropertyPricing.objects.filter(
-                    property=self.property,
-                    accommodation_type=self.accommodation_type,
-                    guest_type='all',
-                    stay_type=self.stay_type,
-                    min_nights__lte=self.total_days
-                ).filter(
-                    models.Q(max_nights__isnull=True) | models.Q(max_nights__gte=self.total_days)
-                )
-            
-            # Filter by number_of_guests - find pricing where capacity >= requested guests
-            pricing_with_capacity = pricing.filter(
-                models.Q(number_of_guests__gte=self.number_of_guests) | 
-                models.Q(number_of_guests__isnull=True)
-            ).order_by('number_of_guests').first()  # Prefer smallest capacity that fits
-            
-            if pricing_with_capacity:
-                self.selected_pricing = pricing_with_capacity
-            else:
-                # Use any available pricing as fallback
-                self.selected_pricing = pricing.first()
+            if self.selected_pricing:
+                # Update meal inclusions from pricing
+                self.includes_breakfast = self.selected_pricing.includes_breakfast
+                self.includes_fullboard = self.selected_pricing.includes_fullboard
         
-        # Calculate total amount based on selected pricing
-        if self.selected_pricing and self.total_days:
-            # Use weekly_price for multiples of 7 if weekly price exists
-            if self.selected_pricing.weekly_price and self.total_days % 7 == 0:
-                num_weeks = self.total_days // 7
-                self.total_amount = self.selected_pricing.weekly_price * num_weeks
-            else:
-                # Use per-night price
-                self.total_amount = self.selected_pricing.price_per_night * Decimal(str(self.total_days))
-            
-            # Update meal inclusions from pricing
-            self.includes_breakfast = self.selected_pricing.includes_breakfast
-            self.includes_fullboard = self.selected_pricing.includes_fullboard
-        elif self.property and self.total_days:
-            # Fallback to base property price if no pricing found
-            self.total_amount = Decimal(str(self.property.price)) * Decimal(str(self.total_days))
-            
-        super().save(*args, **kwargs)
+        # Save and claim/release nights in the inventory ledger together, so a
+        # booking whose nights are already taken is never stored
+        ledger_state = self._night_ledger_state()
+        previous_state = getattr(self, '_ledger_state', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if ledger_state != previous_state:
+                from .inventory import claim_booking_nights
+                from .occupancy import BOOKING_STATUS_LAYERS, mark_occupancy, refresh_occupancy
+                claim_booking_nights(self)
+                # Old and new nights of the booking in the occupancy bitmaps
+                if previous_state is None:
+                    if self.status in BOOKING_STATUS_LAYERS:
+                        mark_occupancy(self.property_id, self.check_in, self.check_out, BOOKING_STATUS_LAYERS[self.status])
+                else:
+                    refresh_occupancy(*previous_state[:3])
+                    refresh_occupancy(self.property_id, self.check_in, self.check_out)
+        self._ledger_state = ledger_state
 
 
 
@@ -233,6 +177,9 @@ class BlockedDate(models.Model):
     
     class Meta:
         ordering = ['start_date']
+        indexes = [
+            models.Index(fields=['property', 'start_date', 'end_date'], name='blocked_property_dates_idx'),
+        ]
         verbose_name = 'Blocked Date'
         verbose_name_plural = 'Blocked Dates'
     
@@ -245,6 +192,224 @@ class BlockedDate(models.Model):
             if self.end_date <= self.start_date:
                 raise ValidationError("End date must be after start date.")
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._dates_state = instance._blocked_dates_state()
+        return instance
+    
+    def _blocked_dates_state(self):
+        return tuple(self.__dict__.get(field) for field in ('property_id', 'start_date', 'end_date'))
+    
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        dates_state = self._blocked_dates_state()
+        previous_state = getattr(self, '_dates_state', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            from .inventory import claim_blocked_nights
+            claim_blocked_nights(self)
+            if dates_state != previous_state:
+                from .occupancy import mark_occupancy, refresh_occupancy
+                if previous_state is None:
+                    mark_occupancy(*dates_state, 'blocked')
+                else:
+                    refresh_occupancy(*previous_state)
+                    refresh_occupancy(*dates_state)
+        self._dates_state = dates_state
+
+
+class BookingReferenceSequence(models.Model):
+    """Next free number for #BK-YEAR-NNNN booking references, one row per year"""
+    year = models.PositiveIntegerField(unique=True)
+    next_value = models.PositiveIntegerField(default=1)
+    
+    def __str__(self):
+        return f"{self.year}: {self.next_value}"
+
+
+class AvailabilityVersion(models.Model):
+    """
+    Counter bumped whenever a property's bookings or blocked dates change.
+    Workers compare it with the version of their cached availability index
+    (see availability.py), so a write in one worker reaches all of them.
+    """
+    property = models.OneToOneField(Property, on_delete=models.CASCADE, primary_key=True, related_name='availability_version')
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.property_id}: v{self.version}"
+
+
+class BookedNight(models.Model):
+    """
+    Inventory ledger: one row per occupied night of a property, held by either
+    a booking or a blocked date. The unique (property, night) constraint turns
+    a double booking into a database error.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='booked_nights')
+    night = models.DateField()
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, null=True, blank=True, related_name='nights')
+    blocked_date = models.ForeignKey(BlockedDate, on_delete=models.CASCADE, null=True, blank=True, related_name='nights')
+    
+    class Meta:
+        ordering = ['property', 'night']
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'night'], name='unique_property_night'),
+        ]
+    
+    def __str__(self):
+        return f"{self.property_id} - {self.night}"
+
+
+class OccupancyBitmap(models.Model):
+    """
+    Nights of one property-year as bitmaps: bit N is day N of the year.
+    Separate layers for confirmed (and completed) stays, pending stays and
+    blocked dates. Kept in step with bookings and blocks by booking/occupancy.py.
+    """
+    LAYERS = ('booked', 'pending', 'blocked')
+    
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='occupancy_bitmaps')
+    year = models.PositiveSmallIntegerField()
+    booked = models.BinaryField(default=bytes, help_text="Nights of confirmed and completed bookings")
+    pending = models.BinaryField(default=bytes, help_text="Nights of pending bookings")
+    blocked = models.BinaryField(default=bytes, help_text="Blocked nights")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['property', 'year']
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'year'], name='unique_property_year_bitmap'),
+        ]
+    
+    def __str__(self):
+        return f"{self.property_id} - {self.year}"
+    
+    def layer(self, name):
+        """A layer as an int, bit N set if night N is taken"""
+        return int.from_bytes(bytes(getattr(self, name) or b''), 'little')
+    
+    def set_layer(self, name, bits):
+        # 366 nights fit in 46 bytes
+        setattr(self, name, bits.to_bytes(46, 'little'))
+
+
+class BookingDailyRollup(models.Model):
+    """
+    Bookings created on one day, summed per property, status, guest type,
+    accommodation type, stay type and account/guest checkout. Kept up to date
+    by the booking signals and read by the report endpoints instead of the
+    Booking table.
+    """
+    day = models.DateField()
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='booking_rollups')
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    guest_type = models.CharField(max_length=20, choices=Booking.GUEST_TYPE_CHOICES)
+    accommodation_type = models.CharField(max_length=20, choices=Booking.ACCOMMODATION_TYPE_CHOICES)
+    stay_type = models.CharField(max_length=20, choices=Booking.STAY_TYPE_CHOICES)
+    registered = models.BooleanField(help_text="Booked from a user account rather than as a guest")
+    bookings = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    nights = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['day', 'property']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'property', 'status', 'guest_type', 'accommodation_type', 'stay_type', 'registered'],
+                name='unique_booking_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['property', 'day'], name='booking_rollup_property_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} - {self.property_id} - {self.status}: {self.bookings}"
+
+
+class DashboardVersion(models.Model):
+    """
+    Single row counting booking and payment changes. The dashboard summary is
+    cached per process under this version, so a change made in one worker
+    invalidates the payload in all of them.
+    """
+    version = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"v{self.version}"
+
+
+class ReportJob(models.Model):
+    """
+    A report computed outside the request cycle by the run_report_jobs worker.
+    Jobs with the same report and parameters share one result until it expires.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    REPORT_CHOICES = [
+        ('bookings', 'Booking report'),
+        ('payments', 'Payment report'),
+        ('properties', 'Property report'),
+        ('stay_analytics', 'Stay-date analytics'),
+        ('pace', 'Pace report'),
+    ]
+    
+    report = models.CharField(max_length=30, choices=REPORT_CHOICES)
+    params = models.JSONField(default=dict, blank=True, help_text="Query parameters of the report")
+    params_hash = models.CharField(max_length=64, help_text="Hash of report and parameters, for reusing results")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField(null=True, blank=True)
+    result_status = models.PositiveSmallIntegerField(null=True, blank=True, help_text="HTTP status the report returned")
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, help_text="Result is reused until then")
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['params_hash', 'status'], name='report_job_params_idx'),
+            models.Index(fields=['status', 'created_at'], name='report_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.report} #{self.pk} ({self.status})"
+
+
+class NotificationEvent(models.Model):
+    """
+    Log of booking and payment events for property contacts. Contacts on
+    immediate mode are emailed as it happens; send_notification_digests turns
+    the log into one hourly or daily email for the others.
+    """
+    EVENT_CHOICES = [
+        ('booking_created', 'New booking'),
+        ('booking_cancelled', 'Booking cancelled'),
+        ('refund_initiated', 'Refund initiated'),
+        ('payment_completed', 'Payment completed'),
+        ('payment_failed', 'Payment failed'),
+    ]
+
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='notification_events')
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='notification_events')
+    event = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    detail = models.CharField(max_length=255, blank=True, help_text="Amount, reason or status shown in the digest line")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['property', 'created_at'], name='notification_property_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_event_display()} - {self.booking_id}"
@@ -0,0 +1,116 @@
+"""
+Property contact notifications.
+
+Every booking and payment event is appended to the NotificationEvent log.
+Contacts on immediate mode get the event's email right away; hourly and daily
+contacts get one digest per period from send_notification_digests, which
+reads the log for all due contacts in one query and queues the digests in
+the email outbox. Periods end on the hour (hourly) or at local midnight
+(daily), so running the command more often than that is harmless.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import NotificationEvent
+from properties.models import PropertyContact
+from users.models import OutboundEmail
+from users.utils import send_normal_email
+
+DIGEST_MODES = ('hourly', 'daily')
+# Events older than this are no longer needed by any digest
+NOTIFICATION_LOG_KEEP = timedelta(days=7)
+
+
+def notify_contacts(booking, event, subject, message, detail=''):
+    """Log an event for the booking's property and email the contacts on immediate mode"""
+    NotificationEvent.objects.create(property_id=booking.property_id, booking=booking, event=event, detail=(detail or '')[:255])
+    contact_emails = booking.property.contacts.filter(
+        notification_mode='immediate'
+    ).exclude(email='').values_list('email', flat=True)
+    for email in contact_emails:
+        send_normal_email({
+            'email_body': message,
+            'email_subject': subject,
+            'to_email': email
+        })
+
+
+def period_end(mode, now):
+    """End of the last complete digest period at `now`"""
+    local = timezone.localtime(now)
+    if mode == 'hourly':
+        return local.replace(minute=0, second=0, microsecond=0)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _period_start(mode, end):
+    return end - (timedelta(hours=1) if mode == 'hourly' else timedelta(days=1))
+
+
+def render_digest(contact, events):
+    """Subject and body of one contact's digest"""
+    property_name = contact.property.name
+    lines = []
+    for event in events:
+        booking = event.booking
+        line = (
+            f"{timezone.localtime(event.created_at):%d %b %H:%M}  {event.get_event_display()}  "
+            f"{booking.booking_reference}  {booking.full_name}  "
+            f"{booking.check_in:%d %b} - {booking.check_out:%d %b %Y}"
+        )
+        lines.append(f"{line}  ({event.detail})" if event.detail else line)
+
+    subject = f"[Admin] {len(events)} booking update(s) — {property_name}"
+    body = (
+        f"Hi {contact.name},\n\n"
+        f"Booking and payment activity for {property_name} "
+        f"({contact.get_notification_mode_display().lower()}):\n\n"
+        + "\n".join(lines)
+        + "\n\nSee the booking dashboard for details.\n"
+    )
+    return subject, body
+
+
+def send_digests(modes=DIGEST_MODES, now=None):
+    """Queue a digest for every due contact with events in its period; returns how many were queued"""
+    now = now or timezone.now()
+    ends = {mode: period_end(mode, now) for mode in modes}
+    due = []
+    for contact in PropertyContact.objects.filter(notification_mode__in=modes).exclude(email='').select_related('property'):
+        end = ends[contact.notification_mode]
+        if contact.last_digest_at is None or contact.last_digest_at < end:
+            # A contact that has never had a digest starts with the last period
+            start = contact.last_digest_at or _period_start(contact.notification_mode, end)
+            due.append((contact, start, end))
+    if not due:
+        return 0
+
+    events_by_property = {}
+    events = NotificationEvent.objects.filter(
+        property_id__in={contact.property_id for contact, _, _ in due},
+        created_at__gt=min(start for _, start, _ in due),
+        created_at__lte=max(end for _, _, end in due),
+    ).select_related('booking')
+    for event in events:
+        events_by_property.setdefault(event.property_id, []).append(event)
+
+    emails = []
+    for contact, start, end in due:
+        contact_events = [
+            event for event in events_by_property.get(contact.property_id, [])
+            if start < event.created_at <= end
+        ]
+        if contact_events:
+            subject, body = render_digest(contact, contact_events)
+            emails.append(OutboundEmail(to_email=contact.email, subject=subject[:255], body=body))
+
+    with transaction.atomic():
+        OutboundEmail.objects.bulk_create(emails)
+        for mode, end in ends.items():
+            PropertyContact.objects.filter(
+                pk__in=[contact.pk for contact, _, _ in due if contact.notification_mode == mode]
+            ).update(last_digest_at=end)
+    NotificationEvent.objects.filter(created_at__lt=now - NOTIFICATION_LOG_KEEP).delete()
+    return len(emails)
@@ -0,0 +1,230 @@
+"""
+Occupancy grids and per-property occupancy bitmaps.
+
+A grid has one row per property and one byte per night in the window. Rows
+are filled with slice assignments (one per booking or block, no per-day
+loop) and run-length encoded with a regex scan, so a 90 day x 30 property
+grid stays a few KB on the wire.
+
+OccupancyBitmap keeps one bit per night and property-year for booked,
+pending and blocked nights. Bookings and blocks refresh the bits of the
+nights they touch when they change; refresh_occupancy recomputes a date
+range from the rows, so overlapping blocks never clear each other's bits.
+Reads are popcounts and masks over a couple of small rows.
+"""
+import re
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .models import Booking, BlockedDate, OccupancyBitmap
+
+# Night status codes, later ones win where intervals overlap
+FREE = b'f'
+PENDING = b'p'
+CONFIRMED = b'c'
+BLOCKED = b'b'
+
+STATUS_LEGEND = {'f': 'free', 'p': 'pending', 'c': 'confirmed', 'b': 'blocked'}
+
+# Completed stays occupied their nights like confirmed ones
+BOOKING_STATUS_CODES = {'pending': PENDING, 'confirmed': CONFIRMED, 'completed': CONFIRMED}
+
+# Bitmap layer for each booking status that holds nights
+BOOKING_STATUS_LAYERS = {'pending': 'pending', 'confirmed': 'booked', 'completed': 'booked'}
+
+# Night codes of the bitmap layers, in the order they are painted
+LAYER_CODES = (('pending', PENDING), ('booked', CONFIRMED), ('blocked', BLOCKED))
+
+_RUNS = re.compile(rb'(.)\1*', re.DOTALL)
+
+
+def run_length_encode(row):
+    """b'fffppc' -> '3f2p1c'"""
+    return ''.join(f'{len(run.group())}{chr(run.group()[0])}' for run in _RUNS.finditer(row))
+
+
+def _fill(row, start, end, window_start, days, code):
+    first = max((start - window_start).days, 0)
+    last = min((end - window_start).days, days)
+    if first < last:
+        row[first:last] = code * (last - first)
+
+
+def build_occupancy_grid(property_ids, window_start, days):
+    """
+    {property_id: bytearray of night codes} for [window_start, window_start + days),
+    from one booking query and one blocked-date query.
+    """
+    window_end = window_start + timedelta(days=days)
+    grid = {property_id: bytearray(FREE * days) for property_id in property_ids}
+
+    bookings = Booking.objects.filter(
+        property_id__in=property_ids,
+        status__in=BOOKING_STATUS_CODES.keys(),
+        check_in__lt=window_end,
+        check_out__gt=window_start,
+    ).values_list('property_id', 'check_in', 'check_out', 'status')
+    # Pending first so confirmed nights overwrite them
+    for property_id, check_in, check_out, booking_status in sorted(
+        bookings, key=lambda row: BOOKING_STATUS_CODES[row[3]] == CONFIRMED
+    ):
+        _fill(grid[property_id], check_in, check_out, window_start, days, BOOKING_STATUS_CODES[booking_status])
+
+    blocked = BlockedDate.objects.filter(
+        property_id__in=property_ids,
+        start_date__lt=window_end,
+        end_date__gt=window_start,
+    ).values_list('property_id', 'start_date', 'end_date')
+    for property_id, start_date, end_date in blocked:
+        _fill(grid[property_id], start_date, end_date, window_start, days, BLOCKED)
+
+    return grid
+
+
+# --- Occupancy bitmaps ---
+
+def _year_spans(start, end):
+    """Split [start, end) into (year, first_bit, last_bit) per calendar year"""
+    while start < end:
+        next_year = date(start.year + 1, 1, 1)
+        year_start = date(start.year, 1, 1)
+        stop = min(end, next_year)
+        yield start.year, (start - year_start).days, (stop - year_start).days
+        start = stop
+
+
+def _mask(first, last):
+    return ((1 << (last - first)) - 1) << first
+
+
+def _paint(layers, start, end, name):
+    for year, first, last in _year_spans(start, end):
+        layers[year][name] |= _mask(first, last)
+
+
+def _occupancy_rows(property_id, start=None, end=None):
+    bookings = Booking.objects.filter(
+        property_id=property_id, status__in=BOOKING_STATUS_LAYERS.keys()
+    )
+    blocks = BlockedDate.objects.filter(property_id=property_id)
+    if start and end:
+        bookings = bookings.filter(check_in__lt=end, check_out__gt=start)
+        blocks = blocks.filter(start_date__lt=end, end_date__gt=start)
+    return (
+        bookings.values_list('check_in', 'check_out', 'status'),
+        blocks.values_list('start_date', 'end_date'),
+    )
+
+
+def _layers_from_rows(bookings, blocks, start=None, end=None):
+    """{year: {layer: bits}} for the rows, clipped to [start, end) if given"""
+    layers = defaultdict(lambda: dict.fromkeys(OccupancyBitmap.LAYERS, 0))
+    for check_in, check_out, booking_status in bookings:
+        _paint(layers, max(check_in, start or check_in), min(check_out, end or check_out),
+               BOOKING_STATUS_LAYERS[booking_status])
+    for start_date, end_date in blocks:
+        _paint(layers, max(start_date, start or start_date), min(end_date, end or end_date), 'blocked')
+    return layers
+
+
+def refresh_occupancy(property_id, start, end):
+    """Recompute the bitmap bits of [start, end) from the bookings and blocks covering it"""
+    if not (property_id and start and end) or start >= end:
+        return
+    bookings, blocks = _occupancy_rows(property_id, start, end)
+    layers = _layers_from_rows(bookings, blocks, start, end)
+
+    with transaction.atomic():
+        for year, first, last in _year_spans(start, end):
+            bitmap, _ = OccupancyBitmap.objects.select_for_update().get_or_create(
+                property_id=property_id, year=year
+            )
+            keep = ~_mask(first, last)
+            for name in OccupancyBitmap.LAYERS:
+                bitmap.set_layer(name, (bitmap.layer(name) & keep) | layers[year][name])
+            bitmap.save()
+
+
+def mark_occupancy(property_id, start, end, name):
+    """Set the bits of [start, end) in one layer; enough for a new booking or block"""
+    with transaction.atomic():
+        for year, first, last in _year_spans(start, end):
+            bitmap, _ = OccupancyBitmap.objects.select_for_update().get_or_create(
+                property_id=property_id, year=year
+            )
+            bitmap.set_layer(name, bitmap.layer(name) | _mask(first, last))
+            bitmap.save()
+
+
+def rebuild_occupancy(property_id):
+    """Replace all bitmaps of a property with ones built from scratch"""
+    bookings, blocks = _occupancy_rows(property_id)
+    layers = _layers_from_rows(bookings, blocks)
+
+    bitmaps = []
+    for year, year_layers in sorted(layers.items()):
+        bitmap = OccupancyBitmap(property_id=property_id, year=year)
+        for name, bits in year_layers.items():
+            bitmap.set_layer(name, bits)
+        bitmaps.append(bitmap)
+
+    with transaction.atomic():
+        OccupancyBitmap.objects.filter(property_id=property_id).delete()
+        OccupancyBitmap.objects.bulk_create(bitmaps)
+    return len(bitmaps)
+
+
+class OccupancyView:
+    """Bitmaps of some properties over a date window, read with one query"""
+
+    def __init__(self, property_ids, start, end):
+        self.start = start
+        self.end = end
+        self.bitmaps = {
+            (bitmap.property_id, bitmap.year): bitmap
+            for bitmap in OccupancyBitmap.objects.filter(
+                property_id__in=property_ids,
+                year__gte=start.year,
+                year__lte=(end - timedelta(days=1)).year,
+            )
+        }
+
+    def _slices(self, property_id, name, start=None, end=None):
+        """(bits, first, last) for each year of [start, end)"""
+        for year, first, last in _year_spans(start or self.start, end or self.end):
+            bitmap = self.bitmaps.get((property_id, year))
+            bits = bitmap.layer(name) if bitmap else 0
+            yield bits, first, last
+
+    def count(self, property_id, *layers, start=None, end=None):
+        """Nights set in any of the layers, by popcount"""
+        total = 0
+        for year, first, last in _year_spans(start or self.start, end or self.end):
+            bitmap = self.bitmaps.get((property_id, year))
+            if bitmap:
+                bits = 0
+                for name in layers or OccupancyBitmap.LAYERS:
+                    bits |= bitmap.layer(name)
+                total += (bits & _mask(first, last)).bit_count()
+        return total
+
+    def is_free(self, property_id, night):
+        """True if no layer has the night set"""
+        return not self.count(property_id, start=night, end=night + timedelta(days=1))
+
+    def night_codes(self, property_id):
+        """Night codes (see STATUS_LEGEND) for the window, one byte per night"""
+        days = (self.end - self.start).days
+        row = bytearray(FREE * days)
+        for name, code in LAYER_CODES:
+            offset = 0
+            for bits, first, last in self._slices(property_id, name):
+                width = last - first
+                # Runs of set bits, lowest night first
+                layer = format((bits >> first) & ((1 << width) - 1), f'0{width}b')[::-1]
+                for run in re.finditer('1+', layer):
+                    row[offset + run.start():offset + run.end()] = code * (run.end() - run.start())
+                offset += width
+        return row
@@ -0,0 +1,132 @@
+"""
+Booking creation pipeline.
+
+Derives everything a booking needs beyond the submitted fields - nights,
+stay type, guest type, the selected PropertyPricing and the total - each
+exactly once. BookingCreateRequestSerializer builds one while validating
+and hands its values to the model, so Booking.save has nothing left to look
+up; Booking.save builds one itself only for values that are still missing
+(admin and shell-created bookings).
+"""
+from decimal import Decimal
+from functools import cached_property
+
+from django.core.exceptions import ValidationError
+
+from properties.pricing import PricingTable, get_pricing_table
+from users.phone import resolve_phone
+
+
+class BookingPipeline:
+    """Derived values of a single booking, computed lazily and only once"""
+
+    def __init__(self, property_obj, accommodation_type, check_in, check_out,
+                 number_of_guests=None, user=None, phone=None):
+        self.property = property_obj
+        self.accommodation_type = accommodation_type
+        self.check_in = check_in
+        self.check_out = check_out
+        self.number_of_guests = number_of_guests
+        self.user = user
+        self.phone = phone
+
+    @classmethod
+    def for_booking(cls, booking):
+        return cls(
+            booking.property, booking.accommodation_type, booking.check_in, booking.check_out,
+            number_of_guests=booking.number_of_guests, user=booking.user, phone=booking.phone,
+        )
+
+    @classmethod
+    def from_quote(cls, quote, property_obj, pricing, user=None, phone=None):
+        """A pipeline whose derived values come from a redeemed price quote"""
+        pipeline = cls(
+            property_obj, quote.accommodation_type, quote.check_in, quote.check_out,
+            number_of_guests=quote.number_of_guests, user=user, phone=phone,
+        )
+        pipeline.stay_type = quote.stay_type
+        pipeline.guest_type = quote.guest_type
+        pipeline.selected_pricing = pricing
+        return pipeline
+
+    @cached_property
+    def total_nights(self):
+        return (self.check_out - self.check_in).days
+
+    @cached_property
+    def pricing_table(self):
+        return get_pricing_table(self.property.id)
+
+    @cached_property
+    def stay_type(self):
+        # Multiples of 7 use weekly pricing if the property has it
+        return self.pricing_table.stay_type_for(self.accommodation_type, self.total_nights)
+
+    @cached_property
+    def guest_type(self):
+        """Local if the user's country, or else the phone's country, is the property's"""
+        property_country = (self.property.country or '').lower()
+        user_country = getattr(self.user, 'country_of_residence', None)
+        if self.user and self.user.is_authenticated and user_country:
+            return 'local' if user_country.lower() == property_country else 'international'
+        if not self.phone:
+            return 'international'
+
+        phone = resolve_phone(self.phone)
+        if not phone.parseable:
+            raise ValidationError({
+                'phone': 'Invalid phone number format. Please include country code (e.g., +254712345678).'
+            })
+        if not phone.is_valid:
+            raise ValidationError({
+                'phone': 'Please provide a valid phone number with country code (e.g., +254712345678).'
+            })
+
+        if phone.country and phone.country.lower() == property_country:
+            return 'local'
+        return 'international'
+
+    @cached_property
+    def selected_pricing(self):
+        """Smallest-capacity rule that fits the guests, or None"""
+        return self.pricing_table.select(
+            self.accommodation_type, self.guest_type, self.stay_type,
+            self.total_nights, self.number_of_guests
+        )
+
+    def fallback_pricing(self):
+        """Any rule for the stay, ignoring capacity"""
+        candidates = self.pricing_table.candidates(
+            self.accommodation_type, self.guest_type, self.stay_type, self.total_nights
+        )
+        return candidates[0] if candidates else None
+
+    def max_capacity(self):
+        return self.pricing_table.max_capacity(self.accommodation_type, self.stay_type)
+
+    def diagnose(self, user_country=None):
+        """Error payload explaining why no pricing matched"""
+        return self.pricing_table.diagnose(
+            self.property, self.accommodation_type, self.guest_type, self.stay_type,
+            self.total_nights, user_country=user_country
+        )
+
+    @staticmethod
+    def total_amount_for(pricing, property_obj, nights):
+        if pricing:
+            return PricingTable.total_for(pricing, nights)
+        # Fallback to base property price if no pricing found
+        return Decimal(str(property_obj.price)) * Decimal(str(nights))
+
+    def values(self):
+        """Model field values for the booking"""
+        pricing = self.selected_pricing
+        return {
+            'total_days': self.total_nights,
+            'stay_type': self.stay_type,
+            'guest_type': self.guest_type,
+            'selected_pricing': pricing,
+            'total_amount': self.total_amount_for(pricing, self.property, self.total_nights),
+            'includes_breakfast': pricing.includes_breakfast if pricing else False,
+            'includes_fullboard': pricing.includes_fullboard if pricing else False,
+        }
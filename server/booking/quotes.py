@@ -0,0 +1,47 @@
+"""
+Signed price quotes.
+
+CalculatePriceView hands out a short-lived token, signed with SECRET_KEY,
+that records what the quote resolved: property, dates, accommodation, guest
+and stay type, the selected PropertyPricing and the total. Booking creation
+redeems the token instead of deriving all of that again; only the
+availability check is repeated.
+"""
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+
+QUOTE_SALT = 'booking.quote'
+
+QUOTE_MAX_AGE = getattr(settings, 'BOOKING_QUOTE_MAX_AGE', 900)
+
+Quote = namedtuple('Quote', [
+    'property_id', 'check_in', 'check_out', 'accommodation_type', 'number_of_guests',
+    'guest_type', 'stay_type', 'pricing_id', 'total_amount', 'user_id', 'phone',
+])
+
+
+def sign_quote(quote):
+    """Serialize and sign a Quote"""
+    payload = quote._asdict()
+    payload['check_in'] = quote.check_in.isoformat()
+    payload['check_out'] = quote.check_out.isoformat()
+    payload['total_amount'] = str(quote.total_amount)
+    return signing.dumps(payload, salt=QUOTE_SALT, compress=True)
+
+
+def load_quote(token, max_age=QUOTE_MAX_AGE):
+    """Return the Quote in a token, or None if it is tampered, malformed or expired"""
+    try:
+        payload = signing.loads(token, salt=QUOTE_SALT, max_age=max_age)
+        return Quote(**{
+            **payload,
+            'check_in': date.fromisoformat(payload['check_in']),
+            'check_out': date.fromisoformat(payload['check_out']),
+            'total_amount': Decimal(payload['total_amount']),
+        })
+    except (signing.BadSignature, TypeError, KeyError, ValueError, ArithmeticError):
+        return None
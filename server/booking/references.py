@@ -0,0 +1,55 @@
+"""
+Booking reference allocator.
+
+References look like #BK-2026-0042. Numbers come from a per-year
+BookingReferenceSequence row, but each worker reserves a block of them at a
+time and hands them out from memory, so creating a booking neither scans the
+bookings table nor contends on the sequence row. Numbers are unique but not
+gap-free, and references from different workers may interleave.
+"""
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import BookingReferenceSequence
+
+BLOCK_SIZE = getattr(settings, 'BOOKING_REFERENCE_BLOCK_SIZE', 20)
+
+
+class BookingReferenceAllocator:
+    def __init__(self, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self._blocks = {}  # year -> [next_value, limit]
+        self._lock = threading.Lock()
+
+    def next_reference(self, year=None):
+        year = year or timezone.localdate().year
+        return f"#BK-{year}-{self.next_value(year):04d}"
+
+    def next_value(self, year):
+        with self._lock:
+            block = self._blocks.get(year)
+            if block is None or block[0] >= block[1]:
+                # Inside an outer transaction the reservation could still be
+                # rolled back, so take a single number and don't keep a block
+                if connection.in_atomic_block:
+                    return self._reserve(year, 1)
+                start = self._reserve(year, self.block_size)
+                block = self._blocks[year] = [start, start + self.block_size]
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def _reserve(self, year, size):
+        """Move the year's sequence forward by `size` and return the first number"""
+        with transaction.atomic():
+            sequence, _ = BookingReferenceSequence.objects.select_for_update().get_or_create(year=year)
+            start = sequence.next_value
+            sequence.next_value = start + size
+            sequence.save(update_fields=['next_value'])
+        return start
+
+
+booking_references = BookingReferenceAllocator()
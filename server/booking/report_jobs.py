@@ -0,0 +1,101 @@
+"""
+Report jobs.
+
+Clients POST a report name and its query parameters and get a ReportJob
+back. The run_report_jobs worker claims pending jobs, runs the report view's
+report(params) outside any request and stores the rendered JSON. A job for
+the same report and parameters reuses a result that hasn't expired yet, or
+attaches to one that is still queued or running.
+"""
+import hashlib
+import json
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import ReportJob
+
+REPORT_JOB_TTL = getattr(settings, 'REPORT_JOB_TTL', 600)
+# Running jobs older than this are assumed to belong to a dead worker
+REPORT_JOB_TIMEOUT = getattr(settings, 'REPORT_JOB_TIMEOUT', 900)
+
+
+def report_views():
+    from .reports import (
+        BookingReportsView, PaceReportView, PaymentReportsView, PropertyReportsView, StayAnalyticsView,
+    )
+    return {
+        'bookings': BookingReportsView,
+        'payments': PaymentReportsView,
+        'properties': PropertyReportsView,
+        'stay_analytics': StayAnalyticsView,
+        'pace': PaceReportView,
+    }
+
+
+def params_hash(report, params):
+    canonical = json.dumps({'report': report, 'params': params}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def enqueue_report(report, params, user=None):
+    """The job for these parameters: a live or in-flight one if any, else a new pending job"""
+    params = {key: str(value) for key, value in params.items()}
+    digest = params_hash(report, params)
+    existing = ReportJob.objects.filter(params_hash=digest).filter(
+        Q(status__in=['pending', 'running']) | Q(status='completed', expires_at__gt=timezone.now())
+    ).order_by('-created_at').first()
+    if existing:
+        return existing, False
+    job = ReportJob.objects.create(report=report, params=params, params_hash=digest, requested_by=user)
+    return job, True
+
+
+def claim_next_job():
+    """Mark the oldest pending (or abandoned running) job as running and return it"""
+    stale = timezone.now() - timedelta(seconds=REPORT_JOB_TIMEOUT)
+    with transaction.atomic():
+        job = ReportJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status='pending') | Q(status='running', started_at__lt=stale)
+        ).order_by('created_at').first()
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def run_job(job):
+    """Compute and store the job's report"""
+    params = QueryDict(mutable=True)
+    params.update(job.params)
+    try:
+        response = report_views()[job.report]().report(params)
+        job.result = json.loads(JSONRenderer().render(response.data))
+        job.result_status = response.status_code
+        job.status = 'completed'
+        job.error = ''
+    except Exception:
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+    job.completed_at = timezone.now()
+    if job.status == 'completed':
+        job.expires_at = job.completed_at + timedelta(seconds=REPORT_JOB_TTL)
+    job.save()
+    return job
+
+
+def purge_expired_jobs(keep=timedelta(days=1)):
+    """Delete finished jobs whose results expired more than `keep` ago"""
+    cutoff = timezone.now() - keep
+    deleted, _ = ReportJob.objects.filter(
+        Q(status='completed', expires_at__lt=cutoff) | Q(status='failed', completed_at__lt=cutoff)
+    ).delete()
+    return deleted
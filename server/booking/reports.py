@@ -1,18 +1,161 @@
+"""
+Admin report endpoints.
+
+All aggregates come from the daily rollup tables (BookingDailyRollup,
+PaymentDailyRollup, see booking/rollups.py) and the occupancy bitmaps, so
+their cost depends on the number of days and properties reported on, not on
+the number of bookings and payments ever made. Date filters therefore work
+on whole days of created_at.
+
+Views with parameters build their response in report(params), which
+report jobs (booking/report_jobs.py) also call outside a request.
+"""
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
-from django.db.models import Count, Sum, Avg, Q, F
-from django.db.models.functions import TruncDate, TruncMonth
+from django.db import IntegrityError, transaction
+from django.db.models import Sum, Q, F
+from django.db.models.functions import Coalesce
+from rest_framework.renderers import JSONRenderer
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import patch_cache_control, quote_etag
+from django.utils.http import http_date, parse_http_date_safe
 from datetime import datetime, timedelta
 from decimal import Decimal
-from .models import Booking
-from payment.models import Payment
+import hashlib
+import json
+import time
+from .analytics import GRANULARITIES, pace_report, stay_analytics
+from .models import Booking, BookingDailyRollup, DashboardVersion, ReportJob
+from .report_jobs import enqueue_report
+from .serializers import ReportJobCreateSerializer, ReportJobSerializer
+from .occupancy import OccupancyView
+from payment.models import Payment, PaymentDailyRollup
 from properties.models import Property
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 
+# Per-choice metrics: output key -> rollup measure to sum
+BOOKING_METRICS = {'count': 'bookings', 'revenue': 'revenue'}
+PAYMENT_METRICS = {'count': 'payments', 'total_amount': 'amount'}
+
+PROPERTY_KEYS = ('property__id', 'property__name', 'property__location')
+
+
+def _choice_aggregates(field, choices, metrics):
+    """Conditional sums for every choice of a field, named field_value_metric"""
+    return {
+        f'{field}_{value}_{name}': Sum(measure, filter=Q(**{field: value}))
+        for value, _ in choices
+        for name, measure in metrics.items()
+    }
+
+
+def _choice_breakdown(totals, field, choices, metrics, averages=None):
+    """
+    Rows like values(field).annotate(...).order_by('-count') from _choice_aggregates
+    results. averages maps extra keys to the metric to divide by the count.
+    """
+    rows = []
+    for value, _ in choices:
+        row = {field: value}
+        row.update({name: totals[f'{field}_{value}_{name}'] for name in metrics})
+        if row['count']:
+            for name, metric in (averages or {}).items():
+                row[name] = _average(row[metric], row['count'])
+            rows.append(row)
+    rows.sort(key=lambda row: row['count'], reverse=True)
+    return rows
+
+
+def _average(total, count):
+    """Mean amount, rounded to cents"""
+    if not count:
+        return Decimal('0.00')
+    return (Decimal(total or 0) / count).quantize(Decimal('0.01'))
+
+
+def _pick(row, keys):
+    return {key: row[key] for key in keys}
+
+
+def _monthly_trend(days, keys):
+    """Roll daily rows up into months, keyed the way TruncMonth would"""
+    months = {}
+    for day in days:
+        month = timezone.make_aware(datetime(day['date'].year, day['date'].month, 1))
+        row = months.setdefault(month, {'month': month, **{key: 0 for key in keys}})
+        for key in keys:
+            row[key] += day[key] or 0
+    return list(months.values())
+
+
+def _parse_day(value):
+    """A YYYY-MM-DD query parameter as a date; None if absent, ValueError if malformed"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _filter_days(rollups, params):
+    """Apply the start_date/end_date query parameters (inclusive) to a rollup queryset"""
+    start_date = _parse_day(params.get('start_date'))
+    end_date = _parse_day(params.get('end_date'))
+    if start_date:
+        rollups = rollups.filter(day__gte=start_date)
+    if end_date:
+        rollups = rollups.filter(day__lte=end_date)
+    return rollups
+
+
+INVALID_DATE = {'error': 'Invalid date format. Use YYYY-MM-DD'}
+
+DASHBOARD_CACHE_TTL = getattr(settings, 'DASHBOARD_CACHE_TTL', 30)
+
+
+def _dashboard_version():
+    return DashboardVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def _dashboard_cache_key(version):
+    # A new day starts a new entry, so "today" never comes from yesterday's payload
+    return f'dashboard-summary:{timezone.localdate().isoformat()}:v{version}'
+
+
+def _bump_dashboard_version():
+    if DashboardVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            DashboardVersion.objects.create(pk=1, version=1)
+    except IntegrityError:
+        # Created concurrently
+        DashboardVersion.objects.filter(pk=1).update(version=F('version') + 1)
+
+
+def invalidate_dashboard_summary():
+    """
+    Bump the dashboard version once the transaction commits - outside it, so
+    bookings don't queue on the one counter row - which moves every worker to
+    a new cache key and ETag.
+    """
+    transaction.on_commit(_bump_dashboard_version)
+
+
+def _not_modified(request, entry):
+    """Whether the client's If-None-Match / If-Modified-Since match the cached payload"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return entry['etag'] in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return if_modified_since is not None and entry['last_modified'] <= if_modified_since
+
+
 class BookingReportsView(APIView):
     """Comprehensive booking reports and statistics"""
     permission_classes = [IsAdminUser]
@@ -27,120 +170,89 @@ class BookingReportsView(APIView):
         responses={200: 'Detailed booking reports'}
     )
     def get(self, request):
-        # Get filters from query params
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        property_id = request.query_params.get('property_id')
-        
-        # Base queryset
-        bookings = Booking.objects.all()
-        
-        # Apply filters
-        if start_date:
-            bookings = bookings.filter(created_at__gte=start_date)
-        if end_date:
-            bookings = bookings.filter(created_at__lte=end_date)
+        return self.report(request.query_params)
+    
+    def report(self, params):
+        # Filters from query params
+        property_id = params.get('property_id')
+        try:
+            rollups = _filter_days(BookingDailyRollup.objects.all(), params)
+        except ValueError:
+            return Response(INVALID_DATE, status=400)
         if property_id:
-            bookings = bookings.filter(property_id=property_id)
-        
-        # Overall statistics
-        total_bookings = bookings.count()
-        confirmed_bookings = bookings.filter(status='confirmed').count()
-        pending_bookings = bookings.filter(status='pending').count()
-        cancelled_bookings = bookings.filter(status='cancelled').count()
-        completed_bookings = bookings.filter(status='completed').count()
+            rollups = rollups.filter(property_id=property_id)
+        
+        # Every scalar metric and per-choice breakdown in one aggregate
+        totals = rollups.aggregate(
+            total_bookings=Sum('bookings'),
+            total_revenue=Sum('revenue'),
+            total_nights=Sum('nights'),
+            user_bookings=Sum('bookings', filter=Q(registered=True)),
+            guest_bookings=Sum('bookings', filter=Q(registered=False)),
+            **_choice_aggregates('status', Booking.STATUS_CHOICES, BOOKING_METRICS),
+            **_choice_aggregates('guest_type', Booking.GUEST_TYPE_CHOICES, BOOKING_METRICS),
+            **_choice_aggregates('accommodation_type', Booking.ACCOMMODATION_TYPE_CHOICES, BOOKING_METRICS),
+            **_choice_aggregates('stay_type', Booking.STAY_TYPE_CHOICES, BOOKING_METRICS),
+        )
+        
+        total_bookings = totals['total_bookings'] or 0
+        confirmed_bookings = totals['status_confirmed_count'] or 0
+        pending_bookings = totals['status_pending_count'] or 0
+        cancelled_bookings = totals['status_cancelled_count'] or 0
+        completed_bookings = totals['status_completed_count'] or 0
         
         # Revenue statistics
-        total_revenue = bookings.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-        confirmed_revenue = bookings.filter(status='confirmed').aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-        pending_revenue = bookings.filter(status='pending').aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-        
-        # Average booking value
-        avg_booking_value = bookings.aggregate(avg=Avg('total_amount'))['avg'] or Decimal('0.00')
-        
-        # Average stay duration
-        avg_stay_duration = bookings.aggregate(avg=Avg('total_days'))['avg'] or 0
-        
-        # Bookings by status
-        by_status = list(bookings.values('status').annotate(
-            count=Count('id'),
-            revenue=Sum('total_amount')
-        ).order_by('-count'))
-        
-        # Bookings by property
-        by_property = list(bookings.values(
-            'property__id',
-            'property__name',
-            'property__location'
-        ).annotate(
-            booking_count=Count('id'),
-            total_revenue=Sum('total_amount'),
-            avg_booking_value=Avg('total_amount'),
-            avg_stay=Avg('total_days')
-        ).order_by('-booking_count'))
-        
-        # Bookings by guest type
-        by_guest_type = list(bookings.values('guest_type').annotate(
-            count=Count('id'),
-            revenue=Sum('total_amount'),
-            avg_value=Avg('total_amount')
-        ).order_by('-count'))
-        
-        # Bookings by accommodation type
-        by_accommodation = list(bookings.values('accommodation_type').annotate(
-            count=Count('id'),
-            revenue=Sum('total_amount')
-        ).order_by('-count'))
-        
-        # Bookings by stay type
-        by_stay_type = list(bookings.values('stay_type').annotate(
-            count=Count('id'),
-            revenue=Sum('total_amount')
-        ).order_by('-count'))
-        
-        # Monthly trend (last 12 months)
-        twelve_months_ago = timezone.now() - timedelta(days=365)
-        monthly_trend = list(bookings.filter(
-            created_at__gte=twelve_months_ago
-        ).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            booking_count=Count('id'),
-            revenue=Sum('total_amount')
-        ).order_by('month'))
-        
-        # Daily trend (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        daily_trend = list(bookings.filter(
-            created_at__gte=thirty_days_ago
-        ).annotate(
-            date=TruncDate('created_at')
-        ).values('date').annotate(
-            booking_count=Count('id'),
-            revenue=Sum('total_amount')
-        ).order_by('date'))
+        total_revenue = totals['total_revenue'] or Decimal('0.00')
+        confirmed_revenue = totals['status_confirmed_revenue'] or Decimal('0.00')
+        pending_revenue = totals['status_pending_revenue'] or Decimal('0.00')
+        avg_booking_value = _average(total_revenue, total_bookings)
+        avg_stay_duration = (totals['total_nights'] or 0) / total_bookings if total_bookings else 0
         
         # User vs Guest bookings
-        user_bookings = bookings.filter(user__isnull=False).count()
-        guest_bookings = bookings.filter(user__isnull=True).count()
+        user_bookings = totals['user_bookings'] or 0
+        guest_bookings = totals['guest_bookings'] or 0
+        
+        # Bookings by status, guest type, accommodation type and stay type
+        by_status = _choice_breakdown(totals, 'status', Booking.STATUS_CHOICES, BOOKING_METRICS)
+        by_guest_type = _choice_breakdown(
+            totals, 'guest_type', Booking.GUEST_TYPE_CHOICES, BOOKING_METRICS, averages={'avg_value': 'revenue'}
+        )
+        by_accommodation = _choice_breakdown(totals, 'accommodation_type', Booking.ACCOMMODATION_TYPE_CHOICES, BOOKING_METRICS)
+        by_stay_type = _choice_breakdown(totals, 'stay_type', Booking.STAY_TYPE_CHOICES, BOOKING_METRICS)
+        
+        # Bookings by property, also the source of the top-5 lists
+        by_property = []
+        for row in rollups.values(*PROPERTY_KEYS).annotate(
+            booking_count=Sum('bookings'),
+            total_revenue=Sum('revenue'),
+            total_nights=Sum('nights'),
+        ).order_by('-booking_count'):
+            nights = row.pop('total_nights') or 0
+            row['avg_booking_value'] = _average(row['total_revenue'], row['booking_count'])
+            row['avg_stay'] = nights / row['booking_count'] if row['booking_count'] else 0
+            by_property.append(row)
         
         # Top properties by revenue
-        top_properties_revenue = list(bookings.values(
-            'property__id',
-            'property__name',
-            'property__location'
-        ).annotate(
-            total_revenue=Sum('total_amount')
-        ).order_by('-total_revenue')[:5])
+        top_properties_revenue = [
+            _pick(row, PROPERTY_KEYS + ('total_revenue',))
+            for row in sorted(by_property, key=lambda row: row['total_revenue'], reverse=True)[:5]
+        ]
         
         # Top properties by booking count
-        top_properties_bookings = list(bookings.values(
-            'property__id',
-            'property__name',
-            'property__location'
-        ).annotate(
-            booking_count=Count('id')
-        ).order_by('-booking_count')[:5])
+        top_properties_bookings = [_pick(row, PROPERTY_KEYS + ('booking_count',)) for row in by_property[:5]]
+        
+        # Daily rows of the last 12 months give both the monthly (last 12
+        # months) and the daily (last 30 days) trend
+        today = timezone.localdate()
+        days = list(rollups.filter(
+            day__gt=today - timedelta(days=365)
+        ).values(date=F('day')).annotate(
+            booking_count=Sum('bookings'),
+            revenue=Sum('revenue'),
+        ).order_by('date'))
+        
+        monthly_trend = _monthly_trend(days, ('booking_count', 'revenue'))
+        daily_trend = [day for day in days if day['date'] > today - timedelta(days=30)]
         
         return Response({
             'summary': {
@@ -183,54 +295,49 @@ class PaymentReportsView(APIView):
         responses={200: 'Detailed payment reports'}
     )
     def get(self, request):
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        
-        payments = Payment.objects.all()
-        
-        if start_date:
-            payments = payments.filter(created_at__gte=start_date)
-        if end_date:
-            payments = payments.filter(created_at__lte=end_date)
+        return self.report(request.query_params)
+    
+    def report(self, params):
+        try:
+            rollups = _filter_days(PaymentDailyRollup.objects.all(), params)
+        except ValueError:
+            return Response(INVALID_DATE, status=400)
+        
+        # Every scalar metric and per-choice breakdown in one aggregate
+        totals = rollups.aggregate(
+            total_payments=Sum('payments'),
+            **_choice_aggregates('payment_status', Payment.PAYMENT_STATUS_CHOICES, PAYMENT_METRICS),
+            **_choice_aggregates('payment_method', Payment.PAYMENT_METHOD_CHOICES, PAYMENT_METRICS),
+        )
         
         # Payment statistics
-        total_payments = payments.count()
-        completed_payments = payments.filter(payment_status='completed').count()
-        pending_payments = payments.filter(payment_status='pending').count()
-        failed_payments = payments.filter(payment_status='failed').count()
+        total_payments = totals['total_payments'] or 0
+        completed_payments = totals['payment_status_completed_count'] or 0
+        pending_payments = totals['payment_status_pending_count'] or 0
+        failed_payments = totals['payment_status_failed_count'] or 0
         
         # Revenue by payment status
-        completed_amount = payments.filter(payment_status='completed').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        pending_amount = payments.filter(payment_status='pending').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        failed_amount = payments.filter(payment_status='failed').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        completed_amount = totals['payment_status_completed_total_amount'] or Decimal('0.00')
+        pending_amount = totals['payment_status_pending_total_amount'] or Decimal('0.00')
+        failed_amount = totals['payment_status_failed_total_amount'] or Decimal('0.00')
         
-        # Payments by status
-        by_status = list(payments.values('payment_status').annotate(
-            count=Count('id'),
-            total_amount=Sum('amount')
-        ).order_by('-count'))
-        
-        # Payments by method
-        by_method = list(payments.values('payment_method').annotate(
-            count=Count('id'),
-            total_amount=Sum('amount')
-        ).order_by('-count'))
+        # Payments by status and by method
+        by_status = _choice_breakdown(totals, 'payment_status', Payment.PAYMENT_STATUS_CHOICES, PAYMENT_METRICS)
+        by_method = _choice_breakdown(totals, 'payment_method', Payment.PAYMENT_METHOD_CHOICES, PAYMENT_METRICS)
         
         # Success rate
         success_rate = round((completed_payments / total_payments * 100), 2) if total_payments > 0 else 0
         failure_rate = round((failed_payments / total_payments * 100), 2) if total_payments > 0 else 0
         
-        # Monthly payment trend
-        twelve_months_ago = timezone.now() - timedelta(days=365)
-        monthly_payments = list(payments.filter(
-            created_at__gte=twelve_months_ago
-        ).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            payment_count=Count('id'),
+        # Monthly payment trend, from daily rows of the last 12 months
+        days = rollups.filter(
+            day__gt=timezone.localdate() - timedelta(days=365)
+        ).values(date=F('day')).annotate(
+            payment_count=Sum('payments'),
             total_amount=Sum('amount'),
-            completed_count=Count('id', filter=Q(payment_status='completed'))
-        ).order_by('month'))
+            completed_count=Sum('payments', filter=Q(payment_status='completed'))
+        ).order_by('date')
+        monthly_payments = _monthly_trend(days, ('payment_count', 'total_amount', 'completed_count'))
         
         return Response({
             'summary': {
@@ -254,84 +361,133 @@ class PropertyReportsView(APIView):
     """Property performance and occupancy reports"""
     permission_classes = [IsAdminUser]
     
+    DEFAULT_DAYS = 30
+    MAX_DAYS = 366
+    
     @swagger_auto_schema(
         operation_description="Get property performance reports",
+        manual_parameters=[
+            openapi.Parameter('days', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Occupancy window in nights, ending today (default 30, max 366)'),
+        ],
         responses={200: 'Property performance data'}
     )
     def get(self, request):
-        properties = Property.objects.all()
+        return self.report(request.query_params)
+    
+    def report(self, params):
+        try:
+            days = int(params.get('days', self.DEFAULT_DAYS))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= self.MAX_DAYS:
+            return Response({'error': f'days must be a whole number between 1 and {self.MAX_DAYS}'}, status=400)
+        
+        # Occupancy window: the last `days` nights
+        window_end = timezone.localdate()
+        window_start = window_end - timedelta(days=days)
+        
+        # One grouped query over the rollups for every property
+        properties = list(Property.objects.annotate(
+            total_bookings=Coalesce(Sum('booking_rollups__bookings'), 0),
+            confirmed_bookings=Coalesce(Sum('booking_rollups__bookings', filter=Q(booking_rollups__status='confirmed')), 0),
+            total_revenue=Coalesce(Sum('booking_rollups__revenue'), Decimal('0.00')),
+            confirmed_revenue=Sum('booking_rollups__revenue', filter=Q(booking_rollups__status='confirmed')),
+            total_nights=Sum('booking_rollups__nights'),
+        ).order_by('-total_revenue', 'id'))
+        
+        # Confirmed and completed nights inside the window, from the occupancy bitmaps
+        occupancy = OccupancyView([prop.id for prop in properties], window_start, window_end)
         
         property_reports = []
         for prop in properties:
-            bookings = Booking.objects.filter(property=prop)
-            
-            total_bookings = bookings.count()
-            confirmed_bookings = bookings.filter(status='confirmed').count()
-            total_revenue = bookings.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-            confirmed_revenue = bookings.filter(status='confirmed').aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-            avg_booking_value = bookings.aggregate(avg=Avg('total_amount'))['avg'] or Decimal('0.00')
-            avg_stay = bookings.aggregate(avg=Avg('total_days'))['avg'] or 0
-            
-            # Calculate occupancy rate (simplified - days booked / days in period)
-            # For last 30 days
-            thirty_days_ago = timezone.now() - timedelta(days=30)
-            recent_bookings = bookings.filter(
-                check_in__gte=thirty_days_ago,
-                status__in=['confirmed', 'completed']
-            )
-            total_booked_days = recent_bookings.aggregate(total=Sum('total_days'))['total'] or 0
-            occupancy_rate = round((total_booked_days / 30 * 100), 2) if total_booked_days else 0
-            
-            property_reports.append({
+            booked_nights = occupancy.count(prop.id, 'booked')
+            occupancy_rate = round(booked_nights / days * 100, 2)
+            report = {
                 'property_id': prop.id,
                 'property_name': prop.name,
                 'location': prop.location,
-                'total_bookings': total_bookings,
-                'confirmed_bookings': confirmed_bookings,
-                'total_revenue': str(total_revenue),
-                'confirmed_revenue': str(confirmed_revenue),
-                'avg_booking_value': str(avg_booking_value),
-                'avg_stay_duration': round(float(avg_stay), 2) if avg_stay else 0,
-                'occupancy_rate_30days': occupancy_rate,
-            })
-        
-        # Sort by revenue
-        property_reports.sort(key=lambda x: float(x['total_revenue']), reverse=True)
+                'total_bookings': prop.total_bookings,
+                'confirmed_bookings': prop.confirmed_bookings,
+                'total_revenue': str(prop.total_revenue),
+                'confirmed_revenue': str(prop.confirmed_revenue or Decimal('0.00')),
+                'avg_booking_value': str(_average(prop.total_revenue, prop.total_bookings)),
+                'avg_stay_duration': round(prop.total_nights / prop.total_bookings, 2) if prop.total_bookings else 0,
+                'booked_nights': booked_nights,
+                'occupancy_rate': occupancy_rate,
+            }
+            if days == 30:
+                # Key kept for existing dashboards
+                report['occupancy_rate_30days'] = occupancy_rate
+            property_reports.append(report)
         
         return Response({
             'properties': property_reports,
             'total_properties': len(property_reports),
+            'occupancy_window': {
+                'start_date': window_start.isoformat(),
+                'end_date': window_end.isoformat(),
+                'days': days,
+            },
         })
 
 
 class DashboardSummaryView(APIView):
-    """Quick dashboard summary for admin overview"""
+    """
+    Quick dashboard summary for admin overview. The payload is cached for
+    DASHBOARD_CACHE_TTL seconds under the current DashboardVersion (bumped
+    when a booking or payment changes) and served with ETag/Last-Modified,
+    so unchanged polls get a 304.
+    """
     permission_classes = [IsAdminUser]
     
     @swagger_auto_schema(
         operation_description="Get dashboard summary with key metrics",
-        responses={200: 'Dashboard summary'}
+        responses={200: 'Dashboard summary', 304: 'Not Modified'}
     )
     def get(self, request):
-        # Today's stats
-        today = timezone.now().date()
-        today_bookings = Booking.objects.filter(created_at__date=today).count()
-        today_revenue = Booking.objects.filter(created_at__date=today).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-        
-        # This month
-        month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        month_bookings = Booking.objects.filter(created_at__gte=month_start).count()
-        month_revenue = Booking.objects.filter(created_at__gte=month_start).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-        
-        # All time
-        total_bookings = Booking.objects.count()
-        total_revenue = Booking.objects.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+        version = _dashboard_version()
+        key = _dashboard_cache_key(version)
+        entry = cache.get(key)
+        if entry is None:
+            data = json.loads(JSONRenderer().render(self.summary()))
+            payload = json.dumps(data, sort_keys=True)
+            entry = {
+                'data': data,
+                'etag': quote_etag(hashlib.md5(f'{version}:{payload}'.encode()).hexdigest()),
+                'last_modified': int(time.time()),
+            }
+            cache.set(key, entry, DASHBOARD_CACHE_TTL)
+        
+        headers = {'ETag': entry['etag'], 'Last-Modified': http_date(entry['last_modified'])}
+        if _not_modified(request, entry):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        else:
+            response = Response(entry['data'], headers=headers)
+        # Browsers must revalidate on every poll
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    def summary(self):
+        today = timezone.localdate()
+        month_start = today.replace(day=1)
+        totals = BookingDailyRollup.objects.aggregate(
+            # Today's stats
+            today_bookings=Sum('bookings', filter=Q(day=today)),
+            today_revenue=Sum('revenue', filter=Q(day=today)),
+            # This month
+            month_bookings=Sum('bookings', filter=Q(day__gte=month_start)),
+            month_revenue=Sum('revenue', filter=Q(day__gte=month_start)),
+            # All time
+            total_bookings=Sum('bookings'),
+            total_revenue=Sum('revenue'),
+            # Pending actions
+            pending_bookings=Sum('bookings', filter=Q(status='pending')),
+        )
+        pending_payments = PaymentDailyRollup.objects.filter(
+            payment_status='pending'
+        ).aggregate(total=Sum('payments'))['total'] or 0
         total_properties = Property.objects.count()
         
-        # Pending actions
-        pending_bookings = Booking.objects.filter(status='pending').count()
-        pending_payments = Payment.objects.filter(payment_status='pending').count()
-        
         # Recent bookings
         recent_bookings = Booking.objects.select_related('property').order_by('-created_at')[:10]
         recent_bookings_data = [{
@@ -345,23 +501,195 @@ class DashboardSummaryView(APIView):
             'created_at': b.created_at,
         } for b in recent_bookings]
         
-        return Response({
+        return {
             'today': {
-                'bookings': today_bookings,
-                'revenue': str(today_revenue),
+                'bookings': totals['today_bookings'] or 0,
+                'revenue': str(totals['today_revenue'] or Decimal('0.00')),
             },
             'this_month': {
-                'bookings': month_bookings,
-                'revenue': str(month_revenue),
+                'bookings': totals['month_bookings'] or 0,
+                'revenue': str(totals['month_revenue'] or Decimal('0.00')),
             },
             'all_time': {
-                'bookings': total_bookings,
-                'revenue': str(total_revenue),
+                'bookings': totals['total_bookings'] or 0,
+                'revenue': str(totals['total_revenue'] or Decimal('0.00')),
                 'properties': total_properties,
             },
             'pending_actions': {
-                'pending_bookings': pending_bookings,
+                'pending_bookings': totals['pending_bookings'] or 0,
                 'pending_payments': pending_payments,
             },
             'recent_bookings': recent_bookings_data,
+        }
+
+
+class StayAnalyticsView(APIView):
+    """
+    Occupancy, ADR and RevPAR by stay date: each confirmed or completed
+    booking counts in the periods its nights fall in, not the day it was made.
+    """
+    permission_classes = [IsAdminUser]
+    
+    MAX_DAYS = {'day': 366, 'week': 3660, 'month': 3660}
+    
+    @swagger_auto_schema(
+        operation_description="Get stay-date occupancy, ADR and RevPAR per property and period",
+        manual_parameters=[
+            openapi.Parameter('start_date', openapi.IN_QUERY, type=openapi.TYPE_STRING, format='date', description='First night (YYYY-MM-DD, default: start of the month 11 months ago)'),
+            openapi.Parameter('end_date', openapi.IN_QUERY, type=openapi.TYPE_STRING, format='date', description='Last night (YYYY-MM-DD, default: end of this month)'),
+            openapi.Parameter('granularity', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(GRANULARITIES), description='day, week or month (default month)'),
+            openapi.Parameter('property_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Filter by property'),
+        ],
+        responses={200: 'Stay-date analytics'}
+    )
+    def get(self, request):
+        return self.report(request.query_params)
+    
+    def report(self, params):
+        granularity = params.get('granularity', 'month')
+        if granularity not in GRANULARITIES:
+            return Response({'error': f'granularity must be one of: {", ".join(GRANULARITIES)}'}, status=400)
+        
+        today = timezone.localdate()
+        this_month = today.replace(day=1)
+        try:
+            start_date = _parse_day(params.get('start_date'))
+            end_date = _parse_day(params.get('end_date'))
+        except ValueError:
+            return Response(INVALID_DATE, status=400)
+        if start_date is None:
+            start_date = (this_month - timedelta(days=320)).replace(day=1)
+        if end_date is None:
+            end_date = (this_month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        # Nights [start_date, end_date] inclusive
+        window_end = end_date + timedelta(days=1)
+        days = (window_end - start_date).days
+        if days < 1:
+            return Response({'error': 'end_date must not be before start_date'}, status=400)
+        if days > self.MAX_DAYS[granularity]:
+            return Response({'error': f'At most {self.MAX_DAYS[granularity]} days can be reported by {granularity}'}, status=400)
+        
+        properties = Property.objects.only('id', 'name')
+        property_id = params.get('property_id')
+        if property_id:
+            properties = properties.filter(id=property_id)
+        
+        return Response({
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'granularity': granularity,
+            'properties': stay_analytics(list(properties), start_date, window_end, granularity),
+        })
+
+
+class PaceReportView(APIView):
+    """On-the-books pace: how future stay months are filling compared with last year"""
+    permission_classes = [IsAdminUser]
+    
+    MAX_MONTHS = 24
+    MAX_WEEKS = 52
+    
+    @swagger_auto_schema(
+        operation_description="Get nights and revenue on the books per future stay month at weekly snapshots, versus last year",
+        manual_parameters=[
+            openapi.Parameter('months', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Stay months from the current one (default 6, max 24)'),
+            openapi.Parameter('weeks', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Weekly snapshots back from today (default 12, max 52)'),
+            openapi.Parameter('property_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Filter by property'),
+        ],
+        responses={200: 'Pace report'}
+    )
+    def get(self, request):
+        return self.report(request.query_params)
+    
+    def report(self, params):
+        try:
+            months = int(params.get('months', 6))
+            weeks = int(params.get('weeks', 12))
+        except ValueError:
+            months = weeks = -1
+        if not (1 <= months <= self.MAX_MONTHS and 0 <= weeks <= self.MAX_WEEKS):
+            return Response({
+                'error': f'months must be between 1 and {self.MAX_MONTHS} and weeks between 0 and {self.MAX_WEEKS}'
+            }, status=400)
+        
+        properties = Property.objects.all()
+        property_id = params.get('property_id')
+        if property_id:
+            properties = properties.filter(id=property_id)
+        property_ids = list(properties.values_list('id', flat=True))
+        
+        today = timezone.localdate()
+        return Response({
+            'as_of': today.isoformat(),
+            'property_ids': property_ids,
+            'months': pace_report(property_ids, today, months, weeks),
         })
+
+
+class ReportJobListCreateView(APIView):
+    """
+    Queue a report to be computed by the run_report_jobs worker, or list
+    recent jobs. Identical requests share a job while its result is fresh.
+    """
+    permission_classes = [IsAdminUser]
+    
+    @swagger_auto_schema(
+        operation_description="List the 50 most recent report jobs",
+        responses={200: ReportJobSerializer(many=True)}
+    )
+    def get(self, request):
+        jobs = ReportJob.objects.select_related('requested_by')[:50]
+        return Response(ReportJobSerializer(jobs, many=True).data)
+    
+    @swagger_auto_schema(
+        operation_description="Queue a report job. Returns 202 for a new job, 200 when an identical job is reused.",
+        request_body=ReportJobCreateSerializer,
+        responses={200: ReportJobSerializer, 202: ReportJobSerializer}
+    )
+    def post(self, request):
+        serializer = ReportJobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job, created = enqueue_report(
+            serializer.validated_data['report'], serializer.validated_data['params'], user=request.user
+        )
+        return Response(
+            ReportJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+        )
+
+
+class ReportJobDetailView(APIView):
+    """Poll a report job"""
+    permission_classes = [IsAdminUser]
+    
+    @swagger_auto_schema(
+        operation_description="Get the status of a report job",
+        responses={200: ReportJobSerializer, 404: 'Not Found'}
+    )
+    def get(self, request, pk):
+        job = get_object_or_404(ReportJob.objects.select_related('requested_by'), pk=pk)
+        return Response(ReportJobSerializer(job).data)
+
+
+class ReportJobResultView(APIView):
+    """Download the stored result of a completed report job"""
+    permission_classes = [IsAdminUser]
+    
+    @swagger_auto_schema(
+        operation_description="Get the stored JSON result of a completed report job",
+        manual_parameters=[
+            openapi.Parameter('download', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, description='Serve as a file attachment'),
+        ],
+        responses={200: 'Report result', 404: 'Not Found', 409: 'Job not completed'}
+    )
+    def get(self, request, pk):
+        job = get_object_or_404(ReportJob, pk=pk)
+        if job.status != 'completed':
+            return Response(
+                {'error': f'Report job is {job.status}', 'status': job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+        response = Response(job.result, status=job.result_status or status.HTTP_200_OK)
+        if request.query_params.get('download') in ('1', 'true', 'True'):
+            response['Content-Disposition'] = f'attachment; filename="{job.report}-report-{job.pk}.json"'
+        return response
@@ -0,0 +1,118 @@
+"""
+Daily report rollups.
+
+BookingDailyRollup and PaymentDailyRollup hold, per creation day and report
+dimension, how many bookings/payments there are and what they add up to. The
+booking and payment signals apply each save or delete as a delta: the old
+contribution of the row is subtracted and the new one added, so the report
+endpoints read a few rows per day instead of scanning the raw tables.
+
+Days are local dates of created_at, matching the TruncDate/created_at__date
+filters the reports used before. rebuild_booking_rollups and
+rebuild_payment_rollups recompute everything (see the rebuild_report_rollups
+command) in case rows were changed behind the signals' back.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import BOOKING_REPORT_FIELDS, Booking, BookingDailyRollup
+from payment.models import PAYMENT_REPORT_FIELDS, Payment, PaymentDailyRollup
+
+
+def _apply(model, key, measures, sign):
+    """Add (sign=1) or subtract (sign=-1) measures on the rollup row for key"""
+    changes = {name: F(name) + sign * value for name, value in measures.items()}
+    if model.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **{name: sign * value for name, value in measures.items()})
+    except IntegrityError:
+        # Created concurrently
+        model.objects.filter(**key).update(**changes)
+
+
+# --- Bookings ---
+
+def _booking_entry(state):
+    """Rollup key and measures of a Booking._report_state(), or None if not countable"""
+    values = dict(zip(BOOKING_REPORT_FIELDS, state))
+    if values['created_at'] is None or values['property_id'] is None:
+        return None
+    key = {
+        'day': timezone.localdate(values['created_at']),
+        'property_id': values['property_id'],
+        'status': values['status'],
+        'guest_type': values['guest_type'],
+        'accommodation_type': values['accommodation_type'],
+        'stay_type': values['stay_type'],
+        'registered': values['user_id'] is not None,
+    }
+    measures = {'bookings': 1, 'revenue': values['total_amount'] or 0, 'nights': values['total_days'] or 0}
+    return key, measures
+
+
+def update_booking_rollup(previous_state, state):
+    """Move a booking's contribution from previous_state to state (either may be None)"""
+    if previous_state == state:
+        return
+    with transaction.atomic():
+        for entry_state, sign in ((previous_state, -1), (state, 1)):
+            entry = _booking_entry(entry_state) if entry_state else None
+            if entry:
+                _apply(BookingDailyRollup, *entry, sign)
+
+
+def rebuild_booking_rollups():
+    """Recompute BookingDailyRollup from the Booking table"""
+    rows = Booking.objects.annotate(day=TruncDate('created_at')).values(
+        'day', 'property_id', 'status', 'guest_type', 'accommodation_type', 'stay_type',
+        registered=ExpressionWrapper(Q(user__isnull=False), output_field=BooleanField()),
+    ).annotate(
+        bookings=Count('id'), revenue=Sum('total_amount'), nights=Sum('total_days')
+    ).order_by()
+    rollups = [BookingDailyRollup(**row) for row in rows]
+    with transaction.atomic():
+        BookingDailyRollup.objects.all().delete()
+        BookingDailyRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+# --- Payments ---
+
+def _payment_entry(state, property_id):
+    values = dict(zip(PAYMENT_REPORT_FIELDS, state))
+    if values['created_at'] is None or property_id is None:
+        return None
+    key = {
+        'day': timezone.localdate(values['created_at']),
+        'property_id': property_id,
+        'payment_method': values['payment_method'],
+        'payment_status': values['payment_status'],
+    }
+    return key, {'payments': 1, 'amount': values['amount'] or 0}
+
+
+def update_payment_rollup(previous_state, state, property_id):
+    """Move a payment's contribution from previous_state to state (either may be None)"""
+    if previous_state == state:
+        return
+    with transaction.atomic():
+        for entry_state, sign in ((previous_state, -1), (state, 1)):
+            entry = _payment_entry(entry_state, property_id) if entry_state else None
+            if entry:
+                _apply(PaymentDailyRollup, *entry, sign)
+
+
+def rebuild_payment_rollups():
+    """Recompute PaymentDailyRollup from the Payment table"""
+    rows = Payment.objects.annotate(day=TruncDate('created_at')).values(
+        'day', 'payment_method', 'payment_status', property_id=F('booking__property_id'),
+    ).annotate(payments=Count('id'), amount=Sum('amount')).order_by()
+    rollups = [PaymentDailyRollup(**row) for row in rows]
+    with transaction.atomic():
+        PaymentDailyRollup.objects.all().delete()
+        PaymentDailyRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
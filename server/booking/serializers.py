@@ -1,12 +1,15 @@
 from rest_framework import serializers
-from .models import Booking, BlockedDate
+from .models import Booking, BlockedDate, ReportJob
+from .availability import get_availability_index
+from .inventory import NightsUnavailable
+from .quotes import load_quote
+from .pipeline import BookingPipeline
 from payment.serializers import PaymentSerializer
 from properties.models import Property
+from properties.pricing import PricingTable, get_pricing_table
+from django.core.exceptions import ValidationError as DjangoValidationError
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db import models
-import phonenumbers
-from phonenumbers import geocoder
 
 
 class PropertyBasicSerializer(serializers.ModelSerializer):
@@ -61,6 +64,8 @@ class BookingCreateRequestSerializer(serializers.ModelSerializer):
     full_name = serializers.CharField(required=False, allow_blank=True)
     email = serializers.EmailField(required=False, allow_blank=True)
     phone = serializers.CharField(required=False, allow_blank=True)
+    # Signed quote from calculate-price; skips re-deriving the price when it matches
+    quote_token = serializers.CharField(required=False, allow_blank=True, write_only=True)
     
     class Meta:
         model = Booking
@@ -68,10 +73,12 @@ class BookingCreateRequestSerializer(serializers.ModelSerializer):
             'property', 'accommodation_type', 'check_in', 'check_out',
             'number_of_guests', 'number_of_adults', 'number_of_children',
             'full_name', 'email', 'phone', 'id_passport_number',
-            'dog_included', 'jacuzzi_reservation', 'special_requests'
+            'dog_included', 'jacuzzi_reservation', 'special_requests',
+            'quote_token'
         ]
     
     def validate(self, data):
+        quote_token = data.pop('quote_token', None)
         check_in = data.get('check_in')
         check_out = data.get('check_out')
         property_obj = data.get('property')
@@ -149,325 +156,97 @@ class BookingCreateRequestSerializer(serializers.ModelSerializer):
             
             # Check property availability
             if property_obj:
-                # Check for overlapping bookings
-                overlapping_bookings = Booking.objects.filter(
-                    property=property_obj,
-                    status__in=['pending', 'confirmed'],
-                    check_in__lt=check_out,
-                    check_out__gt=check_in
-                )
-                
-                # Exclude current booking if updating
-                if self.instance:
-                    overlapping_bookings = overlapping_bookings.exclude(id=self.instance.id)
+                # Rebuild the availability index so the decision is made on
+                # current data (two queries instead of three range scans)
+                index = get_availability_index(property_obj.id, refresh=True)
+                exclude_id = self.instance.id if self.instance else None
+                conflicts = index.conflicts(check_in, check_out, exclude_booking_id=exclude_id)
                 
-                if overlapping_bookings.exists():
-                    booking_refs = ', '.join(overlapping_bookings.values_list('booking_reference', flat=True))
+                # Check for overlapping bookings
+                if conflicts.bookings:
+                    booking_refs = ', '.join(booking.booking_reference for booking in conflicts.bookings)
                     raise serializers.ValidationError(
                         f"Property is not available for the selected dates. "
                         f"Conflicting booking(s): {booking_refs}"
                     )
                 
                 # Check for blocked dates
-                blocked_dates = BlockedDate.objects.filter(
-                    property=property_obj,
-                    start_date__lt=check_out,
-                    end_date__gt=check_in
-                )
-                
-                if blocked_dates.exists():
-                    reasons = ', '.join(blocked_dates.values_list('reason', flat=True))
+                if conflicts.blocked:
+                    reasons = ', '.join(blocked.reason for blocked in conflicts.blocked)
                     raise serializers.ValidationError(
                         f"Property is blocked for the selected dates. Reason(s): {reasons}"
                     )
                 
                 # Buffer day check: prevent same-day checkout/checkin
                 # Check if someone is checking out on our check-in day
-                same_day_checkout = Booking.objects.filter(
-                    property=property_obj,
-                    status__in=['pending', 'confirmed'],
-                    check_out=check_in
-                )
-                
-                if self.instance:
-                    same_day_checkout = same_day_checkout.exclude(id=self.instance.id)
-                
-                if same_day_checkout.exists():
+                if conflicts.buffer:
                     raise serializers.ValidationError(
                         f"Cannot check in on {check_in}. Another guest is checking out on this date. "
                         "Please select the next day for check-in."
                     )
                 
-                # Validate pricing exists for this booking
-                total_nights = (check_out - check_in).days
-                
-                # Determine stay_type intelligently
-                # Check if property has weekly pricing and if nights is a multiple of 7
-                from properties.models import PropertyPricing
-                has_weekly_pricing = PropertyPricing.objects.filter(
-                    property=property_obj,
-                    accommodation_type=accommodation_type,
-                    stay_type='weekly'
-                ).exists()
-                
-                if total_nights % 7 == 0 and has_weekly_pricing:
-                    # Multiples of 7 (7, 14, 21, 28...) use weekly pricing if available
-                    stay_type = 'weekly'
-                elif total_nights >= 10:
-                    stay_type = 'long_term'
-                elif total_nights < 7:
-                    stay_type = 'short_term'
-                else:
-                    # 8 or 9 nights - check what's available
-                    stay_type = 'short_term'
-                
-                # Determine guest_type
-                if is_authenticated and user.country_of_residence:
-                    user_country = user.country_of_residence.lower()
-                    property_country = property_obj.country.lower()
-                    guest_type = 'local' if user_country == property_country else 'international'
-                else:
-                    # For guest bookings, determine from phone number
-                    guest_type = 'international'  # Default
-                    phone = data.get('phone', '')
-                    if phone:
-                        try:
-                            parsed = phonenumbers.parse(phone, None)
-                            if not phonenumbers.is_valid_number(parsed):
-                                raise serializers.ValidationError({
-                                    'phone': 'Please provide a valid phone number with country code (e.g., +254712345678).'
-                                })
-                            
-                            phone_country = geocoder.description_for_number(parsed, "en")
-                            if phone_country:
-                                property_country = property_obj.country.lower()
-                                # Compare phone country with property country
-                                if phone_country.lower() == property_country:
-                                    guest_type = 'local'
-                        except phonenumbers.NumberParseException:
-                            raise serializers.ValidationError({
-                                'phone': 'Invalid phone number format. Please include country code (e.g., +254712345678).'
-                            })
+                # A matching quote already resolved guest type, stay type and pricing
+                self.pipeline = self._redeem_quote(quote_token, data, user, is_authenticated) if quote_token else None
+                if self.pipeline:
+                    return data
                 
-                # Check if pricing exists (try specific guest_type first, then 'all_guests')
-                # First try exact guest_type match
-                pricing_query = PropertyPricing.objects.filter(
-                    property=property_obj,
-                    accommodation_type=accommodation_type,
-                    guest_type=guest_type,
-                    stay_type=stay_type,
-                    min_nights__lte=total_nights
-                ).filter(
-                    models.Q(max_nights__isnull=True) | models.Q(max_nights__gte=total_nights)
+                # Derive stay type, guest type and pricing once; create() hands
+                # the results to the model
+                self.pipeline = BookingPipeline(
+                    property_obj, accommodation_type, check_in, check_out,
+                    number_of_guests=number_of_guests, user=user, phone=data.get('phone')
                 )
+                try:
+                    pricing = self.pipeline.selected_pricing
+                except DjangoValidationError as e:
+                    raise serializers.ValidationError(e.message_dict)
                 
-                # If no match, try 'all'
-                if not pricing_query.exists():
-                    pricing_query = PropertyPricing.objects.filter(
-                        property=property_obj,
-                        accommodation_type=accommodation_type,
-                        guest_type='all',
-                        stay_type=stay_type,
-                        min_nights__lte=total_nights
-                    ).filter(
-                        models.Q(max_nights__isnull=True) | models.Q(max_nights__gte=total_nights)
-                    )
-                
-                if number_of_guests:
-                    # Check if accommodation can accommodate this many guests
-                    pricing_with_capacity = pricing_query.filter(
-                        models.Q(number_of_guests__gte=number_of_guests) | 
-                        models.Q(number_of_guests__isnull=True)
-                    )
-                    
-                    if pricing_with_capacity.exists():
-                        pricing_exists = True
-                    else:
-                        # Check max capacity for this accommodation type
-                        max_capacity = PropertyPricing.objects.filter(
-                            property=property_obj,
-                            accommodation_type=accommodation_type,
-                            stay_type=stay_type
-                        ).aggregate(models.Max('number_of_guests'))['number_of_guests__max']
-                        
-                        if max_capacity and number_of_guests > max_capacity:
-                            raise serializers.ValidationError({
-                                'number_of_guests': f'{accommodation_type.replace("_", " ").title()} accommodates maximum {max_capacity} guest(s). You requested {number_of_guests} guest(s).'
-                            })
-                        pricing_exists = False
-                else:
-                    pricing_exists = pricing_query.exists()
-                
-                if not pricing_exists:
-                    # Detailed error checking to provide helpful messages
-                    
-                    # 1. Check if the accommodation type exists at all for this property
-                    accommodation_exists = PropertyPricing.objects.filter(
-                        property=property_obj,
-                        accommodation_type=accommodation_type
-                    ).exists()
-                    
-                    if not accommodation_exists:
-                        # Accommodation type doesn't exist - show available options
-                        available_accommodations = PropertyPricing.objects.filter(
-                            property=property_obj
-                        ).values_list('accommodation_type', flat=True).distinct()
-                        
-                        # Make accommodation names more readable
-                        accommodation_display = {
-                            'master_bedroom': 'Master Bedroom',
-                            'full_apartment': 'Full Apartment'
-                        }
-                        
-                        available_names = [accommodation_display.get(acc, acc.replace('_', ' ').title()) 
-                                          for acc in available_accommodations]
-                        
+                if not pricing and number_of_guests:
+                    # Check max capacity for this accommodation type
+                    max_capacity = self.pipeline.max_capacity()
+                    if max_capacity and number_of_guests > max_capacity:
                         raise serializers.ValidationError({
-                            'success': False,
-                            'error_type': 'accommodation_unavailable',
-                            'message': f'Sorry! {property_obj.name} does not offer {accommodation_display.get(accommodation_type, accommodation_type)} accommodation.',
-                            'suggestion': f'This property offers: {", ".join(available_names)}. Would you like to select one of these instead?',
-                            'details': {
-                                'property_name': property_obj.name,
-                                'requested': accommodation_type,
-                                'available_options': list(available_accommodations)
-                            }
+                            'number_of_guests': f'{accommodation_type.replace("_", " ").title()} accommodates maximum {max_capacity} guest(s). You requested {number_of_guests} guest(s).'
                         })
-                    
-                    # 2. Check if min_nights requirement is not met
-                    min_nights_pricing = PropertyPricing.objects.filter(
-                        property=property_obj,
-                        accommodation_type=accommodation_type
-                    ).aggregate(models.Min('min_nights'))['min_nights__min']
-                    
-                    if min_nights_pricing and total_nights < min_nights_pricing:
-                        accommodation_display = {
-                            'master_bedroom': 'Master Bedroom',
-                            'full_apartment': 'Full Apartment'
-                        }
-                        raise serializers.ValidationError({
-                            'success': False,
-                            'error_type': 'minimum_nights_not_met',
-                            'message': f'{accommodation_display.get(accommodation_type, accommodation_type.replace("_", " ").title())} at {property_obj.name} requires a minimum of {min_nights_pricing} night(s).',
-                            'suggestion': f'Your booking is for {total_nights} night(s). Please extend your stay to at least {min_nights_pricing} night(s).',
-                            'details': {
-                                'property_name': property_obj.name,
-                                'accommodation_type': accommodation_type,
-                                'min_nights_required': min_nights_pricing,
-                                'requested_nights': total_nights
-                            }
-                        })
-                    
-                    # 3. Check if max_nights is exceeded for available pricing
-                    max_nights_pricing = PropertyPricing.objects.filter(
-                        property=property_obj,
-                        accommodation_type=accommodation_type,
-                        min_nights__lte=total_nights
-                    ).exclude(max_nights__isnull=True).aggregate(
-                        models.Max('max_nights')
-                    )['max_nights__max']
-                    
-                    # Check if there's any pricing without max_nights restriction
-                    has_unlimited = PropertyPricing.objects.filter(
-                        property=property_obj,
-                        accommodation_type=accommodation_type,
-                        max_nights__isnull=True
-                    ).exists()
-                    
-                    if max_nights_pricing and not has_unlimited and total_nights > max_nights_pricing:
-                        accommodation_display = {
-                            'master_bedroom': 'Master Bedroom',
-                            'full_apartment': 'Full Apartment'
-                        }
-                        raise serializers.ValidationError({
-                            'success': False,
-                            'error_type': 'maximum_nights_exceeded',
-                            'message': f'{accommodation_display.get(accommodation_type, accommodation_type.replace("_", " ").title())} at {property_obj.name} allows a maximum of {max_nights_pricing} night(s) for this booking type.',
-                            'suggestion': f'Your booking is for {total_nights} night(s). Please reduce your stay to {max_nights_pricing} night(s) or less, or contact the property for longer stays.',
-                            'details': {
-                                'property_name': property_obj.name,
-                                'accommodation_type': accommodation_type,
-                                'max_nights_allowed': max_nights_pricing,
-                                'requested_nights': total_nights
-                            }
-                        })
-                    
-                    # 3. Check what stay types are available (without guest_type filter)
-                    available_stay_types = PropertyPricing.objects.filter(
-                        property=property_obj,
-                        accommodation_type=accommodation_type
-                    ).values_list('stay_type', flat=True).distinct()
-                    
-                    # Check if the issue is stay_type/duration mismatch
-                    if available_stay_types and stay_type not in available_stay_types:
-                        # Build helpful suggestions based on available stay types
-                        stay_type_info = {
-                            'short_term': 'less than 7 nights',
-                            'weekly': 'exactly 7 nights or multiples of 7 (7, 14, 21 nights)',
-                            'long_term': '10 or more nights'
-                        }
-                        
-                        suggestions = [stay_type_info.get(st, st) for st in available_stay_types]
-                        
-                        raise serializers.ValidationError({
-                            'success': False,
-                            'error_type': 'invalid_stay_duration',
-                            'message': f'Sorry! This accommodation requires bookings of {", or ".join(suggestions)}.',
-                            'suggestion': f'Your {total_nights}-night booking doesn\'t match the available options. Please adjust your dates.',
-                            'details': {
-                                'property_name': property_obj.name,
-                                'your_nights': total_nights,
-                                'your_stay_type': stay_type,
-                                'available_stay_types': list(available_stay_types),
-                                'accommodation_type': accommodation_type
-                            }
-                        })
-                    
-                    # 4. Check if guest_type pricing exists
-                    available_for_all = PropertyPricing.objects.filter(
-                        property=property_obj,
-                        accommodation_type=accommodation_type,
-                        guest_type='all'
-                    ).exists()
-                    
-                    if not available_for_all:
-                        guest_type_available = PropertyPricing.objects.filter(
-                            property=property_obj,
-                            accommodation_type=accommodation_type,
-                            guest_type=guest_type
-                        ).exists()
-                        
-                        if not guest_type_available:
-                            raise serializers.ValidationError({
-                                'success': False,
-                                'error_type': 'guest_type_not_supported',
-                                'message': f'Sorry! This property does not accept {guest_type} guests for {accommodation_type}.',
-                                'suggestion': 'Please contact the property manager or try a different property.',
-                                'details': {
-                                    'property_name': property_obj.name,
-                                    'property_country': property_obj.country,
-                                    'user_country': getattr(user, 'country_of_residence', None) if is_authenticated else None,
-                                    'guest_type': guest_type,
-                                    'accommodation_type': accommodation_type
-                                }
-                            })
-                    
-                    # Generic pricing not available error
-                    raise serializers.ValidationError({
-                        'success': False,
-                        'error_type': 'pricing_not_available',
-                        'message': f'Sorry! No pricing available for your requested booking configuration.',
-                        'suggestion': 'Please try different dates or number of guests.',
-                        'details': {
-                            'property_name': property_obj.name,
-                            'nights': total_nights,
-                            'accommodation_type': accommodation_type,
-                            'stay_type': stay_type
-                        }
-                    })
+                
+                if not pricing:
+                    # Detailed error to provide a helpful message
+                    raise serializers.ValidationError(self.pipeline.diagnose(
+                        user_country=getattr(user, 'country_of_residence', None) if is_authenticated else None
+                    ))
         
         return data
     
+    def _redeem_quote(self, quote_token, data, user, is_authenticated):
+        """
+        Build the pipeline from a quote if the token is valid, unexpired and
+        was issued for this booking. Returns None to fall back to full pricing.
+        """
+        quote = load_quote(quote_token)
+        if quote is None:
+            return None
+        
+        property_obj = data['property']
+        phone = data.get('phone') or (user.phone_number if is_authenticated else None)
+        if (
+            quote.property_id != property_obj.id
+            or quote.check_in != data['check_in']
+            or quote.check_out != data['check_out']
+            or quote.accommodation_type != data.get('accommodation_type')
+            or quote.number_of_guests != data.get('number_of_guests')
+            or quote.user_id != (user.id if is_authenticated else None)
+            or (quote.phone is not None and quote.phone != phone)
+        ):
+            return None
+        
+        # The pricing may have been edited or removed since the quote was issued
+        pricing = get_pricing_table(property_obj.id).rule(quote.pricing_id)
+        total_nights = (quote.check_out - quote.check_in).days
+        if pricing is None or PricingTable.total_for(pricing, total_nights) != quote.total_amount:
+            return None
+        
+        return BookingPipeline.from_quote(quote, property_obj, pricing, user=user, phone=phone)
+    
     def create(self, validated_data):
         # Get user if authenticated
         user = self.context['request'].user
@@ -488,7 +267,16 @@ class BookingCreateRequestSerializer(serializers.ModelSerializer):
             validated_data['user'] = None
             # Personal details already validated to be present
         
-        return super().create(validated_data)
+        # Stay type, guest type, pricing and total resolved during validation
+        pipeline = getattr(self, 'pipeline', None)
+        if pipeline:
+            validated_data.update(pipeline.values())
+        
+        # The inventory ledger rejects nights taken since validation ran
+        try:
+            return super().create(validated_data)
+        except NightsUnavailable as e:
+            raise serializers.ValidationError(e.messages)
 
 
 class BookingSerializer(serializers.ModelSerializer):
@@ -521,6 +309,12 @@ class BookingSerializer(serializers.ModelSerializer):
             'property_name', 'property_location', 'pricing_breakdown'
         ]
     
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except NightsUnavailable as e:
+            raise serializers.ValidationError(e.messages)
+    
     def get_pricing_breakdown(self, obj):
         """Return detailed pricing information"""
         if obj.selected_pricing:
@@ -546,6 +340,8 @@ class PriceCalculationSerializer(serializers.Serializer):
     includes_fullboard = serializers.BooleanField()
     property_name = serializers.CharField()
     accommodation_type = serializers.CharField()
+    quote_token = serializers.CharField(help_text="Pass to POST /bookings/ to book at this price")
+    quote_expires_at = serializers.DateTimeField()
 
 
 class BlockedDateSerializer(serializers.ModelSerializer):
@@ -595,3 +391,23 @@ class AvailabilityDetailSerializer(serializers.Serializer):
     blocked_dates = serializers.ListField(child=serializers.DictField(), required=False)
     buffer_conflicts = serializers.ListField(child=serializers.DictField(), required=False)
     unavailable_dates = serializers.ListField(child=serializers.DateField(), required=False)
+
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """Status of a report job; the result itself is served separately"""
+    requested_by = serializers.EmailField(source='requested_by.email', read_only=True, default=None)
+    
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'report', 'params', 'status', 'result_status', 'error', 'requested_by',
+            'created_at', 'started_at', 'completed_at', 'expires_at',
+        ]
+        read_only_fields = fields
+
+
+class ReportJobCreateSerializer(serializers.Serializer):
+    """Report to run and its query parameters, as the report endpoint would take them"""
+    report = serializers.ChoiceField(choices=ReportJob.REPORT_CHOICES)
+    params = serializers.DictField(child=serializers.CharField(allow_blank=True), required=False, default=dict)
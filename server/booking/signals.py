@@ -0,0 +1,72 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Booking, BlockedDate
+from .availability import invalidate_availability_index
+from .inventory import reclaim_blocked_nights
+from .occupancy import refresh_occupancy
+from .reports import invalidate_dashboard_summary
+from .rollups import update_booking_rollup
+from properties.models import Property
+
+
+def deleted_with_property(origin):
+    """Whether a delete cascades from a Property, whose rollup rows go with it"""
+    return origin is not None and getattr(origin, 'model', type(origin)) is Property
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=BlockedDate)
+@receiver(post_delete, sender=BlockedDate)
+def invalidate_property_availability(sender, instance, **kwargs):
+    """Availability changed - drop the cached index for the property"""
+    if deleted_with_property(kwargs.get('origin')):
+        return
+    invalidate_availability_index(instance.property_id)
+
+
+@receiver(post_delete, sender=Booking)
+def reclaim_nights_of_deleted_booking(sender, instance, **kwargs):
+    """The booking's ledger rows are gone - let covering blocks take the nights"""
+    # Skip cascades (e.g. the property itself is being deleted)
+    origin = kwargs.get('origin')
+    if origin is not None and getattr(origin, 'model', type(origin)) is not Booking:
+        return
+    reclaim_blocked_nights(instance.property_id, instance.check_in, instance.check_out)
+
+
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=BlockedDate)
+def clear_occupancy_of_deleted_dates(sender, instance, **kwargs):
+    """Recompute the occupancy bits the booking or block was holding"""
+    origin = kwargs.get('origin')
+    if origin is not None and getattr(origin, 'model', type(origin)) is not sender:
+        return
+    if sender is Booking:
+        refresh_occupancy(instance.property_id, instance.check_in, instance.check_out)
+    else:
+        refresh_occupancy(instance.property_id, instance.start_date, instance.end_date)
+
+
+@receiver(post_save, sender=Booking)
+def roll_up_saved_booking(sender, instance, created, **kwargs):
+    """Move the booking's contribution in the daily report rollups"""
+    state = instance._report_state()
+    previous_state = None if created else getattr(instance, '_rollup_state', None)
+    update_booking_rollup(previous_state, state)
+    instance._rollup_state = state
+
+
+@receiver(post_delete, sender=Booking)
+def roll_up_deleted_booking(sender, instance, **kwargs):
+    if deleted_with_property(kwargs.get('origin')):
+        return
+    update_booking_rollup(getattr(instance, '_rollup_state', None) or instance._report_state(), None)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_booking_dashboard(sender, instance, **kwargs):
+    """The admin dashboard summary counts bookings - drop the cached payload"""
+    invalidate_dashboard_summary()
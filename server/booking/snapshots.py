@@ -0,0 +1,218 @@
+"""
+Columnar snapshots for analysts.
+
+Bookings, payments, properties, pricing and blocked dates are written as
+Parquet files under SNAPSHOT_DIR, one directory per table and one
+month=YYYY-MM partition per created_at month (local time), so pandas/pyarrow
+can read them as a hive-partitioned dataset instead of querying the primary
+database. Decimals keep their precision (decimal128), dates are date32 and
+datetimes UTC timestamps. Columns holding secrets or identity documents are
+left out.
+
+Tables with updated_at are snapshotted incrementally: each table keeps the
+time of its last run in _state.json and only the months with rows updated
+since then are rewritten. Rows changed with queryset.update() or deleted
+don't bump updated_at, so a --full run (which also drops partitions that no
+longer have rows) is worth scheduling now and then. Tables without
+updated_at are rewritten in full every run; they are small.
+"""
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from .models import BlockedDate, Booking
+from payment.models import Payment
+from properties.models import Property, PropertyPricing
+
+SNAPSHOT_CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+# name: (model, partitioned by created_at month, columns left out)
+SNAPSHOT_TABLES = {
+    'bookings': (Booking, True, ('id_passport_number',)),
+    'payments': (Payment, True, ('paystack_access_code', 'authorization_url')),
+    'properties': (Property, True, ('wifi_password',)),
+    'property_pricing': (PropertyPricing, False, ()),
+    'blocked_dates': (BlockedDate, True, ()),
+}
+
+STATE_FILE = '_state.json'
+
+
+def snapshot_dir():
+    return Path(getattr(settings, 'SNAPSHOT_DIR', settings.BASE_DIR / 'snapshots'))
+
+
+def table_columns(model, exclude=()):
+    """(column name, field) of the model's concrete fields, foreign keys as <name>_id"""
+    return [(field.attname, field) for field in model._meta.concrete_fields if field.name not in exclude]
+
+
+def _arrow_type(field):
+    import pyarrow as pa
+
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, models.TimeField):
+        return pa.time64('us')
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.ForeignKey):
+        return _arrow_type(field.target_field)
+    if isinstance(field, (models.IntegerField, models.AutoField)):
+        return pa.int64()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    return pa.string()
+
+
+def arrow_schema(columns):
+    import pyarrow as pa
+    return pa.schema([pa.field(name, _arrow_type(field)) for name, field in columns])
+
+
+def partition_path(table, month=None):
+    directory = snapshot_dir() / table
+    if month:
+        directory = directory / f'month={month:%Y-%m}'
+    return directory / 'data.parquet'
+
+
+def _month_range(month):
+    """Aware [start, end) of a local calendar month given as a date"""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime(month.year, month.month, 1), tz)
+    if month.month == 12:
+        end = datetime(month.year + 1, 1, 1)
+    else:
+        end = datetime(month.year, month.month + 1, 1)
+    return start, timezone.make_aware(end, tz)
+
+
+def _months(queryset):
+    return [timezone.localtime(value).date() for value in queryset.datetimes('created_at', 'month')]
+
+
+def write_partition(queryset, columns, path):
+    """Write the queryset's rows to path (atomically); returns the row count, removing the file if 0"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(columns)
+    strings = [schema.field(name).type == pa.string() for name, _ in columns]
+    data = [[] for _ in columns]
+    for row in queryset.order_by('pk').values_list(*[name for name, _ in columns]).iterator(chunk_size=SNAPSHOT_CHUNK_SIZE):
+        for values, value, is_string in zip(data, row, strings):
+            # Cloudinary and similar fields come back as objects
+            values.append(str(value) if is_string and value is not None else value)
+
+    if not data[0]:
+        if path.exists():
+            path.unlink()
+        return 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix('.parquet.tmp')
+    arrays = [pa.array(values, type=field.type) for values, field in zip(data, schema)]
+    pq.write_table(pa.Table.from_arrays(arrays, schema=schema), temporary)
+    os.replace(temporary, path)
+    return len(data[0])
+
+
+def _read_state(table):
+    path = snapshot_dir() / table / STATE_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def _write_state(table, state):
+    path = snapshot_dir() / table / STATE_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(state, indent=2))
+
+
+def snapshot_table(table, full=False):
+    """Write one table's snapshot; returns what was written"""
+    model, partitioned, exclude = SNAPSHOT_TABLES[table]
+    columns = table_columns(model, exclude)
+    started = timezone.now()
+    state = _read_state(table)
+    # A schema change rewrites everything so the partitions stay consistent
+    incremental = (
+        partitioned and not full and 'watermark' in state
+        and state.get('columns') == [name for name, _ in columns]
+        and any(name == 'updated_at' for name, _ in columns)
+    )
+
+    written = {}
+    if not partitioned:
+        written['all'] = write_partition(model.objects.all(), columns, partition_path(table))
+    else:
+        if incremental:
+            watermark = datetime.fromisoformat(state['watermark'])
+            months = _months(model.objects.filter(updated_at__gt=watermark))
+        else:
+            months = _months(model.objects.all())
+        for month in months:
+            start, end = _month_range(month)
+            queryset = model.objects.filter(created_at__gte=start, created_at__lt=end)
+            written[f'{month:%Y-%m}'] = write_partition(queryset, columns, partition_path(table, month))
+
+        if not incremental:
+            # Months whose rows were all deleted
+            for directory in (snapshot_dir() / table).glob('month=*'):
+                if directory.name.split('=', 1)[1] not in written:
+                    for path in directory.iterdir():
+                        path.unlink()
+                    directory.rmdir()
+
+    _write_state(table, {
+        'watermark': started.isoformat(),
+        'mode': 'incremental' if incremental else 'full',
+        'columns': [name for name, _ in columns],
+    })
+    return {
+        'table': table,
+        'mode': 'incremental' if incremental else 'full',
+        'partitions': written,
+        'rows': sum(written.values()),
+    }
+
+
+def snapshot_tables(tables=None, full=False):
+    return [snapshot_table(table, full=full) for table in (tables or SNAPSHOT_TABLES)]
+
+
+def list_snapshots():
+    """Every table's partitions with row counts and sizes, read from the files' metadata"""
+    import pyarrow.parquet as pq
+
+    result = []
+    for table in SNAPSHOT_TABLES:
+        _, partitioned, _ = SNAPSHOT_TABLES[table]
+        paths = sorted((snapshot_dir() / table).glob('month=*/data.parquet')) if partitioned else [partition_path(table)]
+        partitions = []
+        for path in paths:
+            if not path.exists():
+                continue
+            stat = path.stat()
+            partitions.append({
+                'partition': path.parent.name.split('=', 1)[1] if partitioned else 'all',
+                'rows': pq.read_metadata(path).num_rows,
+                'size': stat.st_size,
+                'modified': timezone.make_aware(datetime.fromtimestamp(stat.st_mtime)).isoformat(),
+            })
+        result.append({
+            'table': table,
+            'last_run': _read_state(table).get('watermark'),
+            'partitions': partitions,
+        })
+    return result
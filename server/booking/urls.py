@@ -5,17 +5,25 @@ from .views import (
     BookingCancelView,
     UserBookingsView,
     PropertyAvailabilityView,
+    AlternativeDatesView,
     PropertyCalendarView,
+    OccupancyGridView,
     AdminBookingListView,
     CalculatePriceView,
     BlockedDateListCreateView,
     BlockedDateDetailView,
 )
+from .exports import AdminBookingExportView, SnapshotDownloadView, SnapshotView
 from .reports import (
     BookingReportsView,
     PaymentReportsView,
     PropertyReportsView,
     DashboardSummaryView,
+    StayAnalyticsView,
+    PaceReportView,
+    ReportJobListCreateView,
+    ReportJobDetailView,
+    ReportJobResultView,
 )
 
 
@@ -29,18 +37,29 @@ urlpatterns = [
     
     # Property availability and calendar
     path('properties/<int:property_id>/availability/', PropertyAvailabilityView.as_view(), name='property-availability'),
+    path('properties/<int:property_id>/alternative-dates/', AlternativeDatesView.as_view(), name='property-alternative-dates'),
     path('properties/<int:property_id>/calendar/', PropertyCalendarView.as_view(), name='property-calendar'),
     
+    path('occupancy-grid/', OccupancyGridView.as_view(), name='occupancy-grid'),
+    
     # Blocked dates management
     path('blocked-dates/', BlockedDateListCreateView.as_view(), name='blocked-dates-list'),
     path('blocked-dates/<int:pk>/', BlockedDateDetailView.as_view(), name='blocked-dates-detail'),
     
     # Admin endpoints
     path('admin/bookings/', AdminBookingListView.as_view(), name='admin-bookings'),
+    path('admin/bookings/export/', AdminBookingExportView.as_view(), name='admin-bookings-export'),
     
     # Reports endpoints (Admin only)
     path('reports/dashboard/', DashboardSummaryView.as_view(), name='dashboard-summary'),
     path('reports/bookings/', BookingReportsView.as_view(), name='booking-reports'),
     path('reports/payments/', PaymentReportsView.as_view(), name='payment-reports'),
     path('reports/properties/', PropertyReportsView.as_view(), name='property-reports'),
+    path('reports/stay-analytics/', StayAnalyticsView.as_view(), name='stay-analytics'),
+    path('reports/pace/', PaceReportView.as_view(), name='pace-report'),
+    path('reports/jobs/', ReportJobListCreateView.as_view(), name='report-jobs'),
+    path('reports/jobs/<int:pk>/', ReportJobDetailView.as_view(), name='report-job-detail'),
+    path('reports/jobs/<int:pk>/result/', ReportJobResultView.as_view(), name='report-job-result'),
+    path('reports/snapshots/', SnapshotView.as_view(), name='snapshots'),
+    path('reports/snapshots/<str:table>/<str:partition>/', SnapshotDownloadView.as_view(), name='snapshot-download'),
 ]
\ No newline at end of file
@@ -7,12 +7,15 @@ from rest_framework.exceptions import PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.core.mail import send_mail
+from django.db import transaction
 from django.conf import settings
 from datetime import datetime, timedelta
-import phonenumbers
-from phonenumbers import geocoder
 from .models import Booking, BlockedDate
+from .availability import get_availability_index, date_range
+from .occupancy import STATUS_LEGEND, OccupancyView, build_occupancy_grid, run_length_encode
+from .quotes import Quote, QUOTE_MAX_AGE, sign_quote
+from .notifications import notify_contacts
+from .references import booking_references
 from payment.models import Payment
 from .serializers import (
     BookingSerializer, 
@@ -23,12 +26,12 @@ from .serializers import (
     CalendarEventSerializer,
     AvailabilityDetailSerializer,
 )
-from properties.models import Property, PropertyPricing
+from properties.models import Property
+from properties.pricing import get_pricing_table
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from decimal import Decimal
-from django.db import models as django_models
 from users.utils import send_normal_email
+from users.phone import resolve_phone
 
 class BookingListCreateView(generics.ListCreateAPIView):
     """
@@ -42,6 +45,7 @@ class BookingListCreateView(generics.ListCreateAPIView):
     POST: Create a new booking (no authentication required for guests)
         - Authenticated users: Auto-fill details from profile, link to user account
         - Guest users: Must provide full_name, email, phone manually
+        - Optional quote_token from calculate-price skips re-deriving the price
     
     Features: Filtering, search, ordering, pagination
     Use /bookings/my-bookings/ for guaranteed personal bookings only
@@ -94,9 +98,14 @@ class BookingListCreateView(generics.ListCreateAPIView):
         """Override to return full booking details in response"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        booking = serializer.save()
-
-        self._send_booking_created_emails(booking)
+        # Allocated outside the transaction so the reference allocator can
+        # hand out numbers from its reserved block instead of locking the
+        # sequence row until commit
+        booking_reference = booking_references.next_reference()
+        # The emails are queued in the outbox with the booking, not sent here
+        with transaction.atomic():
+            booking = serializer.save(booking_reference=booking_reference)
+            self._send_booking_created_emails(booking)
         
         # Return full booking details using BookingSerializer
         response_serializer = BookingSerializer(booking, context={'request': request})
@@ -132,27 +141,18 @@ class BookingListCreateView(generics.ListCreateAPIView):
             'to_email': guest_email
         })
 
-        contact_emails = list(
-            property_obj.contacts.values_list('email', flat=True).exclude(email='')
+        staff_subject = f"[Admin] New booking {ref} — {property_obj.name}"
+        staff_message = (
+            f"A new booking has been created for {property_obj.name}.\n\n"
+            f"Booking Reference: {ref}\n"
+            f"Guest: {guest_name} <{guest_email}>\n"
+            f"Check-in:  {check_in}\n"
+            f"Check-out: {check_out}\n"
+            f"Total: {currency} {booking.total_amount}\n\n"
+            f"Payment link sent to guest: {payment_link}\n"
         )
-        if contact_emails:
-            staff_subject = f"[Admin] New booking {ref} — {property_obj.name}"
-            staff_message = (
-                f"A new booking has been created for {property_obj.name}.\n\n"
-                f"Booking Reference: {ref}\n"
-                f"Guest: {guest_name} <{guest_email}>\n"
-                f"Check-in:  {check_in}\n"
-                f"Check-out: {check_out}\n"
-                f"Total: {currency} {booking.total_amount}\n\n"
-                f"Payment link sent to guest: {payment_link}\n"
-            )
 
-            for email in contact_emails:
-                send_normal_email({
-                    'email_body': staff_message,
-                    'email_subject': staff_subject,
-                    'to_email': email
-                })
+        notify_contacts(booking, 'booking_created', staff_subject, staff_message, detail=f"{currency} {booking.total_amount}")
 
 
 class CalculatePriceView(APIView):
@@ -167,6 +167,8 @@ class CalculatePriceView(APIView):
     - Number of guests (affects pricing for some properties)
     
     Use this endpoint to show price preview to users before booking.
+    The response includes a signed quote_token; passing it to POST /bookings/
+    books at the quoted price without recomputing it.
     """
     permission_classes = [AllowAny]
     
@@ -272,24 +274,10 @@ class CalculatePriceView(APIView):
                 }
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Determine stay_type intelligently
-        # Check if property has weekly pricing and if nights is a multiple of 7
-        has_weekly_pricing = PropertyPricing.objects.filter(
-            property=property_obj,
-            accommodation_type=accommodation_type,
-            stay_type='weekly'
-        ).exists()
+        pricing_table = get_pricing_table(property_obj.id)
         
-        if total_days % 7 == 0 and has_weekly_pricing:
-            # Multiples of 7 (7, 14, 21, 28...) use weekly pricing if available
-            stay_type = 'weekly'
-        elif total_days >= 10:
-            stay_type = 'long_term'
-        elif total_days < 7:
-            stay_type = 'short_term'
-        else:
-            # 8 or 9 nights - check what's available
-            stay_type = 'short_term'
+        # Multiples of 7 use weekly pricing if the property has it
+        stay_type = pricing_table.stay_type_for(accommodation_type, total_days)
         
         # Determine guest_type from user's country vs property's country
         if is_authenticated and user.country_of_residence and property_obj.country:
@@ -299,28 +287,8 @@ class CalculatePriceView(APIView):
         else:
             # For guest users or authenticated users without country, determine from phone number
             # Phone is already validated to exist at this point
-            try:
-                parsed = phonenumbers.parse(phone, None)
-                if not phonenumbers.is_valid_number(parsed):
-                    return Response({
-                        'success': False,
-                        'error_type': 'invalid_phone_format',
-                        'message': 'Please provide a valid phone number with country code.',
-                        'suggestion': 'Use international format with country code (e.g., +254712345678 for Kenya, +32471234567 for Belgium).',
-                        'details': {
-                            'phone_provided': phone,
-                            'format_example': '+254712345678'
-                        }
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                phone_country = geocoder.description_for_number(parsed, "en")
-                if phone_country:
-                    property_country = property_obj.country.lower()
-                    # Compare phone country with property country
-                    guest_type = 'local' if phone_country.lower() == property_country else 'international'
-                else:
-                    guest_type = 'international'
-            except phonenumbers.NumberParseException:
+            resolved = resolve_phone(phone)
+            if not resolved.parseable:
                 return Response({
                     'success': False,
                     'error_type': 'invalid_phone_format',
@@ -331,66 +299,28 @@ class CalculatePriceView(APIView):
                         'format_example': '+254712345678'
                     }
                 }, status=status.HTTP_400_BAD_REQUEST)
+            if not resolved.is_valid:
+                return Response({
+                    'success': False,
+                    'error_type': 'invalid_phone_format',
+                    'message': 'Please provide a valid phone number with country code.',
+                    'suggestion': 'Use international format with country code (e.g., +254712345678 for Kenya, +32471234567 for Belgium).',
+                    'details': {
+                        'phone_provided': phone,
+                        'format_example': '+254712345678'
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Compare phone country with property country
+            if resolved.country and resolved.country.lower() == property_obj.country.lower():
+                guest_type = 'local'
+            else:
+                guest_type = 'international'
         
-        # Find matching PropertyPricing (try specific guest_type first, then 'all_guests')
-        # First try exact guest_type match
-        pricing_query = PropertyPricing.objects.filter(
-            property=property_obj,
-            accommodation_type=accommodation_type,
-            guest_type=guest_type,
-            stay_type=stay_type,
-            min_nights__lte=total_days
-        ).filter(
-            django_models.Q(max_nights__isnull=True) | django_models.Q(max_nights__gte=total_days)
-        )
-        
-        # If no match, try 'all'
-        if not pricing_query.exists():
-            pricing_query = PropertyPricing.objects.filter(
-                property=property_obj,
-                accommodation_type=accommodation_type,
-                guest_type='all',
-                stay_type=stay_type,
-                min_nights__lte=total_days
-            ).filter(
-                django_models.Q(max_nights__isnull=True) | django_models.Q(max_nights__gte=total_days)
-            )
-        
-        # Check if base pricing query found anything before filtering by guest count
-        if not pricing_query.exists():
-            selected_pricing = None
-        elif number_of_guests:
+        guest_count = None
+        if number_of_guests:
             try:
                 guest_count = int(number_of_guests)
-                # Find pricing that can accommodate this many guests (capacity >= requested)
-                # OR pricing without guest restriction (NULL)
-                pricing_with_capacity = pricing_query.filter(
-                    django_models.Q(number_of_guests__gte=guest_count) | 
-                    django_models.Q(number_of_guests__isnull=True)
-                ).order_by('number_of_guests').first()  # Prefer smallest capacity that fits
-                
-                if pricing_with_capacity:
-                    selected_pricing = pricing_with_capacity
-                else:
-                    # Pricing exists for this stay type but guest count exceeds capacity
-                    max_capacity = pricing_query.aggregate(
-                        django_models.Max('number_of_guests')
-                    )['number_of_guests__max']
-                    
-                    if max_capacity and guest_count > max_capacity:
-                        return Response({
-                            'success': False,
-                            'error_type': 'guest_capacity_exceeded',
-                            'message': f'{accommodation_type.replace("_", " ").title()} accommodates maximum {max_capacity} guest(s).',
-                            'suggestion': f'You requested {guest_count} guest(s). Please reduce the number of guests or choose a different accommodation type.',
-                            'details': {
-                                'accommodation_type': accommodation_type,
-                                'max_capacity': max_capacity,
-                                'requested_guests': guest_count
-                            }
-                        }, status=status.HTTP_400_BAD_REQUEST)
-                    else:
-                        selected_pricing = None
             except (ValueError, TypeError):
                 return Response({
                     'success': False,
@@ -398,204 +328,59 @@ class CalculatePriceView(APIView):
                     'message': 'Number of guests must be a valid number.',
                     'details': {'number_of_guests': number_of_guests}
                 }, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            # No guest count provided, get any pricing (preferably without restriction)
-            selected_pricing = pricing_query.filter(number_of_guests__isnull=True).first()
-            if not selected_pricing:
-                selected_pricing = pricing_query.first()
         
-        if not selected_pricing:
-            # Detailed error checking to provide helpful messages
-            
-            # 1. Check if the accommodation type exists at all for this property
-            accommodation_exists = PropertyPricing.objects.filter(
-                property=property_obj,
-                accommodation_type=accommodation_type
-            ).exists()
-            
-            if not accommodation_exists:
-                # Accommodation type doesn't exist - show available options
-                available_accommodations = PropertyPricing.objects.filter(
-                    property=property_obj
-                ).values_list('accommodation_type', flat=True).distinct()
-                
-                # Make accommodation names more readable
-                accommodation_display = {
-                    'master_bedroom': 'Master Bedroom',
-                    'full_apartment': 'Full Apartment'
-                }
-                
-                available_names = [accommodation_display.get(acc, acc.replace('_', ' ').title()) 
-                                  for acc in available_accommodations]
-                
-                error_details = {
-                    'success': False,
-                    'error_type': 'accommodation_unavailable',
-                    'message': f'Sorry! {property_obj.name} does not offer {accommodation_display.get(accommodation_type, accommodation_type)} accommodation.',
-                    'suggestion': f'This property offers: {", ".join(available_names)}. Would you like to select one of these instead?',
-                    'details': {
-                        'property_name': property_obj.name,
-                        'requested': accommodation_type,
-                        'available_options': list(available_accommodations)
-                    }
-                }
-                return Response(error_details, status=status.HTTP_400_BAD_REQUEST)
-            
-            # 2. Check if min_nights requirement is not met
-            min_nights_required = PropertyPricing.objects.filter(
-                property=property_obj,
-                accommodation_type=accommodation_type
-            ).aggregate(django_models.Min('min_nights'))['min_nights__min']
-            
-            if min_nights_required and total_days < min_nights_required:
-                accommodation_display = {
-                    'master_bedroom': 'Master Bedroom',
-                    'full_apartment': 'Full Apartment'
-                }
-                return Response({
-                    'success': False,
-                    'error_type': 'minimum_nights_not_met',
-                    'message': f'{accommodation_display.get(accommodation_type, accommodation_type.replace("_", " ").title())} at {property_obj.name} requires a minimum of {min_nights_required} night(s).',
-                    'suggestion': f'Your booking is for {total_days} night(s). Please extend your stay to at least {min_nights_required} night(s).',
-                    'details': {
-                        'property_name': property_obj.name,
-                        'accommodation_type': accommodation_type,
-                        'min_nights_required': min_nights_required,
-                        'requested_nights': total_days
-                    }
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # 3. Check if max_nights is exceeded for available pricing
-            # Get the highest max_nights from pricing that matches min_nights criteria
-            max_nights_allowed = PropertyPricing.objects.filter(
-                property=property_obj,
-                accommodation_type=accommodation_type,
-                min_nights__lte=total_days
-            ).exclude(max_nights__isnull=True).aggregate(
-                django_models.Max('max_nights')
-            )['max_nights__max']
-            
-            # Also check if there's any pricing without max_nights restriction
-            has_unlimited = PropertyPricing.objects.filter(
-                property=property_obj,
-                accommodation_type=accommodation_type,
-                max_nights__isnull=True
-            ).exists()
-            
-            if max_nights_allowed and not has_unlimited and total_days > max_nights_allowed:
-                accommodation_display = {
-                    'master_bedroom': 'Master Bedroom',
-                    'full_apartment': 'Full Apartment'
-                }
+        # Find matching PropertyPricing (specific guest_type first, then 'all');
+        # with a guest count, the smallest capacity that fits
+        selected_pricing = pricing_table.select(
+            accommodation_type, guest_type, stay_type, total_days, guest_count
+        )
+        
+        if not selected_pricing and guest_count:
+            # Pricing may exist for this stay type with guest count exceeding capacity
+            max_capacity = pricing_table.max_capacity(
+                accommodation_type,
+                rules=pricing_table.candidates(accommodation_type, guest_type, stay_type, total_days)
+            )
+            if max_capacity and guest_count > max_capacity:
                 return Response({
                     'success': False,
-                    'error_type': 'maximum_nights_exceeded',
-                    'message': f'{accommodation_display.get(accommodation_type, accommodation_type.replace("_", " ").title())} at {property_obj.name} allows a maximum of {max_nights_allowed} night(s) for this booking type.',
-                    'suggestion': f'Your booking is for {total_days} night(s). Please reduce your stay to {max_nights_allowed} night(s) or less, or contact the property for longer stays.',
+                    'error_type': 'guest_capacity_exceeded',
+                    'message': f'{accommodation_type.replace("_", " ").title()} accommodates maximum {max_capacity} guest(s).',
+                    'suggestion': f'You requested {guest_count} guest(s). Please reduce the number of guests or choose a different accommodation type.',
                     'details': {
-                        'property_name': property_obj.name,
                         'accommodation_type': accommodation_type,
-                        'max_nights_allowed': max_nights_allowed,
-                        'requested_nights': total_days
+                        'max_capacity': max_capacity,
+                        'requested_guests': guest_count
                     }
                 }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # 3. Check what stay types are available (without guest_type filter first)
-            available_for_all = PropertyPricing.objects.filter(
-                property=property_obj,
-                accommodation_type=accommodation_type,
-                guest_type='all'
-            ).exists()
-            
-            available_stay_types = PropertyPricing.objects.filter(
-                property=property_obj,
-                accommodation_type=accommodation_type
-            ).values_list('stay_type', flat=True).distinct()
-            
-            # Check if the issue is stay_type/duration mismatch
-            if available_stay_types and stay_type not in available_stay_types:
-                # Build helpful suggestions based on available stay types
-                stay_type_info = {
-                    'short_term': 'less than 7 nights',
-                    'weekly': 'exactly 7 nights or multiples of 7 (7, 14, 21 nights)',
-                    'long_term': '10 or more nights'
-                }
-                
-                suggestions = [stay_type_info.get(st, st) for st in available_stay_types]
-                
-                error_details = {
-                    'success': False,
-                    'error_type': 'invalid_stay_duration',
-                    'message': f'Sorry! This accommodation requires bookings of {", or ".join(suggestions)}.',
-                    'suggestion': f'Your {total_days}-night booking doesn\'t match the available options. Please adjust your dates.',
-                    'details': {
-                        'property_name': property_obj.name,
-                        'your_nights': total_days,
-                        'your_stay_type': stay_type,
-                        'available_stay_types': list(available_stay_types),
-                        'accommodation_type': accommodation_type
-                    }
-                }
-            # 4. Only then check if it's a guest_type issue
-            elif not available_for_all:
-                # Check if specific guest_type pricing exists
-                guest_type_available = PropertyPricing.objects.filter(
-                    property=property_obj,
-                    accommodation_type=accommodation_type,
-                    guest_type=guest_type
-                ).exists()
-                
-                if not guest_type_available:
-                    error_details = {
-                        'success': False,
-                        'error_type': 'guest_type_not_supported',
-                        'message': f'Sorry! This property does not accept {guest_type} guests for {accommodation_type}.',
-                        'suggestion': 'Please contact the property manager or try a different property.',
-                        'details': {
-                            'property_name': property_obj.name,
-                            'property_country': property_obj.country,
-                            'user_country': user.country_of_residence if is_authenticated else None,
-                            'guest_type': guest_type,
-                            'accommodation_type': accommodation_type
-                        }
-                    }
-                else:
-                    # Generic pricing not found error
-                    error_details = {
-                        'success': False,
-                        'error_type': 'pricing_not_available',
-                        'message': f'Sorry! No pricing available for your requested booking.',
-                        'suggestion': 'Please try different dates or contact the property manager.',
-                        'details': {
-                            'property_name': property_obj.name,
-                            'nights': total_days,
-                            'accommodation_type': accommodation_type
-                        }
-                    }
-            else:
-                # Generic error - pricing exists but something else is wrong
-                error_details = {
-                    'success': False,
-                    'error_type': 'pricing_not_available',
-                    'message': f'Sorry! No pricing available for your requested booking configuration.',
-                    'suggestion': 'Please try different dates or number of guests.',
-                    'details': {
-                        'property_name': property_obj.name,
-                        'nights': total_days,
-                        'accommodation_type': accommodation_type,
-                        'stay_type': stay_type
-                    }
-                }
-            
+        
+        if not selected_pricing:
+            # Detailed error to provide a helpful message
+            error_details = pricing_table.diagnose(
+                property_obj, accommodation_type, guest_type, stay_type, total_days,
+                user_country=user.country_of_residence if is_authenticated else None
+            )
             return Response(error_details, status=status.HTTP_400_BAD_REQUEST)
         
-        # Calculate total amount
-        if selected_pricing.weekly_price and total_days % 7 == 0:
-            # Use weekly price for multiples of 7 (7, 14, 21, 28 nights)
-            num_weeks = total_days // 7
-            total_amount = selected_pricing.weekly_price * num_weeks
-        else:
-            total_amount = selected_pricing.price_per_night * Decimal(str(total_days))
+        # Calculate total amount (weekly price for multiples of 7)
+        total_amount = pricing_table.total_for(selected_pricing, total_days)
+        
+        # Sign the quote so booking creation can redeem it without recomputing;
+        # a phone-derived guest type only holds for the same phone
+        phone_derived = not (is_authenticated and user.country_of_residence and property_obj.country)
+        quote_token = sign_quote(Quote(
+            property_id=property_obj.id,
+            check_in=check_in_date,
+            check_out=check_out_date,
+            accommodation_type=accommodation_type,
+            number_of_guests=guest_count,
+            guest_type=guest_type,
+            stay_type=stay_type,
+            pricing_id=selected_pricing.id,
+            total_amount=total_amount,
+            user_id=user.id if is_authenticated else None,
+            phone=phone if phone_derived else None,
+        ))
         
         # Build response
         response_data = {
@@ -609,6 +394,8 @@ class CalculatePriceView(APIView):
             'includes_fullboard': selected_pricing.includes_fullboard,
             'property_name': property_obj.name,
             'accommodation_type': accommodation_type,
+            'quote_token': quote_token,
+            'quote_expires_at': timezone.now() + timedelta(seconds=QUOTE_MAX_AGE),
         }
         
         serializer = PriceCalculationSerializer(response_data)
@@ -709,22 +496,26 @@ class BookingCancelView(APIView):
                 else cancellation_note
             )
 
-        booking.save()
+        # Status changes and queued emails commit together
+        with transaction.atomic():
+            booking.save()
 
-        # --- Safely handle payment refund ---
-        refund_initiated = False
-        try:
-            payment = booking.payment  # May raise RelatedObjectDoesNotExist
-            if payment.payment_status == 'completed':
-                payment.payment_status = 'refunded'
-                payment.save()
-                refund_initiated = True
-                self._send_refund_email(payment)
-        except Exception:
-            pass  # No payment record exists — nothing to refund
+            # --- Safely handle payment refund ---
+            refund_initiated = False
+            try:
+                # A savepoint, so a failing refund doesn't poison the cancellation
+                with transaction.atomic():
+                    payment = booking.payment  # May raise RelatedObjectDoesNotExist
+                    if payment.payment_status == 'completed':
+                        payment.payment_status = 'refunded'
+                        payment.save()
+                        self._send_refund_email(payment)
+                        refund_initiated = True
+            except Exception:
+                pass  # No payment record exists — nothing to refund
 
-        # --- Send cancellation emails ---
-        self._send_cancellation_emails(booking, reason, refund_initiated, request)
+            # --- Queue cancellation emails ---
+            self._send_cancellation_emails(booking, reason, refund_initiated, request)
 
         return Response({
             'message': 'Booking cancelled successfully',
@@ -760,43 +551,25 @@ class BookingCancelView(APIView):
             f"If you have any questions, please contact the property directly.\n\n"
             f"Kind regards,\nThe {property_obj.name} Team"
         )
-        try:
-            send_mail(
-                subject=guest_subject,
-                message=guest_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[guest_email],
-                fail_silently=True,
-            )
-        except Exception:
-            pass
+        send_normal_email({
+            'email_body': guest_message,
+            'email_subject': guest_subject,
+            'to_email': guest_email
+        })
 
-        # --- Email to all property contacts ---
-        contact_emails = list(
-            property_obj.contacts.values_list('email', flat=True).exclude(email='')
+        # --- Notify property contacts (now or in their digest) ---
+        staff_subject = f"[Admin] Booking {ref} cancelled — {property_obj.name}"
+        staff_message = (
+            f"A booking has been cancelled for {property_obj.name}.\n\n"
+            f"Booking Reference: {ref}\n"
+            f"Guest: {guest_name} <{guest_email}>\n"
+            f"Check-in:  {check_in}\n"
+            f"Check-out: {check_out}\n\n"
+            f"{reason_line}\n\n"
+            f"Refund status: {'Initiated' if refund_initiated else 'Not applicable'}\n\n"
+            f"Please review the booking dashboard for further details."
         )
-        if contact_emails:
-            staff_subject = f"[Admin] Booking {ref} cancelled — {property_obj.name}"
-            staff_message = (
-                f"A booking has been cancelled for {property_obj.name}.\n\n"
-                f"Booking Reference: {ref}\n"
-                f"Guest: {guest_name} <{guest_email}>\n"
-                f"Check-in:  {check_in}\n"
-                f"Check-out: {check_out}\n\n"
-                f"{reason_line}\n\n"
-                f"Refund status: {'Initiated' if refund_initiated else 'Not applicable'}\n\n"
-                f"Please review the booking dashboard for further details."
-            )
-            try:
-                send_mail(
-                    subject=staff_subject,
-                    message=staff_message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=contact_emails,
-                    fail_silently=True,
-                )
-            except Exception:
-                pass
+        notify_contacts(booking, 'booking_cancelled', staff_subject, staff_message, detail=reason)
 
     def _send_refund_email(self, payment):
         """Notify guest and property contacts when a refund is initiated."""
@@ -828,26 +601,17 @@ class BookingCancelView(APIView):
             'to_email': guest_email
         })
 
-        contact_emails = list(
-            property_obj.contacts.values_list('email', flat=True).exclude(email='')
+        staff_subject = f"[Admin] Refund initiated — {ref}"
+        staff_message = (
+            f"A refund has been initiated for {property_obj.name}.\n\n"
+            f"Booking Reference: {ref}\n"
+            f"Guest: {guest_name} <{guest_email}>\n"
+            f"Check-in:  {check_in}\n"
+            f"Check-out: {check_out}\n"
+            f"Amount: {currency} {payment.amount}\n"
         )
-        if contact_emails:
-            staff_subject = f"[Admin] Refund initiated — {ref}"
-            staff_message = (
-                f"A refund has been initiated for {property_obj.name}.\n\n"
-                f"Booking Reference: {ref}\n"
-                f"Guest: {guest_name} <{guest_email}>\n"
-                f"Check-in:  {check_in}\n"
-                f"Check-out: {check_out}\n"
-                f"Amount: {currency} {payment.amount}\n"
-            )
 
-            for email in contact_emails:
-                send_normal_email({
-                    'email_body': staff_message,
-                    'email_subject': staff_subject,
-                    'to_email': email
-                })
+        notify_contacts(booking, 'refund_initiated', staff_subject, staff_message, detail=f"{currency} {payment.amount}")
 
 
 class UserBookingsView(generics.ListAPIView):
@@ -917,76 +681,49 @@ class PropertyAvailabilityView(APIView):
         # Calculate total nights
         total_nights = (check_out_date - check_in_date).days
         
-        # Check for overlapping bookings
-        overlapping_bookings = Booking.objects.filter(
-            property=property_obj,
-            status__in=['pending', 'confirmed'],
-            check_in__lt=check_out_date,
-            check_out__gt=check_in_date
-        )
-        
-        # Check for blocked dates
-        blocked_dates = BlockedDate.objects.filter(
-            property=property_obj,
-            start_date__lt=check_out_date,
-            end_date__gt=check_in_date
-        )
-        
-        # Check for buffer conflicts (same-day checkout/checkin)
-        buffer_conflicts = Booking.objects.filter(
-            property=property_obj,
-            status__in=['pending', 'confirmed'],
-            check_out=check_in_date
-        )
+        # Overlapping bookings, blocked dates and buffer conflicts (same-day
+        # checkout/checkin) all come from the cached availability index
+        index = get_availability_index(property_obj.id)
+        overlapping_bookings, blocked_dates, buffer_conflicts = index.conflicts(check_in_date, check_out_date)
         
         # Determine if available
-        is_available = (
-            not overlapping_bookings.exists() and 
-            not blocked_dates.exists() and 
-            not buffer_conflicts.exists()
-        )
+        is_available = not (overlapping_bookings or blocked_dates or buffer_conflicts)
         
         # Build detailed conflict information
         conflicting_bookings_data = []
         for booking in overlapping_bookings:
             conflicting_bookings_data.append({
                 'booking_reference': booking.booking_reference,
-                'check_in': booking.check_in.isoformat(),
-                'check_out': booking.check_out.isoformat(),
-                'guest_name': booking.full_name,
+                'check_in': booking.start.isoformat(),
+                'check_out': booking.end.isoformat(),
+                'guest_name': booking.guest_name,
                 'status': booking.status,
-                'conflict_dates': self._get_overlap_dates(check_in_date, check_out_date, booking.check_in, booking.check_out)
+                'conflict_dates': self._get_overlap_dates(check_in_date, check_out_date, booking.start, booking.end)
             })
         
         blocked_dates_data = []
         for blocked in blocked_dates:
             blocked_dates_data.append({
-                'start_date': blocked.start_date.isoformat(),
-                'end_date': blocked.end_date.isoformat(),
+                'start_date': blocked.start.isoformat(),
+                'end_date': blocked.end.isoformat(),
                 'reason': blocked.reason,
-                'conflict_dates': self._get_overlap_dates(check_in_date, check_out_date, blocked.start_date, blocked.end_date)
+                'conflict_dates': self._get_overlap_dates(check_in_date, check_out_date, blocked.start, blocked.end)
             })
         
         buffer_conflicts_data = []
         for booking in buffer_conflicts:
             buffer_conflicts_data.append({
                 'booking_reference': booking.booking_reference,
-                'checkout_date': booking.check_out.isoformat(),
+                'checkout_date': booking.end.isoformat(),
                 'message': f"Guest checking out on your check-in date ({check_in_date})"
             })
         
         # Collect all unavailable dates
         unavailable_dates = set()
-        for booking in overlapping_bookings:
-            unavailable_dates.update(self._get_date_range(
-                max(check_in_date, booking.check_in),
-                min(check_out_date, booking.check_out)
-            ))
-        
-        for blocked in blocked_dates:
-            unavailable_dates.update(self._get_date_range(
-                max(check_in_date, blocked.start_date),
-                min(check_out_date, blocked.end_date)
+        for interval in overlapping_bookings + blocked_dates:
+            unavailable_dates.update(date_range(
+                max(check_in_date, interval.start),
+                min(check_out_date, interval.end)
             ))
         
         response_data = {
@@ -1009,16 +746,168 @@ class PropertyAvailabilityView(APIView):
         """Get list of overlapping dates between two ranges"""
         overlap_start = max(start1, start2)
         overlap_end = min(end1, end2)
-        return [d.isoformat() for d in self._get_date_range(overlap_start, overlap_end)]
+        return [d.isoformat() for d in date_range(overlap_start, overlap_end)]
+
+
+class AlternativeDatesView(APIView):
+    """
+    Suggest free date windows for a stay of a given length.
     
-    def _get_date_range(self, start_date, end_date):
-        """Generate list of dates between start and end (exclusive of end)"""
-        dates = []
-        current = start_date
-        while current < end_date:
-            dates.append(current)
-            current += timedelta(days=1)
-        return dates
+    Public endpoint - no authentication required. Use it when the requested
+    dates are unavailable instead of probing neighbouring dates one by one.
+    
+    Query params:
+    - nights: Length of the stay (required)
+    - check_in: Preferred check-in date (YYYY-MM-DD, default: window start)
+    - window_start / window_end: Search window (YYYY-MM-DD, default: today and 60 days later)
+    - limit: Number of windows to return (default 5, max 20)
+    
+    Windows respect the buffer day rule (no check-in on another guest's
+    check-out day) and are ordered by distance from the preferred check-in.
+    """
+    permission_classes = [AllowAny]
+    
+    DEFAULT_WINDOW_DAYS = 60
+    MAX_LIMIT = 20
+    
+    @swagger_auto_schema(
+        operation_description="Find the nearest free date windows for a stay length",
+        manual_parameters=[
+            openapi.Parameter('nights', openapi.IN_QUERY, description="Number of nights", type=openapi.TYPE_INTEGER, required=True),
+            openapi.Parameter('check_in', openapi.IN_QUERY, description="Preferred check-in date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('window_start', openapi.IN_QUERY, description="Search window start (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('window_end', openapi.IN_QUERY, description="Search window end (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Number of windows (max 20)", type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: 'Free windows, nearest first',
+            400: 'Bad Request',
+            404: 'Property not found'
+        }
+    )
+    def get(self, request, property_id):
+        params = request.query_params
+        try:
+            nights = int(params.get('nights', ''))
+            limit = min(int(params.get('limit', 5)), self.MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'nights and limit must be whole numbers'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        if nights < 1 or limit < 1:
+            return Response({'error': 'nights and limit must be at least 1'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        today = timezone.now().date()
+        try:
+            window_start = datetime.strptime(params['window_start'], '%Y-%m-%d').date() if params.get('window_start') else today
+            window_end = (
+                datetime.strptime(params['window_end'], '%Y-%m-%d').date() if params.get('window_end')
+                else window_start + timedelta(days=self.DEFAULT_WINDOW_DAYS)
+            )
+            preferred = datetime.strptime(params['check_in'], '%Y-%m-%d').date() if params.get('check_in') else None
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        # Nothing can be booked in the past
+        window_start = max(window_start, today)
+        if window_end <= window_start:
+            return Response({'error': 'window_end must be after window_start and in the future'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        property_obj = get_object_or_404(Property, id=property_id)
+        if nights < property_obj.min_nights:
+            return Response({'error': f'This property requires a minimum of {property_obj.min_nights} night(s).'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        preferred = preferred or window_start
+        check_ins = get_availability_index(property_obj.id).free_windows(
+            nights, window_start, window_end, preferred=preferred, limit=limit
+        )
+        
+        return Response({
+            'property_id': property_id,
+            'property_name': property_obj.name,
+            'nights': nights,
+            'requested_check_in': preferred.isoformat(),
+            'window_start': window_start.isoformat(),
+            'window_end': window_end.isoformat(),
+            'windows': [
+                {
+                    'check_in': check_in.isoformat(),
+                    'check_out': (check_in + timedelta(days=nights)).isoformat(),
+                    'days_from_requested': (check_in - preferred).days,
+                }
+                for check_in in check_ins
+            ]
+        }, status=status.HTTP_200_OK)
+
+
+class OccupancyGridView(APIView):
+    """
+    Night-by-night status of every property in the caller's scope.
+    
+    Admin: all properties. Staff: assigned properties only.
+    
+    Query params:
+    - start_date: First night (YYYY-MM-DD, default: today)
+    - days: Number of nights (default 90, max 366)
+    
+    Each property row is run-length encoded: "3f2p1c" means 3 free nights,
+    2 pending and 1 confirmed. Codes: f=free, p=pending, c=confirmed, b=blocked.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    DEFAULT_DAYS = 90
+    MAX_DAYS = 366
+    
+    @swagger_auto_schema(
+        operation_description="Run-length encoded occupancy grid for the caller's properties",
+        manual_parameters=[
+            openapi.Parameter('start_date', openapi.IN_QUERY, description="Start date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('days', openapi.IN_QUERY, description="Number of nights (max 366)", type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: 'Occupancy grid',
+            400: 'Bad Request',
+            403: 'Admin or staff only'
+        }
+    )
+    def get(self, request):
+        user = request.user
+        role = getattr(user, 'role', None)
+        
+        if role == 'admin':
+            properties = Property.objects.all()
+        elif role == 'staff':
+            properties = user.assigned_properties.all()
+        else:
+            raise PermissionDenied("Only admin and staff can view the occupancy grid.")
+        
+        try:
+            start_date_str = request.query_params.get('start_date')
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else timezone.now().date()
+            days = int(request.query_params.get('days', self.DEFAULT_DAYS))
+        except ValueError:
+            return Response({'error': 'Invalid parameters. Use start_date=YYYY-MM-DD and a whole number of days'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= self.MAX_DAYS:
+            return Response({'error': f'days must be between 1 and {self.MAX_DAYS}'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        property_rows = list(properties.order_by('name').values_list('id', 'name'))
+        grid = build_occupancy_grid([property_id for property_id, _ in property_rows], start_date, days)
+        
+        return Response({
+            'start_date': start_date.isoformat(),
+            'end_date': (start_date + timedelta(days=days)).isoformat(),
+            'days': days,
+            'legend': STATUS_LEGEND,
+            'properties': [
+                {'id': property_id, 'name': name, 'nights': run_length_encode(grid[property_id])}
+                for property_id, name in property_rows
+            ]
+        }, status=status.HTTP_200_OK)
 
 
 # Admin Views
@@ -1065,6 +954,9 @@ class PropertyCalendarView(APIView):
     - /calendar/?month=2026-02 - February 2026 only
     - /calendar/?start_date=2026-02-01&end_date=2026-06-30 - Custom range
     
+    The response also carries the run-length encoded status of every night
+    in the range ("nights") and night counts, read from the occupancy bitmaps.
+    
     Public endpoint - no authentication required (guests need to see occupied dates).
     """
     permission_classes = [AllowAny]
@@ -1126,20 +1018,17 @@ class PropertyCalendarView(APIView):
             else:
                 end_date = datetime(now.year, now.month + 1, 1).date()
         
-        # Build booking query
+        # Night-by-night status from the occupancy bitmaps (a year ahead for "all")
+        nights_end = end_date or start_date + timedelta(days=365)
+        occupancy = OccupancyView([property_obj.id], start_date, nights_end)
+        total_nights = (nights_end - start_date).days
+        
+        # Bookings and blocked dates are only read for their event labels
         booking_query = Booking.objects.filter(
             property=property_obj,
             status__in=['pending', 'confirmed', 'completed'],
             check_out__gte=start_date  # Only future/current bookings
         )
-        
-        # Add end date filter if specified
-        if end_date:
-            booking_query = booking_query.filter(check_in__lt=end_date)
-        
-        bookings = booking_query.order_by('check_in')
-        
-        # Build blocked dates query
         blocked_query = BlockedDate.objects.filter(
             property=property_obj,
             end_date__gte=start_date  # Only future/current blocked dates
@@ -1147,35 +1036,38 @@ class PropertyCalendarView(APIView):
         
         # Add end date filter if specified
         if end_date:
+            booking_query = booking_query.filter(check_in__lt=end_date)
             blocked_query = blocked_query.filter(start_date__lt=end_date)
         
-        blocked_dates = blocked_query.order_by('start_date')
-        
         # Build calendar events
         events = []
         
         # Add bookings as events
-        for booking in bookings:
+        for booking_id, check_in, check_out, booking_status, reference, guest_name in booking_query.values_list(
+            'id', 'check_in', 'check_out', 'status', 'booking_reference', 'full_name'
+        ):
             events.append({
                 'type': 'booking',
-                'id': booking.id,
-                'start_date': booking.check_in,
-                'end_date': booking.check_out,
-                'title': f"{booking.full_name} - {booking.booking_reference}",
-                'status': booking.status,
-                'booking_reference': booking.booking_reference,
-                'guest_name': booking.full_name,
+                'id': booking_id,
+                'start_date': check_in,
+                'end_date': check_out,
+                'title': f"{guest_name} - {reference}",
+                'status': booking_status,
+                'booking_reference': reference,
+                'guest_name': guest_name,
             })
         
         # Add blocked dates as events
-        for blocked in blocked_dates:
+        for blocked_id, blocked_start, blocked_end, reason in blocked_query.values_list(
+            'id', 'start_date', 'end_date', 'reason'
+        ):
             events.append({
                 'type': 'blocked',
-                'id': blocked.id,
-                'start_date': blocked.start_date,
-                'end_date': blocked.end_date,
-                'title': f"Blocked: {blocked.reason}",
-                'reason': blocked.reason,
+                'id': blocked_id,
+                'start_date': blocked_start,
+                'end_date': blocked_end,
+                'title': f"Blocked: {reason}",
+                'reason': reason,
             })
         
         # Sort events by start date
@@ -1187,7 +1079,16 @@ class PropertyCalendarView(APIView):
             'property_name': property_obj.name,
             'start_date': start_date.isoformat(),
             'end_date': end_date.isoformat() if end_date else None,
-            'events': serializer.data
+            'events': serializer.data,
+            'nights': run_length_encode(occupancy.night_codes(property_obj.id)),
+            'nights_legend': STATUS_LEGEND,
+            'occupancy': {
+                'total_nights': total_nights,
+                'booked_nights': occupancy.count(property_obj.id, 'booked'),
+                'pending_nights': occupancy.count(property_obj.id, 'pending'),
+                'blocked_nights': occupancy.count(property_obj.id, 'blocked'),
+                'free_nights': total_nights - occupancy.count(property_obj.id),
+            }
         }, status=status.HTTP_200_OK)
 
 
@@ -202,6 +202,15 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 # Paystack Configuration
 PAYSTACK_SECRET_KEY = env('PAYSTACK_SECRET_KEY', default='')
 PAYSTACK_PUBLIC_KEY = env('PAYSTACK_PUBLIC_KEY', default='')
+# Paystack client: API base URL (point at a stub for tests), timeouts in seconds, retries and circuit breaker
+PAYSTACK_BASE_URL = env('PAYSTACK_BASE_URL', default='https://api.paystack.co')
+PAYSTACK_CONNECT_TIMEOUT = env.float('PAYSTACK_CONNECT_TIMEOUT', default=3.05)
+PAYSTACK_READ_TIMEOUT = env.float('PAYSTACK_READ_TIMEOUT', default=10)
+PAYSTACK_MAX_RETRIES = env.int('PAYSTACK_MAX_RETRIES', default=2)
+PAYSTACK_BREAKER_THRESHOLD = env.int('PAYSTACK_BREAKER_THRESHOLD', default=5)
+PAYSTACK_BREAKER_COOLDOWN = env.int('PAYSTACK_BREAKER_COOLDOWN', default=30)
+# Paystack webhook events (process_webhook_events): attempts before an event is marked failed
+WEBHOOK_MAX_ATTEMPTS = env.int('WEBHOOK_MAX_ATTEMPTS', default=8)
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -257,6 +266,10 @@ EMAIL_USE_SSL = env.bool('EMAIL_USE_SSL', default=False)
 EMAIL_TIMEOUT = 10  # Add timeout to prevent worker hangs
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='Kifaru Impact <kifaru@infitech-innovation.com>')
 
+# Email outbox (send_queued_emails): attempts before giving up, first retry delay in seconds
+EMAIL_MAX_ATTEMPTS = env.int('EMAIL_MAX_ATTEMPTS', default=6)
+EMAIL_RETRY_DELAY = env.int('EMAIL_RETRY_DELAY', default=60)
+
 # Resend API (disabled until domain is verified)
 RESEND_API_KEY = env('RESEND_API_KEY', default='')
 
@@ -306,6 +319,39 @@ FRONTEND_URL = env('FRONTEND_URL', default='http://localhost:5173')
 # Currency settings
 DEFAULT_CURRENCY = "EUR"
 
+# Seconds a per-process availability index may be served before it is rebuilt
+AVAILABILITY_INDEX_TTL = env.int('AVAILABILITY_INDEX_TTL', default=60)
+
+# Booking reference numbers each worker reserves from the sequence at a time
+BOOKING_REFERENCE_BLOCK_SIZE = env.int('BOOKING_REFERENCE_BLOCK_SIZE', default=20)
+
+# Seconds a per-process compiled pricing table may be served before it is rebuilt
+PRICING_TABLE_TTL = env.int('PRICING_TABLE_TTL', default=300)
+# Seconds between checks of a property's PricingVersion for edits made by other workers
+PRICING_VERSION_CHECK_INTERVAL = env.int('PRICING_VERSION_CHECK_INTERVAL', default=5)
+
+# Seconds a signed price quote can be redeemed when creating a booking
+BOOKING_QUOTE_MAX_AGE = env.int('BOOKING_QUOTE_MAX_AGE', default=900)
+
+# Phone numbers whose parsed country is kept per process, and whether to
+# load the phone metadata when a worker starts
+PHONE_COUNTRY_CACHE_SIZE = env.int('PHONE_COUNTRY_CACHE_SIZE', default=4096)
+PHONE_RESOLVER_WARM = env.bool('PHONE_RESOLVER_WARM', default=False)
+
+# Rows fetched per query by the streaming admin exports
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=2000)
+
+# Seconds a report job result is reused for identical requests, and after
+# which a job still marked running is handed to another worker
+REPORT_JOB_TTL = env.int('REPORT_JOB_TTL', default=600)
+REPORT_JOB_TIMEOUT = env.int('REPORT_JOB_TIMEOUT', default=900)
+
+# Seconds the admin dashboard summary is cached between booking/payment changes
+DASHBOARD_CACHE_TTL = env.int('DASHBOARD_CACHE_TTL', default=30)
+
+# Where export_snapshots writes the Parquet snapshots analysts read
+SNAPSHOT_DIR = env('SNAPSHOT_DIR', default=str(BASE_DIR / 'snapshots'))
+
 # Time zone settings for multiple locations
 USE_TZ = True
 TIME_ZONE = "Africa/Nairobi"  # Can be customized per property in the frontend
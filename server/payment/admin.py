@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment
+from .models import Payment, PaystackWebhookEvent
 
 # Register your models here.
 @admin.register(Payment)
@@ -22,4 +22,11 @@ class PaymentAdmin(admin.ModelAdmin):
         ('Failure Information', {
             'fields': ('failure_reason',)
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(PaystackWebhookEvent)
+class PaystackWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['event_key', 'event', 'reference', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['status', 'event']
+    search_fields = ['event_key', 'reference']
+    readonly_fields = ['event_key', 'event', 'reference', 'payload', 'received_at', 'claimed_at', 'processed_at']
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payment.webhooks import claim_events, process_event
+
+
+class Command(BaseCommand):
+    help = "Apply stored Paystack webhook events to payments and bookings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when no event is due")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when no event is due")
+        parser.add_argument('--batch', type=int, default=20, help="Events claimed at a time")
+
+    def handle(self, *args, **options):
+        while True:
+            events = claim_events(options['batch'])
+            if not events:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+
+            for event in events:
+                result = process_event(event)
+                if result is not event:
+                    # Reclaimed by another worker as stale; its copy is what counts
+                    self.stdout.write(f"Webhook {result.event_key}: {result.status}, taken over by another worker")
+                    continue
+                message = f"Webhook {result.event_key}: {result.status} (attempt {result.attempts})"
+                if result.status in ('processed', 'ignored'):
+                    self.stdout.write(self.style.SUCCESS(message))
+                else:
+                    self.stderr.write(message)
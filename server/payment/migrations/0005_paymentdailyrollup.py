@@ -0,0 +1,48 @@
+# Generated by Django 5.0.8 on 2026-10-15 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_payment_rollups(apps, schema_editor):
+    """Sum existing payments per creation day, property, method and status"""
+    Payment = apps.get_model('payment', 'Payment')
+    PaymentDailyRollup = apps.get_model('payment', 'PaymentDailyRollup')
+
+    rows = Payment.objects.annotate(day=TruncDate('created_at')).values(
+        'day', 'payment_method', 'payment_status', property_id=F('booking__property_id'),
+    ).annotate(payments=Count('id'), amount=Sum('amount')).order_by()
+    PaymentDailyRollup.objects.bulk_create([PaymentDailyRollup(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0004_alter_payment_user'),
+        ('properties', '0018_alter_propertyimage_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('payment_method', models.CharField(choices=[('card', 'Card'), ('bank_transfer', 'Bank Transfer'), ('mpesa', 'M-Pesa'), ('paypal', 'PayPal')], max_length=20)),
+                ('payment_status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('refunded', 'Refunded')], max_length=20)),
+                ('payments', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_rollups', to='properties.property')),
+            ],
+            options={
+                'ordering': ['day', 'property'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='paymentdailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'property', 'payment_method', 'payment_status'), name='unique_payment_rollup'),
+        ),
+        migrations.RunPython(backfill_payment_rollups, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,15 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 from booking.models import Booking
 
 User = get_user_model()
 
+# Payment fields summarised by PaymentDailyRollup (see booking/rollups.py)
+PAYMENT_REPORT_FIELDS = ('created_at', 'booking_id', 'payment_method', 'payment_status', 'amount')
+
 class Payment(models.Model):
     PAYMENT_METHOD_CHOICES = [
         ('card', 'Card'),
@@ -67,9 +71,81 @@ class Payment(models.Model):
     def __str__(self):
         return f"Payment for {self.booking.booking_reference} - {self.payment_status}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._rollup_state = instance._report_state()
+        return instance
+    
+    def _report_state(self):
+        """Fields that decide which daily report rollup row counts this payment, and how"""
+        return tuple(self.__dict__.get(field) for field in PAYMENT_REPORT_FIELDS)
+    
     def save(self, *args, **kwargs):
         # Generate transaction ID if not exists
         if not self.transaction_id:
             import uuid
             self.transaction_id = f"TXN-{uuid.uuid4().hex[:12].upper()}"
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class PaymentDailyRollup(models.Model):
+    """
+    Payments created on one day, summed per property, method and status.
+    Kept up to date by the payment signals and read by the report endpoints
+    instead of the Payment table.
+    """
+    day = models.DateField()
+    property = models.ForeignKey('properties.Property', on_delete=models.CASCADE, related_name='payment_rollups')
+    payment_method = models.CharField(max_length=20, choices=Payment.PAYMENT_METHOD_CHOICES)
+    payment_status = models.CharField(max_length=20, choices=Payment.PAYMENT_STATUS_CHOICES)
+    payments = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['day', 'property']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'property', 'payment_method', 'payment_status'],
+                name='unique_payment_rollup'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} - {self.property_id} - {self.payment_method}/{self.payment_status}: {self.payments}"
+
+
+class PaystackWebhookEvent(models.Model):
+    """
+    Raw Paystack webhook, stored by the webhook view before anything is
+    processed. event_key is unique, so a redelivered webhook is recognised and
+    dropped; process_webhook_events applies each event once.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    ]
+
+    event_key = models.CharField(max_length=255, unique=True, help_text="Event type and Paystack transaction id (or reference)")
+    event = models.CharField(max_length=100)
+    reference = models.CharField(max_length=100, blank=True, db_index=True)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-received_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='webhook_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_key} ({self.status})"
@@ -0,0 +1,59 @@
+"""
+Payment status notifications for guests and property contacts, shared by
+the payment views and the webhook worker.
+"""
+from django.conf import settings
+
+from booking.notifications import notify_contacts
+from users.utils import send_normal_email
+
+
+def send_payment_status_email(payment, status_label, failure_reason=None):
+    """Notify guest and property contacts of payment status changes."""
+    booking = payment.booking
+    property_obj = booking.property
+    ref = booking.booking_reference
+    guest_name = booking.full_name
+    guest_email = booking.email
+    check_in = booking.check_in.strftime('%d %b %Y')
+    check_out = booking.check_out.strftime('%d %b %Y')
+    currency = payment.currency or getattr(settings, 'DEFAULT_CURRENCY', 'EUR')
+
+    status_line = f"Payment status: {status_label}"
+    if failure_reason:
+        status_line = f"{status_line}\nReason: {failure_reason}"
+
+    guest_subject = f"Payment {status_label.lower()} — {ref}"
+    guest_message = (
+        f"Hi {guest_name},\n\n"
+        f"{status_line}\n\n"
+        f"Booking Reference: {ref}\n"
+        f"Property: {property_obj.name}\n"
+        f"Check-in:  {check_in}\n"
+        f"Check-out: {check_out}\n"
+        f"Amount: {currency} {payment.amount}\n\n"
+        f"If you need help, please contact us with your booking reference.\n\n"
+        f"Kind regards,\nThe {property_obj.name} Team"
+    )
+
+    send_normal_email({
+        'email_body': guest_message,
+        'email_subject': guest_subject,
+        'to_email': guest_email
+    })
+
+    staff_subject = f"[Admin] Payment {status_label.lower()} — {ref}"
+    staff_message = (
+        f"Payment update for {property_obj.name}.\n\n"
+        f"Booking Reference: {ref}\n"
+        f"Guest: {guest_name} <{guest_email}>\n"
+        f"Check-in:  {check_in}\n"
+        f"Check-out: {check_out}\n"
+        f"Amount: {currency} {payment.amount}\n\n"
+        f"{status_line}\n"
+    )
+
+    notify_contacts(
+        booking, f"payment_{status_label.lower()}", staff_subject, staff_message,
+        detail=f"{currency} {payment.amount}" + (f" - {failure_reason}" if failure_reason else ''),
+    )
@@ -0,0 +1,176 @@
+"""
+Paystack HTTP client.
+
+One requests.Session per process keeps connections to Paystack alive between
+calls. Every call has connect/read timeouts. Idempotent calls (GETs) are
+retried on network errors, 429 and 5xx with exponential backoff and full
+jitter; POSTs are only retried when the connection could not be made, i.e.
+the request never reached Paystack. A circuit breaker opens after
+PAYSTACK_BREAKER_THRESHOLD consecutive failures and fails every call
+immediately for PAYSTACK_BREAKER_COOLDOWN seconds, after which one trial call
+decides whether it closes again. The breaker is per process, like the session.
+
+PAYSTACK_BASE_URL can point the client at a local stub server.
+"""
+import logging
+import random
+import threading
+import time
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+# First retry waits up to this many seconds, doubling each time
+RETRY_BACKOFF = 0.25
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PaystackUnavailable(Exception):
+    """Paystack could not be reached, kept failing, or the circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open (fail fast) -> half-open (one trial)"""
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.error(f"Paystack circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+
+def _never_sent(error):
+    """Whether a ConnectionError happened while connecting, before the request went out"""
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class PaystackClient:
+    def __init__(self, secret_key, base_url='https://api.paystack.co', timeout=(3.05, 10), max_retries=2, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker(5, 30)
+        self.session = requests.Session()
+        # Retries are handled in request(), where the breaker sees every attempt
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=10, max_retries=0))
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=10, max_retries=0))
+        self.session.headers.update({
+            'Authorization': f'Bearer {secret_key}',
+            'Content-Type': 'application/json',
+        })
+
+    def request(self, method, path, idempotent=None, **kwargs):
+        """
+        Paystack's JSON response ({'status', 'message', 'data'}) for any 2xx/4xx
+        answer; raises PaystackUnavailable for open circuit, network errors and
+        5xx/429 once retries are used up.
+        """
+        if idempotent is None:
+            idempotent = method == 'GET'
+        url = f'{self.base_url}/{path.lstrip("/")}'
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise PaystackUnavailable('Paystack is unavailable (circuit open)')
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.ConnectTimeout as e:
+                # Never sent, so safe to retry whatever the method
+                error, retryable = e, True
+            except requests.ConnectionError as e:
+                error, retryable = e, idempotent or _never_sent(e)
+            except requests.Timeout as e:
+                error, retryable = e, idempotent
+            except requests.RequestException as e:
+                self.breaker.record_failure()
+                raise PaystackUnavailable(f'Paystack request failed: {e}') from e
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    try:
+                        return response.json()
+                    except ValueError:
+                        return {'status': False, 'message': f'Invalid response (HTTP {response.status_code})', 'data': None}
+                error, retryable = f'HTTP {response.status_code}', idempotent
+
+            self.breaker.record_failure()
+            if not retryable or attempt >= self.max_retries:
+                raise PaystackUnavailable(f'Paystack {method} {path} failed: {error}')
+            attempt += 1
+            delay = random.uniform(0, RETRY_BACKOFF * 2 ** (attempt - 1))
+            logger.warning(f"Paystack {method} {path} failed ({error}), retry {attempt} in {delay:.2f}s")
+            time.sleep(delay)
+
+    def initialize_transaction(self, **data):
+        return self.request('POST', '/transaction/initialize', json=data)
+
+    def verify_transaction(self, reference):
+        return self.request('GET', f'/transaction/verify/{quote(str(reference), safe="")}')
+
+
+_client = None
+_client_config = None
+_client_lock = threading.Lock()
+
+
+def _settings_config():
+    return (
+        settings.PAYSTACK_SECRET_KEY,
+        getattr(settings, 'PAYSTACK_BASE_URL', 'https://api.paystack.co'),
+        (getattr(settings, 'PAYSTACK_CONNECT_TIMEOUT', 3.05), getattr(settings, 'PAYSTACK_READ_TIMEOUT', 10)),
+        getattr(settings, 'PAYSTACK_MAX_RETRIES', 2),
+        getattr(settings, 'PAYSTACK_BREAKER_THRESHOLD', 5),
+        getattr(settings, 'PAYSTACK_BREAKER_COOLDOWN', 30),
+    )
+
+
+def get_client():
+    """The process-wide client, created on first use and again whenever the PAYSTACK_* settings change"""
+    global _client, _client_config
+    config = _settings_config()
+    with _client_lock:
+        if _client is None or config != _client_config:
+            secret_key, base_url, timeout, max_retries, threshold, cooldown = config
+            _client = PaystackClient(
+                secret_key, base_url, timeout, max_retries, breaker=CircuitBreaker(threshold, cooldown)
+            )
+            _client_config = config
+        return _client
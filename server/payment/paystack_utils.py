@@ -2,15 +2,11 @@
 Paystack payment utilities for kifaru2 booking platform
 """
 from django.conf import settings
-from paystackapi.paystack import Paystack
-from paystackapi.transaction import Transaction
+from .paystack_client import PaystackUnavailable, get_client
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Initialize Paystack with secret key
-paystack = Paystack(secret_key=settings.PAYSTACK_SECRET_KEY)
-
 
 def initialize_payment(email, amount, reference, callback_url=None, metadata=None):
     """
@@ -31,7 +27,8 @@ def initialize_payment(email, amount, reference, callback_url=None, metadata=Non
                 'access_code': str,
                 'reference': str
             },
-            'message': str
+            'message': str,
+            'unavailable': bool  # Paystack unreachable or degraded; try again later
         }
     """
     try:
@@ -52,7 +49,14 @@ def initialize_payment(email, amount, reference, callback_url=None, metadata=Non
             transaction_data['metadata'] = metadata
         
         # Initialize transaction
-        response = Transaction.initialize(**transaction_data)
+        response = get_client().initialize_transaction(**transaction_data)
+        if not response.get('status'):
+            logger.warning(f"Paystack rejected initialization for {reference}: {response.get('message')}")
+            return {
+                'status': False,
+                'data': None,
+                'message': f"Payment initialization failed: {response.get('message', 'Rejected by Paystack')}"
+            }
         
         logger.info(f"Paystack payment initialized: {reference}")
         return {
@@ -61,6 +65,14 @@ def initialize_payment(email, amount, reference, callback_url=None, metadata=Non
             'message': 'Payment initialized successfully'
         }
         
+    except PaystackUnavailable as e:
+        logger.error(f"Paystack unavailable initializing {reference}: {str(e)}")
+        return {
+            'status': False,
+            'data': None,
+            'message': 'Payment provider is temporarily unavailable, please try again shortly',
+            'unavailable': True
+        }
     except Exception as e:
         logger.error(f"Paystack initialization error for {reference}: {str(e)}")
         return {
@@ -88,11 +100,12 @@ def verify_payment(reference):
                 'customer': dict,
                 'metadata': dict
             },
-            'message': str
+            'message': str,
+            'unavailable': bool  # Paystack unreachable or degraded; try again later
         }
     """
     try:
-        response = Transaction.verify(reference=reference)
+        response = get_client().verify_transaction(reference)
         
         if response['status']:
             logger.info(f"Payment verified successfully: {reference}")
@@ -109,6 +122,14 @@ def verify_payment(reference):
                 'message': response.get('message', 'Verification failed')
             }
             
+    except PaystackUnavailable as e:
+        logger.error(f"Paystack unavailable verifying {reference}: {str(e)}")
+        return {
+            'status': False,
+            'data': None,
+            'message': 'Payment provider is temporarily unavailable, please try again shortly',
+            'unavailable': True
+        }
     except Exception as e:
         logger.error(f"Paystack verification error for {reference}: {str(e)}")
         return {
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from booking.models import Booking
+from booking.reports import invalidate_dashboard_summary
+from booking.rollups import update_payment_rollup
+from booking.signals import deleted_with_property
+from .models import Payment
+
+
+def _property_id(payment):
+    if Payment.booking.is_cached(payment):
+        return payment.booking.property_id
+    return Booking.objects.filter(pk=payment.booking_id).values_list('property_id', flat=True).first()
+
+
+@receiver(post_save, sender=Payment)
+def roll_up_saved_payment(sender, instance, created, **kwargs):
+    """Move the payment's contribution in the daily report rollups"""
+    state = instance._report_state()
+    previous_state = None if created else getattr(instance, '_rollup_state', None)
+    if state != previous_state:
+        update_payment_rollup(previous_state, state, _property_id(instance))
+    instance._rollup_state = state
+
+
+@receiver(post_delete, sender=Payment)
+def roll_up_deleted_payment(sender, instance, **kwargs):
+    if deleted_with_property(kwargs.get('origin')):
+        return
+    state = getattr(instance, '_rollup_state', None) or instance._report_state()
+    update_payment_rollup(state, None, _property_id(instance))
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_payment_dashboard(sender, instance, **kwargs):
+    """The admin dashboard summary counts pending payments - drop the cached payload"""
+    invalidate_dashboard_summary()
@@ -1,3 +1,125 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from .paystack_client import PaystackUnavailable, get_client
+
+
+class StubPaystackHandler(BaseHTTPRequestHandler):
+    """Answers like Paystack, or with server.status when it isn't 200"""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        self.server.requests.append((self.command, self.path))
+        if self.server.drop:
+            # Read the request, then hang up without answering
+            self.close_connection = True
+            return
+        body = json.dumps({'status': self.server.status == 200, 'message': 'stub', 'data': {'status': 'success'}}).encode()
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PaystackClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubPaystackHandler)
+        self.server.connections = 0
+        self.server.requests = []
+        self.server.status = 200
+        self.server.drop = False
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        settings_override = override_settings(
+            PAYSTACK_SECRET_KEY='sk_test_stub',
+            PAYSTACK_BASE_URL=f'http://127.0.0.1:{self.server.server_port}',
+            PAYSTACK_CONNECT_TIMEOUT=1,
+            PAYSTACK_READ_TIMEOUT=2,
+            PAYSTACK_MAX_RETRIES=2,
+            PAYSTACK_BREAKER_THRESHOLD=2,
+            PAYSTACK_BREAKER_COOLDOWN=0.2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_client_follows_settings(self):
+        client = get_client()
+        self.assertEqual(client.base_url, f'http://127.0.0.1:{self.server.server_port}')
+        self.assertEqual(client.timeout, (1, 2))
+        self.assertIs(get_client(), client)
+
+    def test_keep_alive_reuses_connection(self):
+        client = get_client()
+        for reference in ('ref-1', 'ref-2', 'ref-3'):
+            self.assertTrue(client.verify_transaction(reference)['status'])
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_post_not_retried_after_server_error(self):
+        self.server.status = 503
+
+        with self.assertRaises(PaystackUnavailable):
+            get_client().initialize_transaction(email='guest@example.com', amount=1000)
+
+        self.assertEqual(self.server.requests, [('POST', '/transaction/initialize')])
+
+    def test_post_not_retried_after_dropped_connection(self):
+        self.server.drop = True
+
+        with self.assertRaises(PaystackUnavailable):
+            get_client().initialize_transaction(email='guest@example.com', amount=1000)
+
+        self.assertEqual(self.server.requests, [('POST', '/transaction/initialize')])
+
+    def test_get_retried_after_server_error(self):
+        self.server.status = 503
+
+        with override_settings(PAYSTACK_BREAKER_THRESHOLD=10), self.assertRaises(PaystackUnavailable):
+            get_client().verify_transaction('ref-1')
+
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_breaker_opens_then_half_opens_then_closes(self):
+        with override_settings(PAYSTACK_MAX_RETRIES=0):
+            client = get_client()
+            self.server.status = 500
+            for _ in range(2):
+                with self.assertRaises(PaystackUnavailable):
+                    client.verify_transaction('ref-1')
+            self.assertEqual(client.breaker.state, 'open')
+
+            # Open: fails without reaching Paystack
+            with self.assertRaises(PaystackUnavailable):
+                client.verify_transaction('ref-1')
+            self.assertEqual(len(self.server.requests), 2)
+
+            time.sleep(0.25)
+            self.assertEqual(client.breaker.state, 'half-open')
+
+            # The trial call succeeds and closes the circuit
+            self.server.status = 200
+            self.assertTrue(client.verify_transaction('ref-1')['status'])
+            self.assertEqual(client.breaker.state, 'closed')
+            self.assertEqual(len(self.server.requests), 3)
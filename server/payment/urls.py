@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
     AdminPaymentListView,
+    AdminPaymentExportView,
     PaymentInitializeView,
     PaymentVerifyView,
     PaystackWebhookView,
@@ -15,4 +16,5 @@ urlpatterns = [
     
     # Admin endpoints
     path('admin/payments/', AdminPaymentListView.as_view(), name='admin-payments'),
+    path('admin/payments/export/', AdminPaymentExportView.as_view(), name='admin-payments-export'),
 ]
\ No newline at end of file
@@ -5,8 +5,8 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.decorators import api_view, permission_classes
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.utils import timezone
-from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from drf_yasg.utils import swagger_auto_schema
@@ -17,70 +17,15 @@ from .serializers import (
     PaymentInitializeSerializer
 )
 from .paystack_utils import initialize_payment, verify_payment, verify_webhook_signature
+from .webhooks import record_event
+from .notifications import send_payment_status_email
+from booking.exports import EXPORT_PARAMETERS, StreamingExportView
 import json
 import logging
-from users.utils import send_normal_email
 
 logger = logging.getLogger(__name__)
 
 
-def _send_payment_status_email(payment, status_label, failure_reason=None):
-    """Notify guest and property contacts of payment status changes."""
-    booking = payment.booking
-    property_obj = booking.property
-    ref = booking.booking_reference
-    guest_name = booking.full_name
-    guest_email = booking.email
-    check_in = booking.check_in.strftime('%d %b %Y')
-    check_out = booking.check_out.strftime('%d %b %Y')
-    currency = payment.currency or getattr(settings, 'DEFAULT_CURRENCY', 'EUR')
-
-    status_line = f"Payment status: {status_label}"
-    if failure_reason:
-        status_line = f"{status_line}\nReason: {failure_reason}"
-
-    guest_subject = f"Payment {status_label.lower()} — {ref}"
-    guest_message = (
-        f"Hi {guest_name},\n\n"
-        f"{status_line}\n\n"
-        f"Booking Reference: {ref}\n"
-        f"Property: {property_obj.name}\n"
-        f"Check-in:  {check_in}\n"
-        f"Check-out: {check_out}\n"
-        f"Amount: {currency} {payment.amount}\n\n"
-        f"If you need help, please contact us with your booking reference.\n\n"
-        f"Kind regards,\nThe {property_obj.name} Team"
-    )
-
-    send_normal_email({
-        'email_body': guest_message,
-        'email_subject': guest_subject,
-        'to_email': guest_email
-    })
-
-    contact_emails = list(
-        property_obj.contacts.values_list('email', flat=True).exclude(email='')
-    )
-    if contact_emails:
-        staff_subject = f"[Admin] Payment {status_label.lower()} — {ref}"
-        staff_message = (
-            f"Payment update for {property_obj.name}.\n\n"
-            f"Booking Reference: {ref}\n"
-            f"Guest: {guest_name} <{guest_email}>\n"
-            f"Check-in:  {check_in}\n"
-            f"Check-out: {check_out}\n"
-            f"Amount: {currency} {payment.amount}\n\n"
-            f"{status_line}\n"
-        )
-
-        for email in contact_emails:
-            send_normal_email({
-                'email_body': staff_message,
-                'email_subject': staff_subject,
-                'to_email': email
-            })
-
-
 class AdminPaymentListView(generics.ListAPIView):
     """Admin: View all payments"""
     queryset = Payment.objects.all().select_related('booking', 'user')
@@ -94,6 +39,40 @@ class AdminPaymentListView(generics.ListAPIView):
     pagination_class = PageNumberPagination
 
 
+class AdminPaymentExportView(StreamingExportView):
+    """Admin: stream all payments as CSV or NDJSON, with the admin list filters"""
+    queryset = Payment.objects.all()
+    filterset_fields = ['payment_status', 'payment_method']
+    search_fields = ['transaction_id', 'booking__booking_reference']
+    export_name = 'payments'
+    columns = (
+        ('id', 'id'),
+        ('transaction_id', 'transaction_id'),
+        ('created_at', 'created_at'),
+        ('completed_at', 'completed_at'),
+        ('payment_status', 'payment_status'),
+        ('payment_method', 'payment_method'),
+        ('amount', 'amount'),
+        ('currency', 'currency'),
+        ('prepayment_amount', 'prepayment_amount'),
+        ('remaining_amount', 'remaining_amount'),
+        ('booking__booking_reference', 'booking_reference'),
+        ('booking__property__name', 'property_name'),
+        ('user__email', 'user_email'),
+        ('paystack_reference', 'paystack_reference'),
+        ('mpesa_receipt_number', 'mpesa_receipt_number'),
+        ('bank_transfer_reference', 'bank_transfer_reference'),
+    )
+
+    @swagger_auto_schema(
+        operation_description="Export payments as a CSV or NDJSON download (admin only)",
+        manual_parameters=EXPORT_PARAMETERS,
+        responses={200: 'Streamed file', 400: 'Bad Request'}
+    )
+    def get(self, request):
+        return super().get(request)
+
+
 class PaymentInitializeView(APIView):
     """Initialize Paystack payment for a booking (supports both authenticated users and guests)"""
     permission_classes = [AllowAny]
@@ -192,6 +171,12 @@ class PaymentInitializeView(APIView):
                 'reference': payment.paystack_reference,
                 'access_code': payment.paystack_access_code
             }, status=status.HTTP_200_OK)
+        elif paystack_result.get('unavailable'):
+            # Not the guest's fault: leave the payment pending so it can be retried
+            return Response({
+                'error': 'Payment initialization failed',
+                'message': paystack_result['message']
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '30'})
         else:
             payment.payment_status = 'failed'
             payment.failure_reason = paystack_result['message']
@@ -254,24 +239,32 @@ class PaymentVerifyView(APIView):
         
         # Verify payment with Paystack
         verify_result = verify_payment(reference)
+        if verify_result.get('unavailable'):
+            return Response({
+                'error': 'Payment verification failed',
+                'message': verify_result['message']
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '30'})
         
         if verify_result['status'] and verify_result['data']:
             transaction_data = verify_result['data']
             
             if transaction_data['status'] == 'success':
-                booking = payment.booking
-                # Payment successful
-                if payment.payment_status != 'completed':
-                    payment.payment_status = 'completed'
-                    payment.completed_at = timezone.now()
-                    payment.transaction_id = transaction_data.get('id')
-                
-                    # Update booking status
-                    booking.status = 'confirmed'
-                    booking.save()
+                # Payment successful. The webhook worker may be applying the
+                # same charge: lock the row and check again so only one of
+                # us completes it and sends the notification.
+                with transaction.atomic():
+                    payment = Payment.objects.select_for_update().select_related('booking__property').get(pk=payment.pk)
+                    booking = payment.booking
+                    if payment.payment_status != 'completed':
+                        payment.payment_status = 'completed'
+                        payment.completed_at = timezone.now()
+                        payment.transaction_id = transaction_data.get('id')
                     
-                    payment.save()
-                    _send_payment_status_email(payment, 'Completed')
+                        # Update booking status
+                        booking.status = 'confirmed'
+                        booking.save()
+                        payment.save()
+                        send_payment_status_email(payment, 'Completed')
                 
                 return Response({
                     'message': 'Payment verified successfully',
@@ -281,11 +274,13 @@ class PaymentVerifyView(APIView):
             
             else:
                 # Payment failed or abandoned
-                if payment.payment_status != 'failed':
-                    payment.payment_status = 'failed'
-                    payment.failure_reason = f"Transaction status: {transaction_data['status']}"
-                    payment.save()
-                    _send_payment_status_email(payment, 'Failed', payment.failure_reason)
+                with transaction.atomic():
+                    payment = Payment.objects.select_for_update().select_related('booking__property').get(pk=payment.pk)
+                    if payment.payment_status != 'failed':
+                        payment.payment_status = 'failed'
+                        payment.failure_reason = f"Transaction status: {transaction_data['status']}"
+                        payment.save()
+                        send_payment_status_email(payment, 'Failed', payment.failure_reason)
                 
                 return Response({
                     'error': 'Payment verification failed',
@@ -301,7 +296,7 @@ class PaymentVerifyView(APIView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class PaystackWebhookView(APIView):
-    """Handle Paystack webhook notifications"""
+    """Receive Paystack webhooks: verify, store and acknowledge (applied by process_webhook_events)"""
     permission_classes = [AllowAny]
     
     def post(self, request):
@@ -324,33 +319,11 @@ class PaystackWebhookView(APIView):
             logger.error("Invalid JSON in webhook payload")
             return Response({'error': 'Invalid JSON'}, status=status.HTTP_400_BAD_REQUEST)
         
-        event = data.get('event')
-        event_data = data.get('data', {})
-        
-        logger.info(f"Webhook received: {event}")
-        
-        # Handle charge.success event
-        if event == 'charge.success':
-            reference = event_data.get('reference')
-            
-            try:
-                payment = Payment.objects.get(paystack_reference=reference)
-                
-                if payment.payment_status != 'completed':
-                    payment.payment_status = 'completed'
-                    payment.completed_at = timezone.now()
-                    payment.transaction_id = event_data.get('id')
-                    
-                    # Update booking status
-                    booking = payment.booking
-                    booking.status = 'confirmed'
-                    booking.save()
-                    
-                    payment.save()
-                    _send_payment_status_email(payment, 'Completed')
-                    logger.info(f"Payment completed via webhook: {reference}")
-                
-            except Payment.DoesNotExist:
-                logger.warning(f"Payment not found for reference: {reference}")
-        
-        return Response({'message': 'Webhook processed'}, status=status.HTTP_200_OK)
\ No newline at end of file
+        # Store and acknowledge; process_webhook_events applies it
+        webhook_event, created = record_event(data, request.body)
+        if not created:
+            logger.info(f"Duplicate webhook ignored: {webhook_event.event_key}")
+            return Response({'message': 'Webhook already received'}, status=status.HTTP_200_OK)
+
+        logger.info(f"Webhook received: {webhook_event.event_key}")
+        return Response({'message': 'Webhook received'}, status=status.HTTP_200_OK)
@@ -0,0 +1,130 @@
+"""
+Paystack webhook event store.
+
+The webhook view only checks the signature and inserts the raw event, keyed
+by event type and Paystack transaction id, then answers 200 - a redelivery
+hits the unique key and is acknowledged without being stored twice. The
+process_webhook_events worker claims pending events with SELECT ... FOR
+UPDATE SKIP LOCKED and applies each one in a single transaction that locks
+the payment, makes the state change, queues the notifications in the email
+outbox and marks the event processed. A worker dying half-way rolls all of
+that back, so the event is picked up again and still applied exactly once.
+"""
+import hashlib
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Payment, PaystackWebhookEvent
+from .notifications import send_payment_status_email
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_MAX_ATTEMPTS = getattr(settings, 'WEBHOOK_MAX_ATTEMPTS', 8)
+# Events left in 'processing' longer than this belong to a dead worker
+WEBHOOK_PROCESS_TIMEOUT = getattr(settings, 'WEBHOOK_PROCESS_TIMEOUT', 300)
+
+
+def event_key(data, body):
+    event = data.get('event', '')
+    event_data = data.get('data') or {}
+    ident = event_data.get('id') or event_data.get('reference')
+    if ident is None:
+        ident = hashlib.sha256(body).hexdigest()
+    return f'{event}:{ident}'[:255]
+
+
+def record_event(data, body):
+    """Store a verified webhook; returns (event, created) - created is False for a redelivery"""
+    event_data = data.get('data') or {}
+    return PaystackWebhookEvent.objects.get_or_create(
+        event_key=event_key(data, body),
+        defaults={
+            'event': data.get('event', ''),
+            'reference': str(event_data.get('reference') or '')[:100],
+            'payload': data,
+        },
+    )
+
+
+def claim_events(limit=20):
+    """Mark up to `limit` due events as processing and return them"""
+    now = timezone.now()
+    stale = now - timedelta(seconds=WEBHOOK_PROCESS_TIMEOUT)
+    with transaction.atomic():
+        events = list(
+            PaystackWebhookEvent.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending', next_attempt_at__lte=now) | Q(status='processing', claimed_at__lt=stale)
+            ).order_by('received_at')[:limit]
+        )
+        if events:
+            PaystackWebhookEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                status='processing', claimed_at=now
+            )
+            for event in events:
+                event.status, event.claimed_at = 'processing', now
+    return events
+
+
+def _charge_success(event):
+    event_data = event.payload.get('data') or {}
+    payment = Payment.objects.select_for_update().select_related('booking__property').filter(
+        paystack_reference=event.reference
+    ).first()
+    if payment is None:
+        logger.warning(f"Payment not found for reference: {event.reference}")
+        return 'ignored'
+    if payment.payment_status == 'completed':
+        return 'processed'
+
+    payment.payment_status = 'completed'
+    payment.completed_at = timezone.now()
+    payment.transaction_id = event_data.get('id')
+    booking = payment.booking
+    booking.status = 'confirmed'
+    booking.save()
+    payment.save()
+    send_payment_status_email(payment, 'Completed')
+    logger.info(f"Payment completed via webhook: {event.reference}")
+    return 'processed'
+
+
+EVENT_HANDLERS = {
+    'charge.success': _charge_success,
+}
+
+
+def process_event(event):
+    """
+    Apply one claimed event; the state change and the event's new status
+    commit together. Returns the event, or the current row if another worker
+    has reclaimed it in the meantime.
+    """
+    handler = EVENT_HANDLERS.get(event.event)
+    try:
+        with transaction.atomic():
+            # Still ours? Another worker may have reclaimed it as stale
+            locked = PaystackWebhookEvent.objects.select_for_update().get(pk=event.pk)
+            if locked.status != 'processing' or locked.claimed_at != event.claimed_at:
+                return locked
+            event.status = handler(event) if handler else 'ignored'
+            event.attempts += 1
+            event.processed_at = timezone.now()
+            event.error = ''
+            event.save(update_fields=['status', 'attempts', 'processed_at', 'error'])
+    except Exception:
+        event.attempts += 1
+        event.error = traceback.format_exc()
+        if event.attempts >= WEBHOOK_MAX_ATTEMPTS:
+            event.status = 'failed'
+            logger.error(f"Giving up on webhook {event.event_key}")
+        else:
+            event.status = 'pending'
+            event.next_attempt_at = timezone.now() + timedelta(seconds=min(30 * 2 ** (event.attempts - 1), 3600))
+        event.save(update_fields=['status', 'attempts', 'error', 'next_attempt_at'])
+    return event
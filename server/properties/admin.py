@@ -120,8 +120,8 @@ class PropertyFeatureAdmin(admin.ModelAdmin):
 
 @admin.register(PropertyContact)
 class PropertyContactAdmin(admin.ModelAdmin):
-    list_display = ['name', 'property', 'role', 'email']
-    list_filter = ['property']
+    list_display = ['name', 'property', 'role', 'email', 'notification_mode']
+    list_filter = ['property', 'notification_mode']
     search_fields = ['name', 'email', 'role']
 
 
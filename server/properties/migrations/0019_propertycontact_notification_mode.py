@@ -0,0 +1,23 @@
+# Generated by Django 5.0.8 on 2026-10-15 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0018_alter_propertyimage_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertycontact',
+            name='last_digest_at',
+            field=models.DateTimeField(blank=True, help_text='End of the period covered by the last digest sent', null=True),
+        ),
+        migrations.AddField(
+            model_name='propertycontact',
+            name='notification_mode',
+            field=models.CharField(choices=[('immediate', 'Immediate'), ('hourly', 'Hourly Digest'), ('daily', 'Daily Digest')], default='immediate', help_text='Booking and payment emails one by one, or as an hourly/daily digest', max_length=10),
+        ),
+    ]
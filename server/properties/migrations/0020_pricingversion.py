@@ -0,0 +1,21 @@
+# Generated by Django 5.0.8 on 2026-10-15 09:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0019_propertycontact_notification_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingVersion',
+            fields=[
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pricing_version', serialize=False, to='properties.property')),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -187,6 +187,19 @@ class PropertyPricing(models.Model):
         return f"{self.property.name} - {self.accommodation_type} ({self.stay_type})"
 
 
+class PricingVersion(models.Model):
+    """
+    Counter bumped whenever a property's pricing rules change. Workers compare
+    it with the version of their compiled pricing table (see pricing.py). Kept
+    out of Property so saving a stale Property instance can't move it back.
+    """
+    property = models.OneToOneField(Property, on_delete=models.CASCADE, primary_key=True, related_name='pricing_version')
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.property_id}: v{self.version}"
+
+
 class PropertyFeature(models.Model):
     """Property-specific unique features"""
     FEATURE_TYPE_CHOICES = [
@@ -212,12 +225,20 @@ class PropertyFeature(models.Model):
 
 class PropertyContact(models.Model):
     """On-site contact persons for each property"""
+    NOTIFICATION_MODE_CHOICES = [
+        ('immediate', 'Immediate'),
+        ('hourly', 'Hourly Digest'),
+        ('daily', 'Daily Digest'),
+    ]
+
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='contacts')
     name = models.CharField(max_length=200)
     role = models.CharField(max_length=100, help_text="e.g., Friendly Concierge, Host, Butler")
     email = models.EmailField()
     phone = models.CharField(max_length=20, blank=True)
     whatsapp = models.CharField(max_length=20, blank=True)
+    notification_mode = models.CharField(max_length=10, choices=NOTIFICATION_MODE_CHOICES, default='immediate', help_text="Booking and payment emails one by one, or as an hourly/daily digest")
+    last_digest_at = models.DateTimeField(null=True, blank=True, help_text="End of the period covered by the last digest sent")
     
     class Meta:
         verbose_name_plural = 'Property Contacts'
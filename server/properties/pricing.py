@@ -0,0 +1,290 @@
+"""
+Compiled pricing rules per property.
+
+All PropertyPricing rows of a property are loaded once and grouped by
+accommodation type, guest type and stay type. Price quotes, booking
+validation and Booking.save resolve the stay type, the matching rule, the
+capacity limits and the "no pricing" diagnostics from this table instead of
+running their own chains of PropertyPricing queries.
+
+Tables are cached per process and invalidated through the property's
+PricingVersion row, which the PropertyPricing signals and bulk pricing updates
+bump (see properties/signals.py). The counter lives in the database so an edit made in
+one worker reaches every other worker, and the bump commits with the rule
+changes themselves. A worker re-reads the counter at most once every
+PRICING_VERSION_CHECK_INTERVAL seconds per property, so most price lookups
+touch no database at all; edits made elsewhere show up within that interval
+(immediately in the worker that made them).
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from .models import PricingVersion, PropertyPricing
+
+TABLE_TTL = getattr(settings, 'PRICING_TABLE_TTL', 300)
+VERSION_CHECK_INTERVAL = getattr(settings, 'PRICING_VERSION_CHECK_INTERVAL', 5)
+
+ACCOMMODATION_DISPLAY = {
+    'master_bedroom': 'Master Bedroom',
+    'full_apartment': 'Full Apartment'
+}
+
+STAY_TYPE_INFO = {
+    'short_term': 'less than 7 nights',
+    'weekly': 'exactly 7 nights or multiples of 7 (7, 14, 21 nights)',
+    'long_term': '10 or more nights'
+}
+
+
+def accommodation_label(accommodation_type):
+    return ACCOMMODATION_DISPLAY.get(accommodation_type, accommodation_type.replace('_', ' ').title())
+
+
+def _capacity_order(rule):
+    # Unrestricted rules (NULL capacity) sort first, as they do in MySQL
+    return (rule.number_of_guests is not None, rule.number_of_guests or 0, rule.id)
+
+
+def _unique(values):
+    return list(dict.fromkeys(values))
+
+
+class PricingTable:
+    """Pricing rules of one property, indexed for in-memory lookups"""
+
+    def __init__(self, property_id, rules, version=0):
+        self.property_id = property_id
+        self.version = version
+        self.built_at = self.checked_at = time.monotonic()
+        self.rules = sorted(rules, key=lambda rule: rule.id)
+
+        self.by_accommodation = defaultdict(list)
+        self.by_key = defaultdict(list)
+        for rule in self.rules:
+            self.by_accommodation[rule.accommodation_type].append(rule)
+            self.by_key[(rule.accommodation_type, rule.guest_type, rule.stay_type)].append(rule)
+
+    @classmethod
+    def build(cls, property_id, version=0):
+        return cls(property_id, list(PropertyPricing.objects.filter(property_id=property_id)), version)
+
+    # --- Resolution ---
+
+    def rule(self, pricing_id):
+        """The rule with this id, or None if it no longer exists"""
+        return next((rule for rule in self.rules if rule.id == pricing_id), None)
+
+    def stay_type_for(self, accommodation_type, nights):
+        """Weekly for multiples of 7 when weekly pricing exists, otherwise by length"""
+        has_weekly_pricing = any(
+            rule.stay_type == 'weekly' for rule in self.by_accommodation.get(accommodation_type, [])
+        )
+        if nights % 7 == 0 and has_weekly_pricing:
+            return 'weekly'
+        elif nights >= 10:
+            return 'long_term'
+        # Under 7 nights, or 7-9 nights without weekly pricing
+        return 'short_term'
+
+    def candidates(self, accommodation_type, guest_type, stay_type, nights):
+        """Rules covering the stay length, for the guest type or else for 'all'"""
+        for key_guest_type in (guest_type, 'all'):
+            rules = [
+                rule for rule in self.by_key.get((accommodation_type, key_guest_type, stay_type), [])
+                if rule.min_nights <= nights and (rule.max_nights is None or rule.max_nights >= nights)
+            ]
+            if rules:
+                return rules
+        return []
+
+    def select(self, accommodation_type, guest_type, stay_type, nights, number_of_guests=None):
+        """
+        Pick the rule for a stay. With a guest count, the smallest capacity that
+        fits (None if nothing fits); without one, an unrestricted rule first.
+        """
+        rules = self.candidates(accommodation_type, guest_type, stay_type, nights)
+        if not rules:
+            return None
+        if number_of_guests:
+            fitting = [
+                rule for rule in rules
+                if rule.number_of_guests is None or rule.number_of_guests >= number_of_guests
+            ]
+            return min(fitting, key=_capacity_order) if fitting else None
+        unrestricted = [rule for rule in rules if rule.number_of_guests is None]
+        return (unrestricted or rules)[0]
+
+    def max_capacity(self, accommodation_type, stay_type=None, rules=None):
+        if rules is None:
+            rules = [
+                rule for rule in self.by_accommodation.get(accommodation_type, [])
+                if stay_type is None or rule.stay_type == stay_type
+            ]
+        capacities = [rule.number_of_guests for rule in rules if rule.number_of_guests is not None]
+        return max(capacities) if capacities else None
+
+    @staticmethod
+    def total_for(rule, nights):
+        """Weekly price for whole weeks when the rule has one, else nightly"""
+        if rule.weekly_price and nights % 7 == 0:
+            return rule.weekly_price * (nights // 7)
+        return rule.price_per_night * nights
+
+    # --- Diagnostics ---
+
+    def diagnose(self, property_obj, accommodation_type, guest_type, stay_type, nights, user_country=None):
+        """Explain why no pricing matched, as an error payload for the client"""
+        rules = self.by_accommodation.get(accommodation_type, [])
+
+        # 1. The accommodation type doesn't exist at all for this property
+        if not rules:
+            available_accommodations = _unique(rule.accommodation_type for rule in self.rules)
+            available_names = [accommodation_label(acc) for acc in available_accommodations]
+            return {
+                'success': False,
+                'error_type': 'accommodation_unavailable',
+                'message': f'Sorry! {property_obj.name} does not offer {ACCOMMODATION_DISPLAY.get(accommodation_type, accommodation_type)} accommodation.',
+                'suggestion': f'This property offers: {", ".join(available_names)}. Would you like to select one of these instead?',
+                'details': {
+                    'property_name': property_obj.name,
+                    'requested': accommodation_type,
+                    'available_options': available_accommodations
+                }
+            }
+
+        # 2. Minimum nights requirement not met
+        min_nights_required = min(rule.min_nights for rule in rules)
+        if min_nights_required and nights < min_nights_required:
+            return {
+                'success': False,
+                'error_type': 'minimum_nights_not_met',
+                'message': f'{accommodation_label(accommodation_type)} at {property_obj.name} requires a minimum of {min_nights_required} night(s).',
+                'suggestion': f'Your booking is for {nights} night(s). Please extend your stay to at least {min_nights_required} night(s).',
+                'details': {
+                    'property_name': property_obj.name,
+                    'accommodation_type': accommodation_type,
+                    'min_nights_required': min_nights_required,
+                    'requested_nights': nights
+                }
+            }
+
+        # 3. Maximum nights exceeded for every rule that accepts this length
+        max_nights = [
+            rule.max_nights for rule in rules
+            if rule.min_nights <= nights and rule.max_nights is not None
+        ]
+        max_nights_allowed = max(max_nights) if max_nights else None
+        has_unlimited = any(rule.max_nights is None for rule in rules)
+        if max_nights_allowed and not has_unlimited and nights > max_nights_allowed:
+            return {
+                'success': False,
+                'error_type': 'maximum_nights_exceeded',
+                'message': f'{accommodation_label(accommodation_type)} at {property_obj.name} allows a maximum of {max_nights_allowed} night(s) for this booking type.',
+                'suggestion': f'Your booking is for {nights} night(s). Please reduce your stay to {max_nights_allowed} night(s) or less, or contact the property for longer stays.',
+                'details': {
+                    'property_name': property_obj.name,
+                    'accommodation_type': accommodation_type,
+                    'max_nights_allowed': max_nights_allowed,
+                    'requested_nights': nights
+                }
+            }
+
+        # 4. The stay length maps to a stay type this accommodation doesn't offer
+        available_stay_types = _unique(rule.stay_type for rule in rules)
+        if stay_type not in available_stay_types:
+            suggestions = [STAY_TYPE_INFO.get(st, st) for st in available_stay_types]
+            return {
+                'success': False,
+                'error_type': 'invalid_stay_duration',
+                'message': f'Sorry! This accommodation requires bookings of {", or ".join(suggestions)}.',
+                'suggestion': f'Your {nights}-night booking doesn\'t match the available options. Please adjust your dates.',
+                'details': {
+                    'property_name': property_obj.name,
+                    'your_nights': nights,
+                    'your_stay_type': stay_type,
+                    'available_stay_types': available_stay_types,
+                    'accommodation_type': accommodation_type
+                }
+            }
+
+        # 5. Only then check if it's a guest_type issue
+        available_for_all = any(rule.guest_type == 'all' for rule in rules)
+        guest_type_available = any(rule.guest_type == guest_type for rule in rules)
+        if not available_for_all and not guest_type_available:
+            return {
+                'success': False,
+                'error_type': 'guest_type_not_supported',
+                'message': f'Sorry! This property does not accept {guest_type} guests for {accommodation_type}.',
+                'suggestion': 'Please contact the property manager or try a different property.',
+                'details': {
+                    'property_name': property_obj.name,
+                    'property_country': property_obj.country,
+                    'user_country': user_country,
+                    'guest_type': guest_type,
+                    'accommodation_type': accommodation_type
+                }
+            }
+
+        # Generic error - pricing exists but something else is wrong
+        return {
+            'success': False,
+            'error_type': 'pricing_not_available',
+            'message': 'Sorry! No pricing available for your requested booking configuration.',
+            'suggestion': 'Please try different dates or number of guests.',
+            'details': {
+                'property_name': property_obj.name,
+                'nights': nights,
+                'accommodation_type': accommodation_type,
+                'stay_type': stay_type
+            }
+        }
+
+
+_tables = {}
+_lock = threading.Lock()
+
+
+def _current_version(property_id):
+    return PricingVersion.objects.filter(property_id=property_id).values_list('version', flat=True).first() or 0
+
+
+def get_pricing_table(property_id):
+    """
+    Return the compiled pricing table for a property, rebuilding it when
+    stale. Costs one version query when the last check is older than
+    VERSION_CHECK_INTERVAL, none otherwise.
+    """
+    table = _tables.get(property_id)
+    now = time.monotonic()
+    fresh = table is not None and now - table.built_at < TABLE_TTL
+    if fresh and now - table.checked_at < VERSION_CHECK_INTERVAL:
+        return table
+
+    version = _current_version(property_id)
+    if fresh and table.version == version:
+        table.checked_at = now
+        return table
+
+    table = PricingTable.build(property_id, version)
+    # Inside a transaction the rules may still roll back; don't share them
+    if not connection.in_atomic_block:
+        with _lock:
+            _tables[property_id] = table
+    return table
+
+
+def invalidate_pricing_table(property_id):
+    _tables.pop(property_id, None)
+    if PricingVersion.objects.filter(property_id=property_id).update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            PricingVersion.objects.create(property_id=property_id, version=1)
+    except IntegrityError:
+        # Created concurrently
+        PricingVersion.objects.filter(property_id=property_id).update(version=F('version') + 1)
@@ -75,7 +75,7 @@ class PropertyFeatureSerializer(serializers.ModelSerializer):
 class PropertyContactSerializer(serializers.ModelSerializer):
     class Meta:
         model = PropertyContact
-        fields = ['id', 'name', 'role', 'email', 'phone', 'whatsapp']
+        fields = ['id', 'name', 'role', 'email', 'phone', 'whatsapp', 'notification_mode']
 
 
 class PropertySerializer(serializers.ModelSerializer):
@@ -355,6 +355,9 @@ class PropertySerializer(serializers.ModelSerializer):
                     PropertyPricing.objects.filter(id=p_id, property=instance).update(**pricing)
                 else:
                     PropertyPricing.objects.create(property=instance, **pricing)
+            # queryset.update() sends no post_save, so drop the compiled table here
+            from .pricing import invalidate_pricing_table
+            invalidate_pricing_table(instance.id)
 
         if features_data is not None:
             incoming_ids = [f['id'] for f in features_data if 'id' in f]
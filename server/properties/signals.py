@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Property, PropertyPricing
+from .pricing import invalidate_pricing_table
+
+
+@receiver(post_save, sender=PropertyPricing)
+@receiver(post_delete, sender=PropertyPricing)
+def invalidate_property_pricing(sender, instance, origin=None, **kwargs):
+    """Drop the compiled pricing table of the property whose rules changed"""
+    if origin is not None and getattr(origin, 'model', type(origin)) is Property:
+        # The whole property is being deleted, its PricingVersion with it
+        return
+    invalidate_pricing_table(instance.property_id)
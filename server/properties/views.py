@@ -6,7 +6,8 @@ from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg, Prefetch
+from django.db.models import Avg, Prefetch, Exists, OuterRef
+from rest_framework.exceptions import ValidationError
 from .models import (
     Property, PropertyImage, Review,
     PropertyFeature, PropertyPricing, PropertyContact, Gallery
@@ -17,6 +18,8 @@ from .serializers import (
     PropertyPricingSerializer, PropertyContactSerializer, GallerySerializer
 )
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from booking.availability import exclude_unavailable_properties
+from datetime import datetime
 import json
 
 
@@ -27,6 +30,8 @@ class PropertyListCreateView(generics.ListCreateAPIView):
     GET: Public endpoint - anyone can view properties
         - Staff users only see their assigned properties
         - Filtering: country, category, bedrooms, bathrooms, price range, min_guests
+        - Availability: check_in + check_out (YYYY-MM-DD) return only properties
+          free for those dates; accommodation_type limits to properties offering it
         - Search: name, location, description
         - Ordering: price, created_at, bedrooms, max_guests
     
@@ -81,6 +86,28 @@ class PropertyListCreateView(generics.ListCreateAPIView):
         if min_guests:
             queryset = queryset.filter(max_guests__gte=min_guests)
         
+        # Filter by accommodation type offered
+        accommodation_type = self.request.query_params.get('accommodation_type')
+        if accommodation_type:
+            queryset = queryset.filter(
+                Exists(PropertyPricing.objects.filter(property=OuterRef('pk'), accommodation_type=accommodation_type))
+            )
+        
+        # Filter by availability for the requested dates
+        check_in = self.request.query_params.get('check_in')
+        check_out = self.request.query_params.get('check_out')
+        if check_in or check_out:
+            if not (check_in and check_out):
+                raise ValidationError({'error': 'check_in and check_out must be provided together'})
+            try:
+                check_in_date = datetime.strptime(check_in, '%Y-%m-%d').date()
+                check_out_date = datetime.strptime(check_out, '%Y-%m-%d').date()
+            except ValueError:
+                raise ValidationError({'error': 'Invalid date format. Use YYYY-MM-DD'})
+            if check_out_date <= check_in_date:
+                raise ValidationError({'error': 'check_out must be after check_in'})
+            queryset = exclude_unavailable_properties(queryset, check_in_date, check_out_date)
+        
         return queryset
 
     def post(self, request, *args, **kwargs):
@@ -376,7 +403,7 @@ def check_availability(request, slug):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    from booking.models import Booking
+    from booking.availability import get_availability_index
     from datetime import datetime
     
     try:
@@ -389,14 +416,8 @@ def check_availability(request, slug):
         )
     
     # Check for overlapping bookings
-    overlapping = Booking.objects.filter(
-        property=property_obj,
-        status__in=['pending', 'confirmed'],
-        check_in__lt=end,
-        check_out__gt=start
-    )
-    
-    is_available = not overlapping.exists()
+    index = get_availability_index(property_obj.id)
+    is_available = not index.overlapping_bookings(start, end)
     
     return Response({
         'available': is_available,
@@ -1,6 +1,14 @@
 from django.contrib import admin
-from .models import User
+from .models import OutboundEmail, User
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ['first_name', 'last_name', 'date_joined', 'last_login', 'role']
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['to_email', 'subject', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['to_email', 'subject']
+    readonly_fields = ['created_at', 'claimed_at', 'sent_at']
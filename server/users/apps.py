@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "users"
+
+    def ready(self):
+        from django.conf import settings
+
+        # Load the phone metadata at worker start instead of on the first quote
+        if getattr(settings, 'PHONE_RESOLVER_WARM', False):
+            from .phone import warm_phone_resolver
+            warm_phone_resolver()
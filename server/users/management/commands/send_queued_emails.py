@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.outbox import claim_emails, purge_sent_emails, send_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver emails queued in the outbox, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when no email is due")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when no email is due")
+        parser.add_argument('--batch', type=int, default=20, help="Emails claimed and sent per connection")
+
+    def handle(self, *args, **options):
+        purge_sent_emails()
+        while True:
+            emails = claim_emails(options['batch'])
+            if not emails:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+
+            for email in send_emails(emails):
+                message = f"Email #{email.pk} to {email.to_email}: {email.status} (attempt {email.attempts})"
+                if email.status == 'sent':
+                    self.stdout.write(self.style.SUCCESS(message))
+                else:
+                    self.stderr.write(message)
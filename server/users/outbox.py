@@ -0,0 +1,85 @@
+"""
+Email outbox worker.
+
+send_normal_email inserts OutboundEmail rows inside the request's
+transaction. The send_queued_emails command claims due rows with SELECT ...
+FOR UPDATE SKIP LOCKED (so several workers never pick the same email),
+delivers each claimed batch over one SMTP connection or Resend batch request
+outside the transaction and records every email's result. A failed send
+is retried after EMAIL_RETRY_DELAY * 2^(attempts - 1) seconds, with jitter and
+capped at an hour, until EMAIL_MAX_ATTEMPTS, when it is marked failed.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+from .utils import deliver_emails
+
+logger = logging.getLogger(__name__)
+
+EMAIL_MAX_ATTEMPTS = getattr(settings, 'EMAIL_MAX_ATTEMPTS', 6)
+EMAIL_RETRY_DELAY = getattr(settings, 'EMAIL_RETRY_DELAY', 60)
+MAX_RETRY_DELAY = 3600
+# Rows left in 'sending' longer than this belong to a dead worker
+EMAIL_SEND_TIMEOUT = getattr(settings, 'EMAIL_SEND_TIMEOUT', 300)
+
+
+def retry_delay(attempts):
+    delay = min(EMAIL_RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_emails(limit=20):
+    """Mark up to `limit` due emails as sending and return them"""
+    now = timezone.now()
+    stale = now - timedelta(seconds=EMAIL_SEND_TIMEOUT)
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', claimed_at__lt=stale)
+            ).order_by('next_attempt_at')[:limit]
+        )
+        if emails:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(status='sending', claimed_at=now)
+    return emails
+
+
+def _record(email, error):
+    email.attempts += 1
+    if error is None:
+        email.status = 'sent'
+        email.sent_at = timezone.now()
+        email.last_error = ''
+    else:
+        email.last_error = f"{type(error).__name__}: {error}"
+        if email.attempts >= EMAIL_MAX_ATTEMPTS:
+            email.status = 'failed'
+            logger.error(f"Giving up on email #{email.pk} to {email.to_email}: {email.last_error}")
+        else:
+            email.status = 'pending'
+            email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+            logger.warning(f"Email #{email.pk} to {email.to_email} failed, retrying at {email.next_attempt_at}")
+    email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+
+
+def send_emails(emails):
+    """Deliver claimed emails as one transport batch and record each outcome"""
+    errors = deliver_emails([
+        {'to_email': email.to_email, 'email_subject': email.subject, 'email_body': email.body}
+        for email in emails
+    ])
+    for email, error in zip(emails, errors):
+        _record(email, error)
+    return emails
+
+
+def purge_sent_emails(keep=timedelta(days=30)):
+    """Delete emails sent more than `keep` ago"""
+    deleted, _ = OutboundEmail.objects.filter(status='sent', sent_at__lt=timezone.now() - keep).delete()
+    return deleted
@@ -0,0 +1,82 @@
+"""
+Phone number to country resolution.
+
+libphonenumber (and its geocoder metadata, the expensive part) is imported
+on first use rather than when Django loads the modules that need it.
+check_phone only parses and validates; resolve_phone and phone_country also
+geocode, so callers that never read the country don't pay for it. Both are
+memoized in bounded LRU caches keyed by the normalised number, so repeat
+customers skip parsing and geocoding entirely.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+
+PHONE_CACHE_SIZE = getattr(settings, 'PHONE_COUNTRY_CACHE_SIZE', 4096)
+
+# Sample number used to load the metadata when warming
+WARM_NUMBER = '+254712345678'
+
+# parseable: libphonenumber could parse it; is_valid: it is a real number;
+# country: English country name from the geocoder ('' when unknown)
+PhoneInfo = namedtuple('PhoneInfo', ['number', 'parseable', 'is_valid', 'country'])
+PhoneCheck = namedtuple('PhoneCheck', ['number', 'parseable', 'is_valid'])
+
+_SEPARATORS = re.compile(r'[\s\-().]')
+
+
+def normalise(number):
+    """Strip spaces and separators so formatting variants share a cache entry"""
+    return _SEPARATORS.sub('', number or '')
+
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def _parse(number):
+    """(parsed number or None, is_valid)"""
+    import phonenumbers
+
+    try:
+        parsed = phonenumbers.parse(number, None)
+    except phonenumbers.NumberParseException:
+        return None, False
+    return parsed, phonenumbers.is_valid_number(parsed)
+
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def _resolve(number):
+    parsed, is_valid = _parse(number)
+    if parsed is None:
+        return PhoneInfo(number, False, False, '')
+
+    from phonenumbers import geocoder
+    return PhoneInfo(number, True, is_valid, geocoder.description_for_number(parsed, "en"))
+
+
+def check_phone(number):
+    """Parse and validate a number in international format, without geocoding it"""
+    number = normalise(number)
+    parsed, is_valid = _parse(number)
+    return PhoneCheck(number, parsed is not None, is_valid)
+
+
+def resolve_phone(number):
+    """Parse, validate and geocode a number in international format"""
+    return _resolve(normalise(number))
+
+
+def phone_country(number):
+    """Country name for a number, or '' if it cannot be parsed or located"""
+    return resolve_phone(number).country
+
+
+def phone_cache_info():
+    """Hit/miss counters and size of the resolution cache"""
+    info = _resolve.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'max_size': info.maxsize}
+
+
+def warm_phone_resolver():
+    """Import libphonenumber and load the geocoder metadata ahead of the first request"""
+    resolve_phone(WARM_NUMBER)
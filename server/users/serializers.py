@@ -10,8 +10,7 @@ from django.urls import reverse
 from .utils import send_normal_email
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
 from django.conf import settings
-import phonenumbers
-from phonenumbers import geocoder
+from .phone import check_phone, phone_country
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -37,14 +36,13 @@ class UserRegisterSerializer(serializers.ModelSerializer):
                 "Phone number must include country code (e.g., +254712345678, +32475123456)"
             )
         
-        try:
-            parsed = phonenumbers.parse(value, None)
-            if not phonenumbers.is_valid_number(parsed):
-                raise serializers.ValidationError("Invalid phone number")
-        except phonenumbers.NumberParseException:
+        phone = check_phone(value)
+        if not phone.parseable:
             raise serializers.ValidationError(
                 "Invalid phone number format. Use international format: +[country code][number]"
             )
+        if not phone.is_valid:
+            raise serializers.ValidationError("Invalid phone number")
         
         return value
     
@@ -58,14 +56,13 @@ class UserRegisterSerializer(serializers.ModelSerializer):
                 "WhatsApp number must include country code (e.g., +254712345678, +32475123456)"
             )
         
-        try:
-            parsed = phonenumbers.parse(value, None)
-            if not phonenumbers.is_valid_number(parsed):
-                raise serializers.ValidationError("Invalid WhatsApp number")
-        except phonenumbers.NumberParseException:
+        phone = check_phone(value)
+        if not phone.parseable:
             raise serializers.ValidationError(
                 "Invalid WhatsApp number format. Use international format: +[country code][number]"
             )
+        if not phone.is_valid:
+            raise serializers.ValidationError("Invalid WhatsApp number")
         
         return value
 
@@ -81,13 +78,10 @@ class UserRegisterSerializer(serializers.ModelSerializer):
         country_of_residence = attr.get('country_of_residence', '')
         
         if phone_number and not country_of_residence:
-            try:
-                parsed = phonenumbers.parse(phone_number, None)
-                country = geocoder.description_for_number(parsed, "en")
-                if country:
-                    attr['country_of_residence'] = country
-            except:
-                pass  # If parsing fails, leave country empty
+            # If parsing fails, leave country empty
+            country = phone_country(phone_number)
+            if country:
+                attr['country_of_residence'] = country
         
         return attr
 
@@ -255,14 +249,13 @@ class UserProfileSerializer(serializers.ModelSerializer):
                 "Phone number must include country code (e.g., +254712345678, +32475123456)"
             )
         
-        try:
-            parsed = phonenumbers.parse(value, None)
-            if not phonenumbers.is_valid_number(parsed):
-                raise serializers.ValidationError("Invalid phone number")
-        except phonenumbers.NumberParseException:
+        phone = check_phone(value)
+        if not phone.parseable:
             raise serializers.ValidationError(
                 "Invalid phone number format. Use international format: +[country code][number]"
             )
+        if not phone.is_valid:
+            raise serializers.ValidationError("Invalid phone number")
         
         return value
     
@@ -276,14 +269,13 @@ class UserProfileSerializer(serializers.ModelSerializer):
                 "WhatsApp number must include country code (e.g., +254712345678, +32475123456)"
             )
         
-        try:
-            parsed = phonenumbers.parse(value, None)
-            if not phonenumbers.is_valid_number(parsed):
-                raise serializers.ValidationError("Invalid WhatsApp number")
-        except phonenumbers.NumberParseException:
+        phone = check_phone(value)
+        if not phone.parseable:
             raise serializers.ValidationError(
                 "Invalid WhatsApp number format. Use international format: +[country code][number]"
             )
+        if not phone.is_valid:
+            raise serializers.ValidationError("Invalid WhatsApp number")
         
         return value
     
@@ -300,13 +292,10 @@ class UserProfileSerializer(serializers.ModelSerializer):
                 attrs['country_of_residence'] = self.instance.country_of_residence
             else:
                 # Auto-detect from phone number
-                try:
-                    parsed = phonenumbers.parse(phone_number, None)
-                    country = geocoder.description_for_number(parsed, "en")
-                    if country:
-                        attrs['country_of_residence'] = country
-                except:
-                    pass  # If parsing fails, leave country empty
+                # If parsing fails, leave country empty
+                country = phone_country(phone_number)
+                if country:
+                    attrs['country_of_residence'] = country
         
         return attrs
     
@@ -1,3 +1,91 @@
-from django.test import TestCase
+import os
+import socket
+from unittest import mock
 
-# Create your tests here.
+from aiosmtpd.controller import Controller
+from django.test import SimpleTestCase, override_settings
+
+from .utils import deliver_emails
+
+
+class RecordingHandler:
+    """Accepts every recipient except bad@example.com and counts sessions"""
+
+    def __init__(self):
+        self.connections = 0
+        self.delivered = []
+
+    async def handle_HELO(self, server, session, envelope, hostname):
+        self.connections += 1
+        session.host_name = hostname
+        return '250 {}'.format(server.hostname)
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == 'bad@example.com':
+            return '550 No such user'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered.extend(envelope.rcpt_tos)
+        return '250 Message accepted for delivery'
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class DeliverEmailsSMTPTests(SimpleTestCase):
+    def setUp(self):
+        self.handler = RecordingHandler()
+        port = _free_port()
+        self.controller = Controller(self.handler, hostname='127.0.0.1', port=port)
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+        self.handler.connections = 0
+        self.settings_override = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=port,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        # Force the SMTP branch
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
+        os.environ.pop('RESEND_API_KEY', None)
+
+    def _email(self, to_email):
+        return {'to_email': to_email, 'email_subject': 'Booking', 'email_body': 'Hello'}
+
+    def test_batch_uses_one_connection(self):
+        emails = [self._email(f'guest{i}@example.com') for i in range(5)]
+
+        results = deliver_emails(emails)
+
+        self.assertEqual(results, [None] * 5)
+        self.assertEqual(self.handler.connections, 1)
+        self.assertEqual(self.handler.delivered, [email['to_email'] for email in emails])
+
+    def test_rejected_recipient_fails_alone(self):
+        emails = [self._email('first@example.com'), self._email('bad@example.com'), self._email('last@example.com')]
+
+        results = deliver_emails(emails)
+
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], Exception)
+        self.assertIsNone(results[2])
+        self.assertEqual(self.handler.connections, 1)
+        self.assertEqual(self.handler.delivered, ['first@example.com', 'last@example.com'])
@@ -1,5 +1,5 @@
 import random
-from django.core.mail import EmailMessage
+from django.core.mail import EmailMessage, get_connection
 from .models import User
 from django.conf import settings
 
@@ -30,71 +30,111 @@ def send_code_to_user(email):
 
 def send_normal_email(data):
     """
-    Send email using Resend API (production) or SMTP (development).
-    Resend is used in production to avoid SMTP port blocking issues.
+    Queue an email in the outbox. Only a row is inserted - in the caller's
+    transaction, so nothing goes out if it rolls back - and the
+    send_queued_emails worker delivers it (see users/outbox.py).
+    """
+    from .models import OutboundEmail
+
+    return OutboundEmail.objects.create(
+        to_email=data['to_email'],
+        subject=data['email_subject'],
+        body=data['email_body'],
+    )
+
+
+# Resend accepts at most this many emails per batch request
+RESEND_BATCH_SIZE = 100
+
+
+def _rejected_by_resend(error):
+    """Whether Resend refused the request's content (4xx), rather than failing to handle it"""
+    try:
+        code = int(getattr(error, 'code', 0))
+    except (TypeError, ValueError):
+        return False
+    # Bad API key and rate limits fail every email alike
+    return 400 <= code < 500 and code not in (401, 403, 429)
+
+
+def deliver_emails(emails):
+    """
+    Send a batch of emails (dicts like send_normal_email's) using the Resend
+    batch API (production) or one SMTP connection (development), instead of a
+    request or TLS handshake per email. Resend is used in production to avoid
+    SMTP port blocking issues. Returns one entry per email: None if it was
+    sent, else the exception, so the outbox worker can retry just the failures.
     """
     import logging
     import os
-    
+
     logger = logging.getLogger(__name__)
-    
+
     # Check if Resend API key is available (production)
     resend_api_key = os.getenv('RESEND_API_KEY')
-    
+
     if resend_api_key:
         # Use Resend API (production - no SMTP blocking issues)
-        try:
-            import resend
-            
-            logger.info(f"Attempting to send email to {data['to_email']} via Resend API")
-            
-            resend.api_key = resend_api_key
-            
-            params = {
+        import resend
+
+        resend.api_key = resend_api_key
+        results = []
+        for start in range(0, len(emails), RESEND_BATCH_SIZE):
+            chunk = emails[start:start + RESEND_BATCH_SIZE]
+            params = [{
                 "from": settings.DEFAULT_FROM_EMAIL,
                 "to": [data['to_email']],
                 "subject": data['email_subject'],
                 "text": data['email_body']
-            }
-            
-            email = resend.Emails.send(params)
-            logger.info(f"Email sent successfully via Resend API to {data['to_email']}")
-            
-        except Exception as e:
-            logger.error(f"Resend API failed: {type(e).__name__}: {str(e)}")
-            logger.error(f"Full error details:", exc_info=True)
-            # Don't raise - just log the error
-    else:
-        # Fallback to SMTP (development/local)
-        from concurrent.futures import ThreadPoolExecutor, TimeoutError
-        
-        def _send_email_task():
-            """Internal function to send email via SMTP"""
+            } for data in chunk]
             try:
-                logger.info(f"Attempting to send email to {data['to_email']} via SMTP")
-                
-                email = EmailMessage(
-                    subject=data['email_subject'],
-                    body=data['email_body'],
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    to=[data['to_email']]
-                )
-                
-                email.send(fail_silently=False)
-                logger.info(f"Email sent successfully to {data['to_email']}")
-                return True
-                
+                # The batch is accepted or rejected as a whole
+                resend.Batch.send(params)
+                results.extend([None] * len(chunk))
+                logger.info(f"Sent {len(chunk)} email(s) via Resend batch API")
             except Exception as e:
-                logger.error(f"SMTP email sending failed: {type(e).__name__}: {str(e)}")
-                raise
-        
-        # Execute email sending with timeout
-        try:
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(_send_email_task)
-                future.result(timeout=15)
-        except TimeoutError:
-            logger.warning(f"SMTP email timed out after 15 seconds to {data['to_email']}")
-        except Exception as e:
-            logger.error(f"Email sending failed: {str(e)}")
+                logger.error(f"Resend batch of {len(chunk)} failed: {type(e).__name__}: {str(e)}")
+                if not _rejected_by_resend(e):
+                    # Transport or server error: retry the whole chunk later
+                    results.extend([e] * len(chunk))
+                    continue
+                # Some email in the chunk is invalid; send them one by one so
+                # only the bad ones are retried
+                for data, email_params in zip(chunk, params):
+                    try:
+                        resend.Emails.send(email_params)
+                        results.append(None)
+                    except Exception as e:
+                        logger.error(f"Resend email to {data['to_email']} failed: {type(e).__name__}: {str(e)}")
+                        results.append(e)
+        return results
+
+    # Fallback to SMTP (development/local): one connection for the whole batch,
+    # EMAIL_TIMEOUT bounds each network call
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"SMTP connection failed: {type(e).__name__}: {str(e)}")
+        return [e] * len(emails)
 
+    results = []
+    try:
+        for data in emails:
+            message = EmailMessage(
+                subject=data['email_subject'],
+                body=data['email_body'],
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[data['to_email']],
+                connection=connection,
+            )
+            try:
+                message.send(fail_silently=False)
+                results.append(None)
+            except Exception as e:
+                logger.error(f"SMTP email to {data['to_email']} failed: {type(e).__name__}: {str(e)}")
+                results.append(e)
+    finally:
+        connection.close()
+    logger.info(f"Sent {results.count(None)} of {len(emails)} email(s) over one SMTP connection")
+    return results